@@ -1,12 +1,18 @@
 import streamlit as st
 import os
-import hashlib
 import shutil
+import time
+import uuid
 from dotenv import load_dotenv
-from src.document_loader import load_documents, split_documents, get_document_names
-from src.vector_store import create_vector_store
-from src.chatbot import create_chatbot, ask
-from src.config import DOCUMENTS_DIR, SAMPLE_DIR
+from src.document_loader import get_document_names
+from src.manifest import scan_folder, corpus_fingerprint
+from src.registry import acquire_index, submit_index
+from src.answer_cache import get_answer_cache
+from src.chatbot import get_chatbot, ask_stream
+from src.retrieval_cache import get_retrieval_cache
+from src.config import SAMPLE_DIR, TENANT_MOUNTS, WARMUP
+from src.startup import start_warmup
+from src.vector_store import tenant_folder
 
 load_dotenv()
 
@@ -16,6 +22,10 @@ if "ANTHROPIC_API_KEY" not in os.environ:
     except Exception:
         pass
 
+# Load the embedding model and Claude client while the page renders.
+if WARMUP:
+    start_warmup()
+
 # ============ Page Config ============
 
 st.set_page_config(
@@ -139,20 +149,69 @@ st.markdown("""
 
 # ============ Helpers ============
 
-def get_doc_hash(folder):
-    files = sorted(get_document_names(folder))
-    return hashlib.md5("".join(files).encode()).hexdigest()
+rerun_timings = {}
+_last_mark = [time.perf_counter()]
+
+
+def mark(stage):
+    now = time.perf_counter()
+    rerun_timings[stage] = (now - _last_mark[0]) * 1000
+    _last_mark[0] = now
+
+
+def get_doc_hash(folder, manifest=None):
+    return corpus_fingerprint(scan_folder(folder, manifest))
 
 
-def process_documents(folder):
-    docs = load_documents(folder)
-    if not docs:
+def get_all_document_names(folder, mounts=()):
+    return [name for path in (folder, *mounts) for name in get_document_names(path)]
+
+
+def process_documents(folder, on_progress=None, mounts=()):
+    lease = acquire_index(folder, on_progress, mounts)
+    if not lease.num_chunks:
+        lease.release()
         return None, 0, []
-    chunks = split_documents(docs)
-    vs = create_vector_store(chunks)
-    names = get_document_names(folder)
-    return vs, len(chunks), names
+    names = get_all_document_names(folder, mounts)
+    return lease, lease.num_chunks, names
+
+
+def swap_index(folder, doc_hash, mounts=()):
+    """Replace the session's index with the folder's newly built one."""
+    lease, n_chunks, names = process_documents(folder, mounts=mounts)
+    if not lease:
+        return
+    # Indexes are shared across sessions; hand the old one back.
+    old_lease = st.session_state.get("index_lease")
+    st.session_state.update(
+        index_lease=lease, vector_store=lease.vector_store, manifest=lease.manifest,
+        doc_folder=folder, num_chunks=n_chunks, doc_names=names, doc_hash=doc_hash,
+    )
+    if old_lease:
+        old_lease.release()
+
 
+@st.fragment(run_every=1.0)
+def show_indexing(job):
+    if job.finished:
+        st.rerun()
+    total = job.files_total or "?"
+    st.progress(job.progress, text=f"🔄 Indexing {job.files_done}/{total} file(s)...")
+
+
+# ============ Tenant ============
+
+# Each browser session gets its own documents folder and index. The id is
+# kept in the URL, so reloading the page finds the same documents.
+if "tenant_id" not in st.session_state:
+    tenant_id = st.query_params.get("tenant", "")
+    try:
+        tenant_folder(tenant_id)
+    except ValueError:
+        tenant_id = uuid.uuid4().hex[:16]
+    st.session_state.tenant_id = tenant_id
+st.query_params["tenant"] = st.session_state.tenant_id
+my_folder = tenant_folder(st.session_state.tenant_id)
 
 # ============ Sidebar ============
 
@@ -178,13 +237,11 @@ with st.sidebar:
             accept_multiple_files=True, label_visibility="collapsed"
         )
         if uploaded_files:
-            os.makedirs(DOCUMENTS_DIR, exist_ok=True)
             for f in uploaded_files:
-                with open(os.path.join(DOCUMENTS_DIR, f.name), "wb") as out:
+                with open(os.path.join(my_folder, f.name), "wb") as out:
                     out.write(f.getbuffer())
             st.success(f"✓ {len(uploaded_files)} file(s) uploaded")
             st.session_state.doc_hash = None
-            st.session_state.vector_store = None
             st.rerun()
     else:
         st.markdown('<span class="demo-badge">🎮 DEMO MODE</span>', unsafe_allow_html=True)
@@ -193,8 +250,9 @@ with st.sidebar:
     st.markdown('<hr class="sidebar-divider">', unsafe_allow_html=True)
 
     # Show loaded docs
-    active_folder = DOCUMENTS_DIR if mode == "📄 My Documents" else SAMPLE_DIR
-    files = get_document_names(active_folder)
+    active_folder = my_folder if mode == "📄 My Documents" else SAMPLE_DIR
+    mounts = TENANT_MOUNTS if mode == "📄 My Documents" else ()
+    files = get_all_document_names(active_folder, mounts)
     if files:
         st.markdown(f'<div class="sidebar-section">📂 {len(files)} Document(s)</div>', unsafe_allow_html=True)
         for f in files:
@@ -267,9 +325,8 @@ if not os.getenv("ANTHROPIC_API_KEY"):
     st.stop()
 
 # Document handling
-active_folder = DOCUMENTS_DIR if mode == "📄 My Documents" else SAMPLE_DIR
+mark("page + sidebar")
 os.makedirs(active_folder, exist_ok=True)
-files = get_document_names(active_folder)
 
 if not files:
     st.markdown("""
@@ -295,23 +352,36 @@ if not files:
     st.stop()
 
 # Process documents
-current_hash = get_doc_hash(active_folder) + mode
+same_folder = st.session_state.get("doc_folder") == active_folder
+prev_manifest = st.session_state.get("manifest") if same_folder else None
+current_hash = get_doc_hash(active_folder, prev_manifest) + mode
+current_hash += "".join(get_doc_hash(path) for path in mounts)
 need_reload = st.session_state.get("doc_hash") != current_hash
+mark("corpus scan")
 
 if need_reload:
-    with st.spinner("🔄 Processing documents..."):
-        vs, n_chunks, names = process_documents(active_folder)
-        if vs:
-            st.session_state.vector_store = vs
-            st.session_state.num_chunks = n_chunks
-            st.session_state.doc_names = names
-            st.session_state.doc_hash = current_hash
+    # Index in the background; the current index keeps answering until
+    # the new one is ready. Reruns resubmit, which joins the running job.
+    jobs = [submit_index(path) for path in (active_folder, *mounts)]
+    job = next((j for j in jobs if j.status != "done"), jobs[0])
+    if job.status == "done":
+        swap_index(active_folder, current_hash, mounts)
+    elif job.status == "failed":
+        st.error(f"Could not index documents: {job.error}")
+    elif same_folder:
+        with st.sidebar:
+            show_indexing(job)
+    else:
+        show_indexing(job)
+        st.stop()
 
 vs = st.session_state.get("vector_store")
 if vs is None:
     st.error("Could not process documents.")
     st.stop()
 
+mark("index")
+
 # Stats
 n_docs = len(st.session_state.get("doc_names", []))
 n_chunks = st.session_state.get("num_chunks", 0)
@@ -325,7 +395,28 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-chatbot = create_chatbot(vs)
+lease = st.session_state.index_lease
+chatbot = get_chatbot(vs, mounts=tuple(lease.mounted_stores), fingerprint=lease.fingerprint)
+mark("chatbot")
+
+if st.sidebar.toggle("🐞 Debug panel"):
+    with st.sidebar.expander("⏱️ Last answer", expanded=True):
+        trace = st.session_state.get("last_trace")
+        if trace:
+            st.markdown(f"**Total** — {trace['total_ms']:.1f} ms")
+            for stage, ms in trace["stages"].items():
+                st.markdown(f"`{stage}` — {ms:.1f} ms")
+            for name, value in trace["counters"].items():
+                st.markdown(f"`{name}` — {value}")
+        else:
+            st.caption("Ask a question to see its breakdown.")
+    with st.sidebar.expander("⏱️ Rerun timings"):
+        for stage, ms in rerun_timings.items():
+            st.markdown(f"`{stage}` — {ms:.1f} ms")
+    with st.sidebar.expander("🗃️ Caches"):
+        for name, stats in (("answers", get_answer_cache().stats()),
+                            ("retrieval", get_retrieval_cache().stats())):
+            st.markdown(f"**{name}** — {stats['hit_rate']:.0%} hits, {stats['entries']} entries")
 
 # ============ Chat ============
 
@@ -362,18 +453,39 @@ if prompt:
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
+        events = ask_stream(chatbot, prompt, get_answer_cache(), st.session_state.index_lease.fingerprint)
         with st.spinner("🤔 Thinking..."):
-            result = ask(chatbot, prompt)
-            st.markdown(result["answer"])
-
-            sources = []
-            if result["sources"]:
-                with st.expander("📚 Sources"):
-                    for i, doc in enumerate(result["sources"]):
-                        name = os.path.basename(doc.metadata.get("source", "Unknown"))
-                        preview = doc.page_content[:200] + "..."
-                        st.markdown(f'<div class="src-card"><strong>Source {i+1}</strong> — {name}<br>{preview}</div>', unsafe_allow_html=True)
-                        sources.append({"name": name, "preview": preview})
+            retrieved = next(events)["sources"]  # ready once retrieval finishes
+
+        # The answer streams into this slot, above the sources shown meanwhile.
+        answer_slot = st.container()
+        sources = []
+        if retrieved:
+            with st.expander("📚 Sources"):
+                for i, doc in enumerate(retrieved):
+                    name = os.path.basename(doc.metadata.get("source", "Unknown"))
+                    if isinstance(doc.metadata.get("page"), int):
+                        name += f", page {doc.metadata['page'] + 1}"
+                    if "start_index" in doc.metadata:
+                        start = doc.metadata["start_index"]
+                        name += f", chars {start}–{doc.metadata.get('end_index', start + len(doc.page_content))}"
+                    preview = doc.page_content[:200] + "..."
+                    st.markdown(f'<div class="src-card"><strong>Source {i+1}</strong> — {name}<br>{preview}</div>', unsafe_allow_html=True)
+                    sources.append({"name": name, "preview": preview})
+
+        result = {}
+
+        def answer_tokens():
+            for event in events:
+                if event["type"] == "token":
+                    yield event["text"]
+                elif event["type"] == "done":
+                    result.update(event)
+
+        answer_slot.write_stream(answer_tokens())
+        if result["cached"]:
+            answer_slot.caption("⚡ Answered from cache")
 
     st.session_state.messages.append({"role": "assistant", "content": result["answer"], "sources": sources})
+    st.session_state.last_trace = result["trace"]
     st.rerun()
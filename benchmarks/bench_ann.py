@@ -0,0 +1,122 @@
+"""Measure recall@k, latency and memory per vector of the IVF-PQ index on clustered synthetic vectors.
+
+The quantizer is trained once ``--train-size`` vectors have been added
+(IVF_TRAIN_SIZE by default). Below that the store is an exact scan, so a
+run with fewer vectors trains on half of them instead; the report's
+``train_size`` says which rows were quantized as they arrived.
+``index_bytes_per_vector`` is the store's own estimate, side table
+included; ``reopened_traced_bytes_per_vector`` is what tracemalloc sees
+reopening the index, i.e. everything but the memory-mapped codes and list ids.
+
+Usage: python -m benchmarks.bench_ann [--vectors 1000000] [--train-size 50000] [--queries 100]
+       [--nprobe 4 16 64] [--refine 0 4 16]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from benchmarks.fakes import HashingEmbeddings
+from benchmarks.report import max_rss_mb, percentiles
+from src.config import IVF_NLIST, IVF_PQ_M, IVF_TRAIN_SIZE
+from src.ivf_store import IvfPqVectorStore, recall_at_k
+
+DIM = 384
+LATENT = 48
+BLOCK = 10_000
+CLUSTERS = 4096
+
+# Sentence embeddings occupy a low-dimensional, clustered manifold; isotropic
+# 384-dim noise would make every neighbour equally far and no index useful.
+_model = np.random.default_rng(123)
+_CENTERS = _model.normal(size=(CLUSTERS, LATENT))
+_PROJECTION = _model.normal(size=(LATENT, DIM)) / np.sqrt(LATENT)
+
+
+def _block(start, size):
+    """Vectors for rows start..start+size, reproducible without holding the whole set."""
+    rng = np.random.default_rng(start)
+    latent = _CENTERS[rng.integers(0, CLUSTERS, size)] + 0.5 * rng.normal(size=(size, LATENT))
+    return (latent @ _PROJECTION + 0.05 * rng.normal(size=(size, DIM))).astype(np.float32)
+
+
+def _exact(total, queries, k):
+    """Exact cosine top-k ids, streamed block by block."""
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    for start in range(0, total, BLOCK):
+        block = _block(start, min(BLOCK, total - start))
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(block)),
+                                                          (len(queries), len(block)))], axis=1)
+        keep = np.argpartition(-scores, min(k, scores.shape[1] - 1), axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, keep, 1)
+        best_rows = np.take_along_axis(rows, keep, 1)
+    order = np.argsort(-best_scores, axis=1)
+    return [[str(r) for r in rows] for rows in np.take_along_axis(best_rows, order, 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--train-size", type=int, default=IVF_TRAIN_SIZE)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--refine", type=int, nargs="+", default=[0, 4, 16])
+    args = parser.parse_args()
+
+    queries = _block(args.vectors, args.queries)  # fresh rows from the same mixture
+    train_size = min(args.train_size, args.vectors // 2)
+    report = {"vectors": args.vectors, "dim": DIM, "nlist": IVF_NLIST, "m": IVF_PQ_M,
+              "train_size": train_size}
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = IvfPqVectorStore(HashingEmbeddings(DIM), directory, nlist=IVF_NLIST, m=IVF_PQ_M,
+                                 train_size=train_size)
+        start = time.perf_counter()
+        for offset in range(0, args.vectors, BLOCK):
+            size = min(BLOCK, args.vectors - offset)
+            ids = [str(i) for i in range(offset, offset + size)]
+            store.add_embeddings(ids, _block(offset, size), ids=ids)
+        report["build_s"] = round(time.perf_counter() - start, 1)
+        if not store.trained:
+            parser.error(f"{args.vectors} vectors never trained the quantizer (needs {store.train_size})")
+        report["index_bytes_per_vector"] = round(store.memory_per_vector(), 1)
+        report["float32_bytes_per_vector"] = DIM * 4
+        tracemalloc.start()
+        store = IvfPqVectorStore(HashingEmbeddings(DIM), directory, nlist=IVF_NLIST, m=IVF_PQ_M,
+                                 train_size=train_size)
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["reopened_traced_bytes_per_vector"] = round(held / args.vectors, 1)
+
+        start = time.perf_counter()
+        expected = _exact(args.vectors, queries, args.k)
+        report["exact_qps"] = round(args.queries / (time.perf_counter() - start), 2)
+
+        report["runs"] = []
+        for refine in args.refine:
+            for nprobe in args.nprobe:
+                start = time.perf_counter()
+                recall = recall_at_k(store, queries, expected, args.k, nprobe=nprobe, refine=refine)
+                elapsed = time.perf_counter() - start
+                samples = []
+                for query in queries:
+                    start = time.perf_counter()
+                    store.similarity_search_by_vector(query, k=args.k, nprobe=nprobe, refine=refine)
+                    samples.append(time.perf_counter() - start)
+                run = {"nprobe": nprobe, "refine": refine, f"recall@{args.k}": round(recall, 3),
+                       "qps": round(args.queries / elapsed, 1), "latency": percentiles(samples)}
+                report["runs"].append(run)
+                print(json.dumps(run), flush=True)
+        report["max_rss_mb"] = max_rss_mb()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measure question throughput of sequential ask vs ask_batch against a local fake LLM.
+
+Usage: python -m benchmarks.bench_batch [--questions 50] [--concurrency 1 4 16] [--latency 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.chatbot import create_chatbot, ask, ask_batch
+from src.document_loader import load_documents, split_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, 50)
+        chunks = split_documents(load_documents(folder))
+    vector_store = InMemoryVectorStore.from_documents(chunks, HashingEmbeddings())
+    llm = FakeChatModel(first_token_delay=args.latency, token_delay=0)
+    chatbot = create_chatbot(vector_store, llm=llm)
+    questions = [f"question {i} about cache latency and pipeline errors" for i in range(args.questions)]
+
+    start = time.perf_counter()
+    for question in questions:
+        ask(chatbot, question)
+    sequential_s = time.perf_counter() - start
+    report = {"questions": args.questions, "llm_latency_s": args.latency,
+              "sequential_qps": round(args.questions / sequential_s, 2), "batch": []}
+
+    for concurrency in args.concurrency:
+        start = time.perf_counter()
+        results = asyncio.run(ask_batch(chatbot, questions, max_concurrency=concurrency))
+        elapsed = time.perf_counter() - start
+        report["batch"].append({
+            "concurrency": concurrency,
+            "qps": round(args.questions / elapsed, 2),
+            "errors": sum(1 for r in results if "error" in r),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Measure what ingest-time deduplication saves on a folder of manual versions.
+
+Writes ``--versions`` copies of a manual, each revising a few paragraphs of
+the previous one, and indexes the folder with and without near-duplicate
+detection. Embedding cost is simulated per chunk (``--embed-ms``, roughly
+MiniLM on a laptop CPU) so the time saved is visible.
+
+Usage: python -m benchmarks.bench_dedup [--versions 5] [--paragraphs 400] [--edit-rate 0.05]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from benchmarks.corpus import make_paragraph
+from benchmarks.fakes import HashingEmbeddings
+from src.dedup import NearDuplicateIndex
+from src.numpy_store import NumpyVectorStore
+from src.vector_store import sync_vector_store
+
+
+class SlowEmbeddings(HashingEmbeddings):
+    """Hashing embedder that also spends a fixed time per text."""
+
+    def __init__(self, seconds_per_text: float):
+        super().__init__()
+        self.seconds_per_text = seconds_per_text
+
+    def embed_documents(self, texts: list) -> list:
+        time.sleep(self.seconds_per_text * len(texts))
+        return super().embed_documents(texts)
+
+
+def write_versions(folder: str, versions: int, paragraphs: int, edit_rate: float) -> None:
+    rng = random.Random(0)
+    manual = [make_paragraph(rng, 5) for _ in range(paragraphs)]
+    for version in range(versions):
+        with open(os.path.join(folder, f"manual_v{version + 1}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(manual))
+        # The next version rewords a word or two in a few paragraphs.
+        for i in rng.sample(range(paragraphs), int(paragraphs * edit_rate)):
+            words = manual[i].split(" ")
+            words[rng.randrange(len(words))] = rng.choice(["revised", "updated", "new"])
+            manual[i] = " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--versions", type=int, default=5)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--edit-rate", type=float, default=0.05)
+    parser.add_argument("--embed-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    report = {"versions": args.versions, "paragraphs": args.paragraphs}
+    with tempfile.TemporaryDirectory() as folder:
+        write_versions(folder, args.versions, args.paragraphs, args.edit_rate)
+        for name, dedup in (("exact_only", None), ("near_duplicates", NearDuplicateIndex())):
+            store = NumpyVectorStore(SlowEmbeddings(args.embed_ms / 1000))
+            start = time.perf_counter()
+            _, stats = sync_vector_store(store, folder, dedup=dedup)
+            report[name] = {
+                "seconds": round(time.perf_counter() - start, 2),
+                "chunks_stored": stats["chunks"],
+                "duplicates": stats["duplicates"],
+                "near_duplicates": stats["near_duplicates"],
+                "embed_seconds_saved": stats["embed_seconds_saved"],
+                "dedup_ms": stats["trace"]["stages"].get("dedup", 0.0),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
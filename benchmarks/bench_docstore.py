@@ -0,0 +1,116 @@
+"""Memory per chunk of the NumPy store's side table, with texts inline vs. in the docstore.
+
+Vectors are memory-mapped and not counted; both layouts share them. The
+synthetic corpus repeats a small vocabulary and compresses far better than
+real text, so pass --folder to measure your own documents. Search latency
+is measured on a freshly opened store (cold block cache), again once every
+query has run (warm), and for the vector scan alone, the floor any text
+layout adds to.
+
+Usage: python -m benchmarks.bench_docstore [--docs 2000] [--folder DOCS] [--queries 200]
+       [--cache-blocks 1024]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from benchmarks.corpus import generate_documents
+from benchmarks.fakes import HashingEmbeddings
+from benchmarks.report import percentiles
+from src.config import CONTEXT_FETCH_K, DOCSTORE_CACHE_BLOCKS
+from src.document_loader import load_documents, split_documents
+from src.manifest import hash_chunk
+from src.numpy_store import NumpyVectorStore
+
+DIM = 384
+ADD_BATCH = 64
+
+
+def _traced(build) -> tuple:
+    """Call build(); returns its result and the bytes it still holds."""
+    tracemalloc.start()
+    try:
+        result = build()
+        held, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, held
+
+
+def _inline_table(lines: list) -> tuple:
+    """Replay the side table the way the store held it before the docstore."""
+    ops = [json.loads(line) for line in lines]
+    ids = [op[1] for op in ops]
+    return ids, [op[2] for op in ops], [op[3] for op in ops], {doc_id: row for row, doc_id in enumerate(ids)}
+
+
+def _latency(search, queries) -> dict:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=2000, help="synthetic documents")
+    parser.add_argument("--folder", help="split this folder's documents instead")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--cache-blocks", type=int, default=DOCSTORE_CACHE_BLOCKS)
+    args = parser.parse_args()
+
+    documents = load_documents(args.folder) if args.folder else generate_documents(args.docs)
+    chunks = split_documents(documents)
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    ids = [hash_chunk(text) for text in texts]
+    n = len(chunks)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+    queries = rng.normal(size=(args.queries, DIM)).astype(np.float32).tolist()
+
+    lines = [json.dumps(["put", doc_id, text, meta]) for doc_id, text, meta in zip(ids, texts, metadatas)]
+    _, inline = _traced(lambda: _inline_table(lines))
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = NumpyVectorStore(HashingEmbeddings(DIM), directory)
+        for start in range(0, n, ADD_BATCH):
+            end = start + ADD_BATCH
+            store.add_embeddings(texts[start:end], vectors[start:end], metadatas[start:end], ids[start:end])
+        reopened, opened = _traced(lambda: NumpyVectorStore(HashingEmbeddings(DIM), directory))
+        reopened._docstore.cache_blocks = args.cache_blocks
+        search = lambda query: reopened.similarity_search_by_vector(query, k=CONTEXT_FETCH_K)
+        cold = _latency(search, queries)
+        warm = _latency(search, queries)
+        scan = _latency(lambda query: next(reopened._score(np.asarray([query], np.float32), CONTEXT_FETCH_K)), queries)
+        blocks = len(reopened._docstore._offsets)
+        cache = sum(len(item) for items in reopened._docstore._cache.values() for item in items)
+        disk = os.path.getsize(reopened._docstore.path)
+
+    raw = sum(len(text.encode("utf-8")) for text in texts)
+    report = {
+        "chunks": n,
+        "text_bytes_per_chunk": round(raw / n, 1),
+        "vector_bytes_per_chunk": DIM * 4,
+        "inline_ram_bytes_per_chunk": round(inline / n, 1),
+        "docstore_ram_bytes_per_chunk": round(opened / n, 1),
+        "docstore_blocks": blocks,
+        "docstore_cache_blocks": args.cache_blocks,
+        "docstore_block_cache_mb": round(cache / (1024 * 1024), 2),
+        "docstore_disk_bytes_per_chunk": round(disk / n, 1),
+        "compression_ratio": round(raw / disk, 2),
+        "search_cold": cold,
+        "search_warm": warm,
+        "vector_scan_only": scan,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
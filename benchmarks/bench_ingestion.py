@@ -0,0 +1,66 @@
+"""Benchmark serial vs parallel document loading on a generated corpus.
+
+``sync_parallel`` is the path sync_vector_store takes (iter_loaded_files),
+forced onto the pool whatever the corpus size. The pool only pays off with
+more than one CPU; ``cpus`` says how many this run had.
+
+Usage: python -m benchmarks.bench_ingestion [--docs 8] [--pages 200] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+from src.config import LOAD_WORKERS, PDF_PAGES_PER_TASK
+from src.document_loader import get_document_names, iter_loaded_files, load_documents_parallel
+
+
+def _load_files(folder: str, workers: int, pages_per_task: int) -> list:
+    names = sorted(get_document_names(folder))
+    return [page for _, pages in iter_loaded_files(folder, names, workers, pages_per_task, min_pages=0)
+            for page in pages]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--pages-per-task", type=int, default=PDF_PAGES_PER_TASK)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.docs, pdf_ratio=1.0, pdf_pages=args.pages)
+
+        start = time.perf_counter()
+        serial = _load_files(folder, 1, args.pages_per_task)
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel, failures = load_documents_parallel(folder, args.workers, args.pages_per_task)
+        parallel_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        streamed = _load_files(folder, args.workers, args.pages_per_task)
+        streamed_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "docs": args.docs,
+        "pages": len(serial),
+        "workers": args.workers,
+        "cpus": os.cpu_count(),
+        "serial_s": round(serial_s, 3),
+        "parallel_s": round(parallel_s, 3),
+        "speedup": round(serial_s / parallel_s, 2),
+        "sync_parallel_s": round(streamed_s, 3),
+        "sync_speedup": round(serial_s / streamed_s, 2),
+        "same_output": [d.page_content for d in serial] == [d.page_content for d in parallel]
+        == [d.page_content for d in streamed],
+        "failures": failures,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
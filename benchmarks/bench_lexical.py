@@ -0,0 +1,94 @@
+"""Measure BM25 build rate, incremental update cost and query latency.
+
+Rare-term queries look up a part number and an error code, the case hybrid
+retrieval exists for. Common-term queries are prose from the benchmark's
+26-word vocabulary, so every term hits nearly every chunk: a worst case.
+Those terms are scored on their top BM25_MAX_POSTINGS postings only;
+``common_terms_recall`` is the overlap of that top 20 with the exact one.
+
+Usage: python -m benchmarks.bench_lexical [--chunks 10000 100000] [--queries 500]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from benchmarks.corpus import make_paragraph
+from benchmarks.report import percentiles
+from src.bm25 import BM25Index
+
+
+def _chunks(count: int, seed: int = 0) -> list:
+    """Chunks of synthetic prose, each tagged with a part number and an error code."""
+    rng = random.Random(seed)
+    return [
+        f"{make_paragraph(rng, 6)} Part XJ-{rng.randrange(100000):05d} raised ERR-{rng.randrange(5000)}."
+        for _ in range(count)
+    ]
+
+
+def _latency(index, queries) -> dict:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, 20)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def _recall(index, queries) -> float:
+    """Mean overlap of the capped top 20 with the top 20 over every posting."""
+    cap, index.max_postings = index.max_postings, None
+    exact = [{chunk_id for chunk_id, _ in index.search(query, 20)} for query in queries]
+    index.max_postings = cap
+    found = [{chunk_id for chunk_id, _ in index.search(query, 20)} for query in queries]
+    return round(sum(len(a & b) / len(a) for a, b in zip(exact, found)) / len(queries), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    rare = [f"what does ERR-{rng.randrange(5000)} mean for XJ-{rng.randrange(100000):05d}"
+            for _ in range(args.queries)]
+    common = [make_paragraph(rng, 1) for _ in range(args.queries)]
+    report = []
+    for count in args.chunks:
+        texts = _chunks(count)
+        ids = [str(i) for i in range(count)]
+        index = BM25Index()
+        start = time.perf_counter()
+        index.add(ids, texts)
+        row = {"chunks": count, "build_chunks_per_s": round(count / (time.perf_counter() - start))}
+        row["rare_terms"] = _latency(index, rare)
+        row["common_terms"] = _latency(index, common)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bm25.npz")
+            start = time.perf_counter()
+            index.save(path)
+            row["save_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            start = time.perf_counter()
+            index = BM25Index.load(path)
+            row["load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            row["file_bytes_per_chunk"] = round(os.path.getsize(path) / count, 1)
+        row["common_terms_after_load"] = _latency(index, common)
+        row["common_terms_recall"] = _recall(index, common)
+
+        start = time.perf_counter()
+        index.add([f"new-{i}" for i in range(100)], _chunks(100, seed=2))
+        index.delete(ids[:100])
+        row["update_200_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        row["rare_terms_after_update"] = _latency(index, rare)
+        report.append(row)
+        print(json.dumps(row), flush=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
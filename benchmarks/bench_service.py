@@ -0,0 +1,111 @@
+"""Load-test the HTTP service over real sockets against a local fake LLM.
+
+Usage: python -m benchmarks.bench_service [--requests 200] [--concurrency 8 32 64] [--latency 0.2]
+
+Each level sends --requests questions from that many concurrent clients,
+alternating /ask and /ask/stream, and reports throughput, latency
+percentiles, time to first streamed token, and how many questions were
+turned away with 503.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import tempfile
+import threading
+import time
+import httpx
+import uvicorn
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.answer_cache import AnswerCache
+from src.document_loader import load_documents, split_documents
+from src.registry import IndexRegistry
+from src.service import create_app
+
+
+def build_index(folder_path, on_progress=None):
+    chunks = split_documents(load_documents(folder_path))
+    store = InMemoryVectorStore.from_documents(chunks, HashingEmbeddings())
+    return store, {"files": {}}, {"chunks": len(chunks)}
+
+
+def start_server(app) -> tuple:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def load(url: str, requests: int, concurrency: int) -> dict:
+    latencies, first_tokens, rejected = [], [], 0
+    queue = list(range(requests))
+
+    async def client(http):
+        nonlocal rejected
+        while queue:
+            i = queue.pop()
+            body = {"question": f"question {i} at {concurrency} about cache latency and errors"}
+            start = time.perf_counter()
+            if i % 2:
+                response = await http.post("/ask", json=body)
+            else:
+                async with http.stream("POST", "/ask/stream", json=body) as response:
+                    first_token = None
+                    async for line in response.aiter_lines():
+                        if first_token is None and '"token"' in line:
+                            first_token = time.perf_counter() - start
+                if first_token is not None:
+                    first_tokens.append(first_token)
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ms = lambda xs, q: round(statistics.quantiles(xs, n=100)[q - 1] * 1000, 1) if len(xs) > 1 else None
+    return {
+        "concurrency": concurrency,
+        "qps": round(len(latencies) / elapsed, 2),
+        "p50_ms": ms(latencies, 50),
+        "p95_ms": ms(latencies, 95),
+        "stream_first_token_p50_ms": ms(first_tokens, 50),
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, 50)
+        app = create_app(
+            folder, registry=IndexRegistry(builder=build_index),
+            llm=FakeChatModel(first_token_delay=args.latency, token_delay=0.002),
+            cache=AnswerCache(HashingEmbeddings()),
+        )
+        server, url = start_server(app)
+        report = {"requests": args.requests, "llm_latency_s": args.latency,
+                  "levels": [asyncio.run(load(url, args.requests, c)) for c in args.concurrency]}
+        server.should_exit = True
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare the offset splitter with LangChain's RecursiveCharacterTextSplitter.
+
+Splits one large synthetic text dump with both, checks they produce the same
+chunks, and reports throughput in MB/s.
+
+Usage: python -m benchmarks.bench_splitter [--mb 50] [--repeat 3]
+"""
+
+import argparse
+import json
+import random
+import time
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.corpus import make_paragraph
+from src.config import CHUNK_SIZE, CHUNK_OVERLAP
+from src.document_loader import OffsetTextSplitter
+
+
+def _best_time(func, repeat: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    paragraphs, size = [], 0
+    while size < args.mb * 1e6:
+        paragraphs.append(make_paragraph(rng, rng.randint(2, 12)))
+        size += len(paragraphs[-1]) + 2
+    document = Document(page_content="\n\n".join(paragraphs), metadata={"source": "dump.txt"})
+
+    baseline = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True,
+    )
+    baseline_s, expected = _best_time(lambda: baseline.split_documents([document]), args.repeat)
+    offset_s, chunks = _best_time(lambda: OffsetTextSplitter().split_documents([document]), args.repeat)
+    mb = len(document.page_content) / 1e6
+    print(json.dumps({
+        "mb": round(mb, 1),
+        "chunks": len(chunks),
+        "recursive_mb_per_s": round(mb / baseline_s, 1),
+        "offset_mb_per_s": round(mb / offset_s, 1),
+        "speedup": round(baseline_s / offset_s, 2),
+        "same_chunks": [c.page_content for c in chunks] == [c.page_content for c in expected],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
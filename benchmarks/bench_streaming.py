@@ -0,0 +1,61 @@
+"""Measure time-to-first-token for ask vs ask_stream against a local fake LLM.
+
+Usage: python -m benchmarks.bench_streaming [--questions 10] [--first-token 0.3] [--token 0.01]
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.chatbot import create_chatbot, ask, ask_stream
+from src.document_loader import load_documents, split_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--first-token", type=float, default=0.3)
+    parser.add_argument("--token", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, 20)
+        chunks = split_documents(load_documents(folder))
+    vector_store = InMemoryVectorStore.from_documents(chunks, HashingEmbeddings())
+    llm = FakeChatModel(first_token_delay=args.first_token, token_delay=args.token)
+    chatbot = create_chatbot(vector_store, llm=llm)
+    questions = [f"question {i} about vector index latency" for i in range(args.questions)]
+
+    blocking, first_token, sources_at, total = [], [], [], []
+    for question in questions:
+        start = time.perf_counter()
+        ask(chatbot, question)
+        blocking.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        seen_token = False
+        for event in ask_stream(chatbot, question):
+            if event["type"] == "sources":
+                sources_at.append(time.perf_counter() - start)
+            elif event["type"] == "token" and not seen_token:
+                first_token.append(time.perf_counter() - start)
+                seen_token = True
+        total.append(time.perf_counter() - start)
+
+    ms = lambda xs: round(statistics.median(xs) * 1000, 1)
+    print(json.dumps({
+        "questions": args.questions,
+        "ask_p50_ms": ms(blocking),
+        "stream_sources_p50_ms": ms(sources_at),
+        "stream_first_token_p50_ms": ms(first_token),
+        "stream_total_p50_ms": ms(total),
+        "ttft_speedup": round(statistics.median(blocking) / statistics.median(first_token), 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
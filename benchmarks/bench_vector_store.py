@@ -0,0 +1,76 @@
+"""Compare top-k query latency of Chroma and the NumPy backend on random 384-dim vectors.
+
+Usage: python -m benchmarks.bench_vector_store [--sizes 10000 100000] [--queries 200] [--k 3]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from benchmarks.fakes import HashingEmbeddings
+from benchmarks.report import percentiles
+from src.numpy_store import NumpyVectorStore
+
+DIM = 384
+ADD_BATCH = 5000
+
+
+def _time_queries(search, queries) -> dict:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = []
+    for size in args.sizes:
+        vectors = rng.normal(size=(size, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        texts = [f"chunk {i}" for i in range(size)]
+        ids = [str(i) for i in range(size)]
+        queries = rng.normal(size=(args.queries, DIM)).astype(np.float32).tolist()
+        row = {"vectors": size}
+
+        with tempfile.TemporaryDirectory() as directory:
+            chroma = Chroma(collection_name=f"bench-{size}", embedding_function=HashingEmbeddings(DIM),
+                            persist_directory=directory)
+            for start in range(0, size, ADD_BATCH):
+                end = start + ADD_BATCH
+                chroma._collection.add(ids=ids[start:end], embeddings=vectors[start:end],
+                                       documents=texts[start:end])
+            row["chroma"] = _time_queries(
+                lambda q: chroma.similarity_search_by_vector(q, k=args.k), queries)
+            chroma.delete_collection()
+
+        for dtype in ("float32", "float16", "int8"):
+            with tempfile.TemporaryDirectory() as directory:
+                store = NumpyVectorStore(HashingEmbeddings(DIM), directory, dtype)
+                for start in range(0, size, ADD_BATCH):
+                    end = start + ADD_BATCH
+                    store.add_embeddings(texts[start:end], vectors[start:end], ids=ids[start:end])
+                start = time.perf_counter()
+                reopened = NumpyVectorStore(HashingEmbeddings(DIM), directory, dtype)
+                open_ms = round((time.perf_counter() - start) * 1000, 3)
+                row[f"numpy_{dtype}"] = dict(
+                    _time_queries(lambda q: reopened.similarity_search_by_vector(q, k=args.k), queries),
+                    open_ms=open_ms,
+                )
+        report.append(row)
+        print(json.dumps(row), flush=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Synthetic corpus generator for benchmarks."""
+
+import os
+import random
+from langchain_core.documents import Document
+
+WORDS = (
+    "retrieval augmented generation embedding vector index chunk query answer "
+    "model context token latency throughput document source manual section "
+    "error code configuration parameter cluster deployment pipeline cache"
+).split()
+
+
+def make_paragraph(rng: random.Random, sentences: int = 5) -> str:
+    """Generate a paragraph of pseudo-English sentences."""
+    lines = []
+    for _ in range(sentences):
+        words = rng.choices(WORDS, k=rng.randint(8, 16))
+        lines.append(" ".join(words).capitalize() + ".")
+    return " ".join(lines)
+
+
+def write_text_file(path: str, rng: random.Random, paragraphs: int = 10) -> None:
+    """Write a plain-text document."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(make_paragraph(rng) for _ in range(paragraphs)))
+
+
+def write_pdf_file(path: str, rng: random.Random, pages: int = 10, lines_per_page: int = 40) -> None:
+    """Write a minimal text-only PDF without any PDF library."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for _ in range(pages):
+        ops = ["BT /F1 10 Tf 14 TL 50 800 Td"]
+        for _ in range(lines_per_page):
+            line = " ".join(rng.choices(WORDS, k=10))
+            ops.append(f"({line}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(folder: str, num_docs: int, pdf_ratio: float = 0.0,
+                    pdf_pages: int = 10, seed: int = 0) -> list:
+    """Fill a folder with a reproducible mix of text and PDF documents."""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    names = []
+    for i in range(num_docs):
+        if rng.random() < pdf_ratio:
+            name = f"doc_{i:06d}.pdf"
+            write_pdf_file(os.path.join(folder, name), rng, pages=pdf_pages)
+        else:
+            name = f"doc_{i:06d}.txt"
+            write_text_file(os.path.join(folder, name), rng)
+        names.append(name)
+    return names
+
+
+def generate_documents(num_docs: int, paragraphs: int = 4, seed: int = 0) -> list:
+    """Build a reproducible in-memory corpus without touching the disk."""
+    rng = random.Random(seed)
+    return [
+        Document(
+            page_content="\n\n".join(make_paragraph(rng) for _ in range(paragraphs)),
+            metadata={"source": f"doc_{i:06d}.txt"},
+        )
+        for i in range(num_docs)
+    ]
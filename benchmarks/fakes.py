@@ -0,0 +1,77 @@
+"""Offline stand-ins for the embedding model and Claude."""
+
+import asyncio
+import hashlib
+import math
+import re
+import time
+from collections.abc import AsyncIterator, Iterator
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Tiny bag-of-words embedder: fast, deterministic, and retrieval-meaningful."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        vector = [0.0] * self.dim
+        for word in _TOKEN.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model with configurable first-token and per-token delays.
+
+    The answer is derived from the prompt, so identical prompts always give
+    identical answers, and it streams one word at a time.
+    """
+
+    first_token_delay: float = 0.3
+    token_delay: float = 0.01
+    answer_words: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _words(self, messages: list) -> list:
+        prompt = "".join(str(m.content) for m in messages)
+        seed = hashlib.sha256(prompt.encode()).hexdigest()
+        return [f"w{seed[i % 60:i % 60 + 4]}" for i in range(self.answer_words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        words = self._words(messages)
+        time.sleep(self.first_token_delay + self.token_delay * len(words))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(words)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        words = self._words(messages)
+        await asyncio.sleep(self.first_token_delay + self.token_delay * len(words))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(words)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator:
+        time.sleep(self.first_token_delay)
+        for i, word in enumerate(self._words(messages)):
+            if i:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator:
+        await asyncio.sleep(self.first_token_delay)
+        for i, word in enumerate(self._words(messages)):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
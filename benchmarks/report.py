@@ -0,0 +1,50 @@
+"""Shared measurement helpers for the benchmark suite."""
+
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def percentiles(samples: list) -> dict:
+    """p50/p95/p99 of latency samples, in milliseconds."""
+    if len(samples) < 2:
+        value = round(samples[0] * 1000, 3) if samples else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def measure(result: dict, items: int = None):
+    """Record wall time, throughput and peak traced memory for a block.
+
+    ``items`` may also be filled in afterwards via ``result["items"]``.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        items = result.pop("items", items)
+        result["seconds"] = round(elapsed, 4)
+        if items is not None:
+            result["items"] = items
+            result["per_second"] = round(items / elapsed, 2) if elapsed else None
+        result["peak_traced_mb"] = round(peak / (1024 * 1024), 2)
+        result["max_rss_mb"] = max_rss_mb()
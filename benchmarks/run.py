@@ -0,0 +1,160 @@
+"""Offline end-to-end benchmark suite: splitting, indexing, retrieval and answering.
+
+Runs against a synthetic corpus, a deterministic fake LLM and (by default) a
+tiny hashing embedder, so results are reproducible without network access.
+Writes a JSON report suitable for comparing releases.
+
+Usage:
+    python -m benchmarks.run [--sizes 10 1000 100000] [--embedder fake|minilm]
+                             [--queries 50] [--llm-latency 0.0] [--output report.json]
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import uuid
+from benchmarks.corpus import WORDS, generate_documents
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings
+from benchmarks.report import measure, percentiles
+from src.chatbot import create_chatbot, ask
+from src.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDING_MODEL, TOP_K, CONTEXT_FETCH_K, CONTEXT_TOKEN_BUDGET,
+)
+from src.context import estimate_tokens, pack_context, _WORD
+from src.document_loader import split_documents
+from src.vector_store import create_vector_store
+
+
+def make_embeddings(name: str):
+    if name == "fake":
+        return HashingEmbeddings()
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def make_queries(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=6)) + "?" for _ in range(count)]
+
+
+def _words(text: str) -> set:
+    return set(_WORD.findall(text.lower()))
+
+
+def compare_context(retriever, queries: list, budget: int = CONTEXT_TOKEN_BUDGET) -> dict:
+    """The fixed top-TOP_K "stuff" context vs. packing CONTEXT_FETCH_K chunks into ``budget``.
+
+    Reports tokens sent and how much of the retrieved text they cover: a
+    chunk is covered when its whole text reaches the prompt (the best one
+    must always be), ``top_k_covered`` is the share of the fixed context's
+    chunks that packing still sends, and ``retrieved_words_covered`` the
+    share of the distinct words of all retrieved chunks that reach it.
+    """
+    rows = {"fixed_top_k": [], "packed": []}
+    for query in queries:
+        docs = retriever.invoke(query)
+        retrieved = _words(" ".join(doc.page_content for doc in docs))
+        for name, context in (("fixed_top_k", docs[:TOP_K]), ("packed", pack_context(docs, budget))):
+            text = "\n".join(doc.page_content for doc in context)
+            covered = [doc.page_content in text for doc in docs]
+            words = _words(text)
+            rows[name].append((estimate_tokens(text), sum(covered), covered[0],
+                               sum(covered[:TOP_K]) / len(covered[:TOP_K]), len(words & retrieved) / len(retrieved)))
+    return {
+        name: {
+            "mean_tokens": round(sum(row[0] for row in values) / len(values), 1),
+            "mean_chunks_covered": round(sum(row[1] for row in values) / len(values), 2),
+            "best_chunk_covered": sum(row[2] for row in values) / len(values),
+            "top_k_covered": round(sum(row[3] for row in values) / len(values), 3),
+            "retrieved_words_covered": round(sum(row[4] for row in values) / len(values), 3),
+        }
+        for name, values in rows.items()
+    }
+
+
+def time_calls(func, inputs: list) -> list:
+    samples = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_size(num_docs: int, args) -> dict:
+    result = {"docs": num_docs}
+    documents = generate_documents(num_docs, seed=num_docs)
+
+    with measure(result.setdefault("split", {})) as split:
+        chunks = split_documents(documents)
+        split["items"] = len(chunks)
+
+    with measure(result.setdefault("index", {}), items=len(chunks)):
+        vector_store = create_vector_store(
+            chunks,
+            embeddings=make_embeddings(args.embedder),
+            collection_name=f"bench-{uuid.uuid4().hex}",
+        )
+
+    queries = make_queries(args.queries)
+    retriever = vector_store.as_retriever(search_kwargs={"k": CONTEXT_FETCH_K})
+    with measure(result.setdefault("retrieve", {}), items=len(queries)) as retrieve:
+        retrieve.update(percentiles(time_calls(retriever.invoke, queries)))
+    result["context"] = compare_context(retriever, queries)
+
+    chatbot = create_chatbot(vector_store, llm=FakeChatModel(first_token_delay=args.llm_latency, token_delay=0))
+    with measure(result.setdefault("ask", {}), items=len(queries)) as answer:
+        answer.update(percentiles(time_calls(lambda q: ask(chatbot, q), queries)))
+
+    vector_store.delete_collection()
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--embedder", choices=["fake", "minilm"], default="fake")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # Pay one-off client start-up before anything is timed.
+    run_size(1, argparse.Namespace(**dict(vars(args), queries=1)))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "embedder": args.embedder,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "top_k": TOP_K,
+            "context_fetch_k": CONTEXT_FETCH_K,
+            "context_token_budget": CONTEXT_TOKEN_BUDGET,
+            "llm_latency_s": args.llm_latency,
+        },
+        "results": [run_size(size, args) for size in args.sizes],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
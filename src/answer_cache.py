@@ -0,0 +1,133 @@
+"""Answer cache module - serves repeated questions without calling the LLM."""
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from src.config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD
+from src.embedding_cache import normalize_text
+from src.vector_store import get_embeddings
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for exact-match lookups."""
+    return normalize_text(question).lower().rstrip("?!. ")
+
+
+class AnswerCache:
+    """Answers keyed by corpus fingerprint and question.
+
+    A question hits when its normalized text matches a stored one exactly,
+    or, if an embedding model is given, when its embedding is within
+    ``threshold`` cosine similarity of a stored question for the same corpus.
+    Callers that already embedded a question (see embed_questions) pass its
+    vector to get and put so it is not embedded again.
+    Entries expire after ``ttl`` seconds and the least recently used are
+    dropped beyond ``max_entries``. A new fingerprint never sees answers
+    built from older documents.
+    """
+
+    def __init__(self, embeddings=None, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_SIZE,
+                 clock=time.monotonic):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._counts = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def get(self, question: str, fingerprint: str, vector: np.ndarray = None):
+        """Return a cached result for the question, or None."""
+        key = (fingerprint, normalize_question(question))
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counts["exact_hits"] += 1
+                return entry["result"]
+            if self.embeddings is None or not self._entries:
+                self._counts["misses"] += 1
+                return None
+            candidates = [
+                (k, e["vector"]) for k, e in self._entries.items() if k[0] == fingerprint
+            ]
+
+        if candidates:
+            vector = self._embed(question) if vector is None else vector
+            scores = np.stack([v for _, v in candidates]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                with self._lock:
+                    entry = self._entries.get(candidates[best][0])
+                    if entry is not None:
+                        self._entries.move_to_end(candidates[best][0])
+                        self._counts["semantic_hits"] += 1
+                        return entry["result"]
+        with self._lock:
+            self._counts["misses"] += 1
+        return None
+
+    def put(self, question: str, fingerprint: str, result: dict, vector: np.ndarray = None) -> None:
+        """Store a result for the question."""
+        if vector is None and self.embeddings is not None:
+            vector = self._embed(question)
+        key = (fingerprint, normalize_question(question))
+        with self._lock:
+            self._entries[key] = {
+                "result": result,
+                "vector": vector,
+                "expires": self._clock() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for the cache."""
+        with self._lock:
+            hits = self._counts["exact_hits"] + self._counts["semantic_hits"]
+            lookups = hits + self._counts["misses"]
+            return dict(
+                self._counts,
+                hit_rate=hits / lookups if lookups else 0.0,
+                entries=len(self._entries),
+            )
+
+    def embed_questions(self, questions: list) -> list:
+        """Vectors for get and put, embedding all the questions in one call if the model can."""
+        if self.embeddings is None or not questions:
+            return [None] * len(questions)
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries is None:
+            return [self._embed(question) for question in questions]
+        return [_unit(vector) for vector in embed_queries(questions)]
+
+    def _embed(self, question: str) -> np.ndarray:
+        return _unit(self.embeddings.embed_query(question))
+
+    def _expire(self) -> None:
+        now = self._clock()
+        for key in [k for k, e in self._entries.items() if e["expires"] <= now]:
+            del self._entries[key]
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the process-wide answer cache, shared by every session."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(get_embeddings())
+    return _cache
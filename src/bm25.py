@@ -0,0 +1,282 @@
+"""BM25 module - lexical inverted index for hybrid retrieval."""
+
+import json
+import os
+import re
+import threading
+import weakref
+from array import array
+from collections import Counter
+import numpy as np
+from src.config import BM25_K1, BM25_B, BM25_MAX_POSTINGS
+
+LEXICAL_FILENAME = "bm25.npz"
+TOKENIZER_VERSION = 1
+
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+_indexes = weakref.WeakKeyDictionary()
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens; compounds like ``ERR-404`` also yield their parts."""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-./]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over chunks, keyed by chunk id.
+
+    Postings are kept per term as flat arrays (doc numbers, term frequencies
+    and precomputed tf/length weights) sliced by an offsets array, so a
+    query only touches the postings of its own terms. Chunks added since the
+    last compaction go to small append-only ``array`` buffers per term, and
+    deleted chunks are masked out until the next compaction, so updates
+    never rewrite the whole index. ``save`` compacts and writes everything
+    to a single ``.npz`` file.
+
+    A term found in more than ``max_postings`` chunks is scored only on its
+    ``max_postings`` highest-weighted postings, cached until the next
+    update, so a query of common words costs about the same at any corpus
+    size. Scores are exact for single-term queries; a chunk outside some
+    term's slice misses that term's (low-idf) share. Length normalization
+    uses the average chunk length as of the last compaction, so every
+    posting is weighted alike until ``save`` refreshes it.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B, max_postings: int = BM25_MAX_POSTINGS):
+        self.k1 = k1
+        self.b = b
+        self.max_postings = max_postings
+        self._lock = threading.Lock()
+        self._terms = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._delta = {}
+        self._doc_ids = []
+        self._numbers = {}
+        self._lengths = array("i")
+        self._live = bytearray()
+        self._live_count = 0
+        self._total_length = 0
+        self._avg_length = 0.0  # as of the last compaction; 0 until then
+        self._impacts = {}
+        self._dirty = False
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._numbers
+
+    def count(self) -> int:
+        """Number of indexed chunks."""
+        return self._live_count
+
+    def add(self, chunk_ids: list, texts: list) -> None:
+        """Index chunks; ids already present are skipped."""
+        with self._lock:
+            for chunk_id, text in zip(chunk_ids, texts):
+                if chunk_id in self._numbers:
+                    continue
+                number = len(self._doc_ids)
+                tokens = tokenize(text)
+                self._doc_ids.append(chunk_id)
+                self._numbers[chunk_id] = number
+                self._lengths.append(len(tokens))
+                self._live.append(1)
+                self._live_count += 1
+                self._total_length += len(tokens)
+                for term, tf in Counter(tokens).items():
+                    term_number = self._terms.setdefault(term, len(self._terms))
+                    docs, tfs = self._delta.setdefault(term_number, (array("i"), array("i")))
+                    docs.append(number)
+                    tfs.append(tf)
+                self._dirty = True
+            self._impacts.clear()
+
+    def delete(self, chunk_ids: list) -> None:
+        """Remove chunks from the index."""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                number = self._numbers.pop(chunk_id, None)
+                if number is None:
+                    continue
+                self._live[number] = 0
+                self._live_count -= 1
+                self._total_length -= self._lengths[number]
+                self._dirty = True
+            self._impacts.clear()
+
+    def search(self, query: str, k: int) -> list:
+        """Return the top-k (chunk id, score) pairs for a query, best first."""
+        with self._lock:
+            if not self._live_count or k <= 0:
+                return []
+            # Work only on the postings of the query terms, never on every chunk.
+            terms = [self._terms[t] for t in set(tokenize(query)) if t in self._terms]
+            # Terms in over half the chunks carry almost no weight (classic
+            # BM25 clamps their idf to zero); skip them unless nothing else matched.
+            selective = [t for t in terms if self._document_frequency(t) * 2 <= self._live_count]
+            matched, contributions = [], []
+            for term in selective or terms:
+                docs, weights, frequency = self._top_postings(term)
+                if not len(docs):
+                    continue
+                idf = np.log1p((self._live_count - frequency + 0.5) / (frequency + 0.5))
+                matched.append(docs)
+                contributions.append(idf * weights)
+            if not matched:
+                return []
+            if sum(len(d) for d in matched) * 8 < len(self._doc_ids):
+                docs, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate(contributions))
+            else:
+                # Frequent terms touch most chunks; a dense accumulator beats sorting.
+                scores = np.zeros(len(self._doc_ids))
+                for term_docs, term_scores in zip(matched, contributions):
+                    scores[term_docs] += term_scores
+                docs = np.flatnonzero(scores)
+                scores = scores[docs]
+            top = np.arange(len(scores))
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._doc_ids[docs[i]], float(scores[i])) for i in top]
+
+    def save(self, path: str) -> None:
+        """Compact the index and write it to ``path`` atomically."""
+        with self._lock:
+            if not self._dirty and os.path.exists(path):
+                return
+            self._compact()
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(
+                tmp_path,
+                meta=np.array(json.dumps({"tokenizer": TOKENIZER_VERSION})),
+                terms=np.array(list(self._terms), dtype=str),
+                offsets=self._offsets,
+                docs=self._docs,
+                tfs=self._tfs,
+                doc_ids=np.array(self._doc_ids, dtype=str),
+                lengths=np.frombuffer(self._lengths, dtype=np.int32),
+            )
+            os.replace(tmp_path, path)
+            self._dirty = False
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "BM25Index":
+        """Load a saved index, or return an empty one if it is missing or stale."""
+        index = cls(**kwargs)
+        try:
+            with np.load(path) as data:
+                if json.loads(str(data["meta"])).get("tokenizer") != TOKENIZER_VERSION:
+                    return index
+                index._terms = {term: i for i, term in enumerate(data["terms"].tolist())}
+                index._offsets = data["offsets"]
+                index._docs = data["docs"]
+                index._tfs = data["tfs"]
+                index._doc_ids = data["doc_ids"].tolist()
+                index._lengths = array("i", data["lengths"].tobytes())
+        except (OSError, KeyError, ValueError):
+            return cls(**kwargs)
+        index._numbers = {chunk_id: i for i, chunk_id in enumerate(index._doc_ids)}
+        index._live = bytearray(b"\x01" * len(index._doc_ids))
+        index._live_count = len(index._doc_ids)
+        index._total_length = int(np.frombuffer(index._lengths, dtype=np.int32).sum())
+        index._avg_length = index._total_length / max(index._live_count, 1)
+        index._weights = index._term_weights(index._docs, index._tfs)
+        return index
+
+    def _document_frequency(self, term_number: int) -> int:
+        """Postings count of a term, deleted chunks included until compaction."""
+        frequency = 0
+        if term_number + 1 < len(self._offsets):
+            frequency = int(self._offsets[term_number + 1] - self._offsets[term_number])
+        delta = self._delta.get(term_number)
+        return frequency + (len(delta[0]) if delta is not None else 0)
+
+    def _postings(self, term_number: int) -> tuple:
+        """Doc numbers and BM25 term weights (before idf) of live chunks with a term."""
+        start = end = 0
+        if term_number + 1 < len(self._offsets):
+            start, end = self._offsets[term_number], self._offsets[term_number + 1]
+        docs, weights = self._docs[start:end], self._weights[start:end]
+        delta = self._delta.get(term_number)
+        if delta is not None:
+            delta_docs = np.frombuffer(delta[0], dtype=np.int32)
+            delta_tfs = np.frombuffer(delta[1], dtype=np.int32)
+            docs = np.concatenate([docs, delta_docs])
+            weights = np.concatenate([weights, self._term_weights(delta_docs, delta_tfs)])
+        if self._live_count < len(self._doc_ids):
+            alive = np.frombuffer(self._live, dtype=np.uint8)[docs].astype(bool)
+            docs, weights = docs[alive], weights[alive]
+        return docs, weights
+
+    def _top_postings(self, term_number: int) -> tuple:
+        """A term's postings, cut to the ``max_postings`` highest-weighted, and its document frequency."""
+        cached = self._impacts.get(term_number)
+        if cached is not None:
+            return cached
+        docs, weights = self._postings(term_number)
+        frequency = len(docs)
+        if self.max_postings is None or frequency <= self.max_postings:
+            return docs, weights, frequency
+        top = np.argpartition(-weights, self.max_postings - 1)[:self.max_postings]
+        self._impacts[term_number] = docs[top], weights[top], frequency
+        return self._impacts[term_number]
+
+    def _term_weights(self, docs: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        """The tf and length-normalization part of each posting's BM25 score."""
+        if not len(docs):
+            return np.zeros(0, dtype=np.float32)
+        # Before the first compaction every posting is weighted at query time,
+        # so the live average is consistent; afterwards it stays fixed.
+        avg_length = self._avg_length or self._total_length / max(self._live_count, 1)
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)[docs]
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        return (tfs * (self.k1 + 1) / (tfs + norm)).astype(np.float32)
+
+    def _compact(self) -> None:
+        """Fold buffered postings into the flat arrays and drop deleted chunks."""
+        nterms = len(self._terms)
+        base_terms = np.repeat(np.arange(len(self._offsets) - 1), np.diff(self._offsets))
+        delta_terms = [np.full(len(docs), t) for t, (docs, _) in self._delta.items()]
+        terms = np.concatenate([base_terms] + delta_terms).astype(np.int64)
+        docs = np.concatenate([self._docs] + [np.frombuffer(d, np.int32) for d, _ in self._delta.values()])
+        tfs = np.concatenate([self._tfs] + [np.frombuffer(t, np.int32) for _, t in self._delta.values()])
+
+        live = np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+        renumber = np.cumsum(live, dtype=np.int64) - 1
+        keep = live[docs]
+        terms, docs, tfs = terms[keep], renumber[docs[keep]].astype(np.int32), tfs[keep]
+        order = np.lexsort((docs, terms))
+        self._docs, self._tfs = docs[order], tfs[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=nterms))]).astype(np.int64)
+        self._delta = {}
+
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)[live]
+        self._doc_ids = [chunk_id for chunk_id, alive in zip(self._doc_ids, live) if alive]
+        self._numbers = {chunk_id: i for i, chunk_id in enumerate(self._doc_ids)}
+        self._lengths = array("i", lengths.tobytes())
+        self._live = bytearray(b"\x01" * len(self._doc_ids))
+        self._avg_length = self._total_length / max(self._live_count, 1)
+        self._impacts = {}
+        self._weights = self._term_weights(self._docs, self._tfs)
+
+
+def attach_lexical_index(vector_store, index: BM25Index) -> None:
+    """Associate a lexical index with the vector store holding the same chunks."""
+    _indexes[vector_store] = index
+
+
+def get_lexical_index(vector_store):
+    """The lexical index attached to a vector store, if any."""
+    try:
+        return _indexes.get(vector_store)
+    except TypeError:
+        return None
@@ -1,31 +1,460 @@
 """Chatbot module - creates the RAG chain."""
 
-from langchain_anthropic import ChatAnthropic
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
 from langchain_classic.chains import RetrievalQA
 from langchain_community.vectorstores import Chroma
-from src.config import LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS, TOP_K
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from src import metrics
+from src.answer_cache import AnswerCache
+from src.bm25 import get_lexical_index
+from src.context import ContextPackingRetriever
+from src.config import (
+    LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS, TOP_K, RETRIEVAL_MODE,
+    CONTEXT_FETCH_K, CONTEXT_TOKEN_BUDGET,
+    RERANK, RERANK_FETCH_K, HYBRID_FETCH_K,
+    ASK_MAX_CONCURRENCY, ASK_MAX_RETRIES, ASK_BACKOFF_BASE, CHATBOT_CACHE_SIZE,
+)
+from src.numpy_store import NumpyVectorStore
+from src.reranker import RerankingRetriever, get_reranker
+from src.retrieval_cache import CachedRetriever, get_retrieval_cache
+from src.retriever import HybridRetriever, MountedRetriever
 
 
-def create_chatbot(vector_store: Chroma) -> RetrievalQA:
-    """Create a RAG chatbot from a vector store."""
-    llm = ChatAnthropic(
-        model=LLM_MODEL,
-        temperature=LLM_TEMPERATURE,
-        max_tokens=LLM_MAX_TOKENS,
-    )
+_llms = {}
+_chatbots = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_llm() -> BaseChatModel:
+    """Return the shared Claude client for the current settings.
+
+    Reusing one client keeps its HTTP connection pool warm across questions,
+    sessions and reruns. The Anthropic SDK is slow to import, so it is only
+    imported here, on first use.
+    """
+    key = (LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS)
+    with _cache_lock:
+        if key not in _llms:
+            from langchain_anthropic import ChatAnthropic
+            _llms[key] = ChatAnthropic(
+                model=LLM_MODEL,
+                temperature=LLM_TEMPERATURE,
+                max_tokens=LLM_MAX_TOKENS,
+            )
+        return _llms[key]
+
+
+def get_chatbot(vector_store: Chroma, mounts: tuple = (), fingerprint: str = None) -> RetrievalQA:
+    """Return the cached chatbot for a vector store, creating it on first use.
+
+    Chains are cached per vector store, mounted stores, fingerprint and
+    settings; the least recently used beyond CHATBOT_CACHE_SIZE are
+    dropped. Call invalidate_chatbots when a cached chain must not be reused.
+    """
+    stores = (vector_store, *mounts)
+    key = (tuple(map(id, stores)), fingerprint, LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS,
+           RETRIEVAL_MODE, CONTEXT_FETCH_K, CONTEXT_TOKEN_BUDGET, RERANK)
+    with _cache_lock:
+        entry = _chatbots.get(key)
+        # The id check alone could match a new store reusing a freed address.
+        if entry is not None and all(a is b for a, b in zip(entry[0], stores)):
+            _chatbots.move_to_end(key)
+            return entry[1]
+
+    chatbot = create_chatbot(vector_store, mounts=mounts, fingerprint=fingerprint)
+    with _cache_lock:
+        _chatbots[key] = (stores, chatbot)
+        while len(_chatbots) > CHATBOT_CACHE_SIZE:
+            _chatbots.popitem(last=False)
+    return chatbot
 
+
+def invalidate_chatbots(vector_store: Chroma = None) -> None:
+    """Drop cached chatbots for one vector store, or all of them."""
+    with _cache_lock:
+        for key in [k for k, (stores, _) in _chatbots.items()
+                    if vector_store is None or any(vs is vector_store for vs in stores)]:
+            del _chatbots[key]
+
+
+def create_chatbot(vector_store: Chroma, llm: BaseChatModel = None,
+                   rerank: bool = RERANK, mounts: tuple = (), fingerprint: str = None) -> RetrievalQA:
+    """Create a RAG chatbot from a vector store, using Claude unless given an LLM.
+
+    When the store has a BM25 index attached and RETRIEVAL_MODE is "hybrid",
+    lexical and dense results are fused; otherwise retrieval is dense only.
+    Stores in ``mounts`` (shared base corpora) are searched the same way and
+    their results fused with the store's own. Given the corpus
+    ``fingerprint``, retrieved chunk ids are cached per question in the
+    process-wide retrieval cache. CONTEXT_FETCH_K chunks are retrieved, or
+    with ``rerank`` RERANK_FETCH_K, of which a cross-encoder keeps the best
+    CONTEXT_FETCH_K. These are then packed into at most CONTEXT_TOKEN_BUDGET
+    tokens of context (see src.context.pack_context).
+    """
+    if llm is None:
+        llm = get_llm()
+
+    k = RERANK_FETCH_K if rerank else CONTEXT_FETCH_K
+    retriever = _store_retriever(vector_store, k)
+    if mounts:
+        retrievers = [retriever] + [_store_retriever(store, k) for store in mounts]
+        retriever = MountedRetriever(retrievers=retrievers, k=k)
+    if fingerprint is not None:
+        retriever = CachedRetriever(retriever=retriever, cache=get_retrieval_cache(),
+                                    fingerprint=fingerprint, stores=[vector_store, *mounts], k=k)
+    if rerank:
+        retriever = RerankingRetriever(retriever=retriever, reranker=get_reranker(), k=CONTEXT_FETCH_K)
     return RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
-        retriever=vector_store.as_retriever(search_kwargs={"k": TOP_K}),
+        retriever=ContextPackingRetriever(retriever=retriever, budget=CONTEXT_TOKEN_BUDGET),
         return_source_documents=True,
     )
 
 
-def ask(chatbot: RetrievalQA, question: str) -> dict:
-    """Ask a question and return the result with sources."""
-    result = chatbot.invoke({"query": question})
-    return {
-        "answer": result["result"],
-        "sources": result.get("source_documents", []),
-    }
+def ask(chatbot: RetrievalQA, question: str, cache: AnswerCache = None,
+        fingerprint: str = None) -> dict:
+    """Ask a question and return the result with sources.
+
+    When an answer cache and the corpus fingerprint are given, repeated (or
+    closely paraphrased) questions are answered without calling the LLM.
+    The result carries a ``trace`` with the time spent in each stage.
+    """
+    with metrics.trace("ask") as current:
+        cached = _cache_lookup(cache, question, fingerprint)
+        if cached is None:
+            docs = _retrieve(chatbot, question)
+            with metrics.stage("prompt"):
+                prompt = _build_prompt(chatbot, question, docs)
+            with metrics.stage("llm"):
+                message = _llm(chatbot).invoke(prompt)
+            _count_tokens(message)
+            answer = {"answer": message.text, "sources": docs, "cached": False}
+            if cache is not None:
+                cache.put(question, fingerprint, answer)
+    result = dict(cached, cached=True) if cached is not None else dict(answer)
+    return dict(result, trace=current.to_dict())
+
+
+def ask_stream(chatbot: RetrievalQA, question: str, cache: AnswerCache = None,
+               fingerprint: str = None) -> Iterator:
+    """Ask a question, yielding events as the answer is produced.
+
+    Yields a ``sources`` event as soon as retrieval finishes, a ``token``
+    event for each piece of the answer as the LLM streams it, and a final
+    ``done`` event carrying the same dict ``ask`` would return.
+    """
+    current = metrics.Trace("ask")
+    with metrics.activate(current):
+        cached = _cache_lookup(cache, question, fingerprint)
+    if cached is not None:
+        metrics.finish(current)
+        yield {"type": "sources", "sources": cached["sources"]}
+        yield {"type": "token", "text": cached["answer"]}
+        yield {"type": "done", **cached, "cached": True, "trace": current.to_dict()}
+        return
+
+    with metrics.activate(current):
+        docs = _retrieve(chatbot, question)
+        with metrics.stage("prompt"):
+            prompt = _build_prompt(chatbot, question, docs)
+    yield {"type": "sources", "sources": docs}
+
+    # The stream's time includes the consumer's handling of each token, so
+    # "llm" is the answer time the user sees, not pure generation time.
+    parts, message = [], None
+    start = time.perf_counter()
+    for chunk in _llm(chatbot).stream(prompt):
+        if message is None:
+            first_token = time.perf_counter() - start
+        message = chunk if message is None else message + chunk
+        if chunk.text:
+            parts.append(chunk.text)
+            yield {"type": "token", "text": chunk.text}
+
+    with metrics.activate(current):
+        if message is not None:
+            metrics.record_stage("llm_first_token", first_token)
+            _count_tokens(message)
+        metrics.record_stage("llm", time.perf_counter() - start)
+    answer = {"answer": "".join(parts), "sources": docs, "cached": False}
+    if cache is not None:
+        cache.put(question, fingerprint, answer)
+    metrics.finish(current)
+    yield {"type": "done", **answer, "trace": current.to_dict()}
+
+
+async def aask(chatbot: RetrievalQA, question: str, cache: AnswerCache = None,
+               fingerprint: str = None, max_retries: int = ASK_MAX_RETRIES,
+               backoff: float = ASK_BACKOFF_BASE) -> dict:
+    """Async version of ask, retrying rate-limited LLM calls with backoff.
+
+    The question is embedded for the answer cache on a worker thread, once
+    for both the lookup and the store.
+    """
+    with metrics.trace("ask") as current:
+        vector = (await _embed_questions(cache, [question]))[0]
+        cached = _cache_lookup(cache, question, fingerprint, vector)
+        if cached is None:
+            with metrics.stage("retrieve"):
+                docs = await chatbot.retriever.ainvoke(question)
+            metrics.count("retrieved_chunks", len(docs))
+            prompt = _build_prompt(chatbot, question, docs)
+            llm = _llm(chatbot)
+            with metrics.stage("llm"):
+                message = await _with_backoff(lambda: llm.ainvoke(prompt), max_retries, backoff)
+            _count_tokens(message)
+            answer = {"answer": message.text, "sources": docs, "cached": False}
+            if cache is not None:
+                cache.put(question, fingerprint, answer, vector)
+    result = dict(cached, cached=True) if cached is not None else dict(answer)
+    return dict(result, trace=current.to_dict())
+
+
+async def aask_stream(chatbot: RetrievalQA, question: str, cache: AnswerCache = None,
+                      fingerprint: str = None, executor=None) -> AsyncIterator:
+    """Async version of ask_stream, yielding the same events.
+
+    The cache lookup, retrieval and prompt run on ``executor`` (the loop's
+    default one if None), so the event loop only ever waits on the LLM.
+    """
+    loop = asyncio.get_running_loop()
+    current = metrics.Trace("ask")
+
+    def prepare():
+        with metrics.activate(current):
+            cached = _cache_lookup(cache, question, fingerprint)
+            if cached is not None:
+                return cached, None, None
+            docs = _retrieve(chatbot, question)
+            with metrics.stage("prompt"):
+                return None, docs, _build_prompt(chatbot, question, docs)
+
+    cached, docs, prompt = await loop.run_in_executor(executor, prepare)
+    if cached is not None:
+        metrics.finish(current)
+        yield {"type": "sources", "sources": cached["sources"]}
+        yield {"type": "token", "text": cached["answer"]}
+        yield {"type": "done", **cached, "cached": True, "trace": current.to_dict()}
+        return
+    yield {"type": "sources", "sources": docs}
+
+    parts, message = [], None
+    start = time.perf_counter()
+    async for chunk in _llm(chatbot).astream(prompt):
+        if message is None:
+            first_token = time.perf_counter() - start
+        message = chunk if message is None else message + chunk
+        if chunk.text:
+            parts.append(chunk.text)
+            yield {"type": "token", "text": chunk.text}
+
+    with metrics.activate(current):
+        if message is not None:
+            metrics.record_stage("llm_first_token", first_token)
+            _count_tokens(message)
+        metrics.record_stage("llm", time.perf_counter() - start)
+    answer = {"answer": "".join(parts), "sources": docs, "cached": False}
+    if cache is not None:
+        await loop.run_in_executor(executor, cache.put, question, fingerprint, answer)
+    metrics.finish(current)
+    yield {"type": "done", **answer, "trace": current.to_dict()}
+
+
+async def ask_batch(chatbot: RetrievalQA, questions: list, cache: AnswerCache = None,
+                    fingerprint: str = None, max_concurrency: int = ASK_MAX_CONCURRENCY,
+                    max_retries: int = ASK_MAX_RETRIES, backoff: float = ASK_BACKOFF_BASE) -> list:
+    """Answer many questions, returning results in the same order.
+
+    The questions are embedded for the answer cache in one call, and all
+    uncached ones for retrieval in another, both off the event loop; then
+    at most ``max_concurrency`` LLM requests run at once. Rate-limited
+    requests are retried up to ``max_retries`` times with exponential
+    backoff starting at ``backoff`` seconds. A question that still fails gets
+    an ``error`` entry instead of failing the whole batch.
+    """
+    with metrics.trace("ask_batch"):
+        return await _ask_batch(chatbot, questions, cache, fingerprint,
+                                max_concurrency, max_retries, backoff)
+
+
+async def _ask_batch(chatbot, questions, cache, fingerprint, max_concurrency,
+                     max_retries, backoff) -> list:
+    results = [None] * len(questions)
+    pending = []
+    vectors = await _embed_questions(cache, questions)
+    for i, question in enumerate(questions):
+        cached = _cache_lookup(cache, question, fingerprint, vectors[i])
+        if cached is not None:
+            results[i] = dict(cached, cached=True)
+        else:
+            pending.append(i)
+
+    with metrics.stage("retrieve"):
+        all_docs = await asyncio.to_thread(
+            _retrieve_many, chatbot.retriever, [questions[i] for i in pending]
+        )
+    semaphore = asyncio.Semaphore(max_concurrency)
+    llm = _llm(chatbot)
+
+    async def answer(i, docs):
+        prompt = _build_prompt(chatbot, questions[i], docs)
+        try:
+            async with semaphore:
+                with metrics.stage("llm"):
+                    message = await _with_backoff(lambda: llm.ainvoke(prompt), max_retries, backoff)
+        except Exception as e:
+            metrics.count("llm_errors")
+            results[i] = {"answer": None, "sources": docs, "cached": False,
+                          "error": f"{type(e).__name__}: {e}"}
+            return
+        _count_tokens(message)
+        results[i] = {"answer": message.text, "sources": docs, "cached": False}
+        if cache is not None:
+            cache.put(questions[i], fingerprint, results[i], vectors[i])
+
+    await asyncio.gather(*(answer(i, docs) for i, docs in zip(pending, all_docs)))
+    return results
+
+
+def ask_many(chatbot: RetrievalQA, questions: list, **kwargs) -> list:
+    """Blocking wrapper around ask_batch for scripts and batch jobs."""
+    return asyncio.run(ask_batch(chatbot, questions, **kwargs))
+
+
+async def _embed_questions(cache: AnswerCache, questions: list) -> list:
+    """Answer cache vectors for the questions, embedded on a worker thread."""
+    if cache is None:
+        return [None] * len(questions)
+    with metrics.stage("answer_cache"):
+        return await asyncio.to_thread(cache.embed_questions, questions)
+
+
+def _cache_lookup(cache: AnswerCache, question: str, fingerprint: str, vector=None):
+    """Look a question up in the answer cache, counting hits and misses."""
+    if cache is None:
+        return None
+    with metrics.stage("answer_cache"):
+        cached = cache.get(question, fingerprint, vector)
+    metrics.count("answer_cache_hits" if cached is not None else "answer_cache_misses")
+    return cached
+
+
+def _retrieve(chatbot: RetrievalQA, question: str) -> list:
+    """Retrieve documents for a question, splitting out the vector search time."""
+    current = metrics.current_trace()
+    nested = ("retrieval_cache", "embed_query", "lexical_search", "rerank", "pack_context")
+    before = sum(current.stages.get(name, 0.0) for name in nested) if current else 0.0
+    start = time.perf_counter()
+    docs = chatbot.retriever.invoke(question)
+    elapsed = time.perf_counter() - start
+    metrics.record_stage("retrieve", elapsed)
+    if current is not None and "embed_query" in current.stages:
+        other = (sum(current.stages.get(name, 0.0) for name in nested) - before) / 1000
+        metrics.record_stage("vector_search", max(elapsed - other, 0.0))
+    metrics.count("retrieved_chunks", len(docs))
+    return docs
+
+
+def _count_tokens(message) -> None:
+    """Count the prompt and completion tokens the LLM reported, if any."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    for key in ("input_tokens", "output_tokens"):
+        if usage.get(key):
+            metrics.count(key, usage[key])
+
+
+def _llm(chatbot: RetrievalQA) -> BaseChatModel:
+    return chatbot.combine_documents_chain.llm_chain.llm
+
+
+def _build_prompt(chatbot: RetrievalQA, question: str, docs: list):
+    """Format the chain's "stuff" prompt for a question and its documents."""
+    stuff_chain = chatbot.combine_documents_chain
+    inputs = stuff_chain._get_inputs(docs, question=question)
+    return stuff_chain.llm_chain.prompt.format_prompt(**inputs)
+
+
+def _store_retriever(vector_store, k: int):
+    """Hybrid retriever for a store with a BM25 index attached, else dense only."""
+    lexical = get_lexical_index(vector_store)
+    if lexical is not None and RETRIEVAL_MODE == "hybrid":
+        return HybridRetriever(vector_store=vector_store, lexical=lexical, k=k,
+                               fetch_k=max(k, HYBRID_FETCH_K))
+    return vector_store.as_retriever(search_kwargs={"k": k})
+
+
+def _retrieve_many(retriever, questions: list) -> list:
+    """Retrieve documents for many questions with one embedding call."""
+    if isinstance(retriever, ContextPackingRetriever):
+        return [retriever.pack(docs) for docs in _retrieve_many(retriever.retriever, questions)]
+    if isinstance(retriever, RerankingRetriever):
+        return [retriever.rerank(question, docs)
+                for question, docs in zip(questions, _retrieve_many(retriever.retriever, questions))]
+    if isinstance(retriever, CachedRetriever):
+        results = [retriever.lookup(question) for question in questions]
+        missing = [i for i, docs in enumerate(results) if docs is None]
+        fresh = _retrieve_many(retriever.retriever, [questions[i] for i in missing]) if missing else []
+        for i, docs in zip(missing, fresh):
+            retriever.store(questions[i], docs)
+            results[i] = docs
+        return results
+    if isinstance(retriever, MountedRetriever):
+        per_index = [_retrieve_many(r, questions) for r in retriever.retrievers]
+        return [retriever.fuse(list(results)) for results in zip(*per_index)]
+    if isinstance(retriever, HybridRetriever) and questions:
+        dense = _search_many(retriever.vector_store, questions, retriever.fetch_k)
+        return [retriever.fuse(question, docs) for question, docs in zip(questions, dense)]
+    vector_store = getattr(retriever, "vectorstore", None)
+    if not questions or vector_store is None or retriever.search_type != "similarity":
+        return retriever.batch(questions)
+    return _search_many(vector_store, questions, retriever.search_kwargs.get("k", TOP_K))
+
+
+def _search_many(vector_store, questions: list, k: int) -> list:
+    """Dense top-k documents for each question, embedding them in one call."""
+    embeddings = vector_store.embeddings
+    embed = getattr(embeddings, "embed_queries", embeddings.embed_documents)
+    vectors = embed(questions)
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.similarity_search_by_vectors(vectors, k=k)
+    if isinstance(vector_store, Chroma):
+        results = vector_store._collection.query(
+            query_embeddings=vectors, n_results=k, include=["documents", "metadatas"]
+        )
+        return [
+            [Document(page_content=text, metadata=meta or {}) for text, meta in zip(texts, metas)]
+            for texts, metas in zip(results["documents"], results["metadatas"])
+        ]
+    return [vector_store.similarity_search_by_vector(vector, k=k) for vector in vectors]
+
+
+async def _with_backoff(call, max_retries: int, backoff: float):
+    """Await call(), retrying rate-limit and overload errors with backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == max_retries or not _is_rate_limited(e):
+                raise
+            delay = _retry_after(e) or backoff * 2 ** attempt
+            await asyncio.sleep(delay * (1 + random.random() / 4))
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return status in (429, 529) or "RateLimit" in type(error).__name__
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
@@ -13,16 +13,97 @@ LLM_MODEL = "claude-sonnet-4-20250514"
 LLM_TEMPERATURE = 0
 LLM_MAX_TOKENS = 1024
 
+# Batch question answering
+ASK_MAX_CONCURRENCY = 8  # LLM requests in flight at once
+ASK_MAX_RETRIES = 5  # retries for rate-limited requests
+ASK_BACKOFF_BASE = 1.0  # seconds; doubles on every retry
+
 # Embedding settings
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = 64  # chunks embedded and upserted per batch
+EMBEDDING_CACHE_SIZE = 200_000  # cached chunk vectors kept on disk
+EMBEDDING_CACHE_DTYPE = "float16"
+
+QUERY_CACHE_SIZE = 10_000  # question embeddings kept in memory
+QUERY_BATCH_SIZE = 32  # concurrent question embeddings computed in one call
+
+# Loading settings
+LOAD_WORKERS = os.cpu_count() or 1
+PDF_PAGES_PER_TASK = 20
+PARALLEL_LOAD_MIN_PAGES = 50  # PDF pages below which loading stays in-process
 
 # Chunking settings
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Deduplication settings
+DEDUP_THRESHOLD = 0.9  # estimated Jaccard similarity at which chunks count as near-duplicates
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16  # LSH bands; chunks sharing one band of 4 hashes are compared
+
 # Retrieval settings
-TOP_K = 3
+TOP_K = 3  # chunks per question where results are used as they are
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # "chroma", "numpy" or "ivf"
+NUMPY_STORE_DTYPE = "float32"  # "float32", "float16" or "int8"
+DOCSTORE_BLOCK_SIZE = 16 * 1024  # bytes of chunk text compressed together by the NumPy/IVF stores
+DOCSTORE_CACHE_BLOCKS = 1024  # decompressed blocks kept in memory per store (up to ~16 MB)
+
+# Context packing settings
+CONTEXT_FETCH_K = 12  # chunks retrieved per question and packed into the budget
+CONTEXT_TOKEN_BUDGET = 450  # estimated tokens of retrieved text sent per question
+CONTEXT_DEDUP_THRESHOLD = 0.8  # word-trigram overlap above which a chunk is a duplicate
+CHARS_PER_TOKEN = 4  # rough average, for budgeting without a tokenizer
+
+# Reranking settings
+RERANK = os.getenv("RERANK", "") == "1"  # cross-encoder rerank between retrieval and the LLM
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_FETCH_K = 30  # candidates retrieved and scored; the best CONTEXT_FETCH_K are kept
+RERANK_TIMEOUT = 0.5  # seconds; a slower rerank keeps the retrieval order
+RERANK_CACHE_SIZE = 20_000  # cached (question, chunk) scores
+RERANK_MAX_PENDING = 4  # scoring jobs queued or running; beyond this, keep the retrieval order
+
+# Hybrid retrieval settings
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid" (BM25 + dense) or "dense"
+HYBRID_FETCH_K = 20  # candidates fetched from each retriever before fusion
+RRF_K = 60  # reciprocal rank fusion constant
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_MAX_POSTINGS = 2000  # highest-weighted postings scored for a frequent term; None scores all
+
+# Approximate (IVF-PQ) index settings
+IVF_NLIST = 1024  # k-means lists
+IVF_PQ_M = 48  # bytes per vector; must divide the embedding size
+IVF_NPROBE = 16  # lists scanned per query: higher = better recall, slower
+IVF_REFINE = 16  # re-score the best k * IVF_REFINE candidates exactly; 0 disables
+IVF_TRAIN_SIZE = 50_000  # vectors stored exactly before the quantizer is trained
+
+# Answer cache settings
+ANSWER_CACHE_SIZE = 1000
+ANSWER_CACHE_TTL = 24 * 60 * 60  # seconds
+ANSWER_CACHE_THRESHOLD = 0.95  # cosine similarity for paraphrased questions
+RETRIEVAL_CACHE_SIZE = 10_000  # retrieved chunk id lists kept per question
+
+# Shared index settings
+INDEX_CACHE_SIZE = 4  # unused corpora kept loaded for reuse
+INDEX_WORKERS = 1  # background indexing threads
+CHATBOT_CACHE_SIZE = 8  # RAG chains kept for reuse across reruns
+
+# HTTP service settings
+SERVICE_WORKERS = 4  # threads answering questions
+SERVICE_MAX_PENDING = 32  # questions admitted at once, running or queued
+SERVICE_RETRY_AFTER = 1  # seconds clients are told to wait when turned away
+
+# Startup settings
+WARMUP = os.getenv("WARMUP", "1") == "1"  # load models in the background at startup
+
+# Metrics
+METRICS_JSON_LOG = os.getenv("METRICS_JSON_LOG", "") == "1"  # log one JSON line per trace
 
 # Paths
 DOCUMENTS_DIR = "./documents"
 SAMPLE_DIR = "./data/sample"
+TENANTS_DIR = os.getenv("TENANTS_DIR", "./tenants")  # one documents folder per tenant
+# Read-only base corpora searched by every tenant, separated by os.pathsep
+TENANT_MOUNTS = tuple(path for path in os.getenv("TENANT_MOUNTS", "").split(os.pathsep) if path)
+PERSIST_DIR = os.getenv("PERSIST_DIR", "./chroma_db")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./.cache/embeddings")
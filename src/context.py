@@ -0,0 +1,148 @@
+"""Context module - packs retrieved chunks into a token-budgeted prompt context."""
+
+import re
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src import metrics
+from src.config import (
+    CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD, CHARS_PER_TOKEN,
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, without calling a tokenizer."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def pack_context(docs: list, budget: int = CONTEXT_TOKEN_BUDGET,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD) -> list:
+    """Choose and merge ranked chunks so their text fits a token budget.
+
+    ``docs`` are taken best first. A chunk is dropped when it nearly
+    duplicates one already chosen, and only the text it adds to chunks
+    already chosen from the same place counts against the budget, so
+    overlapping chunks cost their overlap once. Chosen chunks that overlap
+    or touch in the same source (and page) are then merged into one
+    document, and the results are returned in the order of their best chunk.
+    """
+    chosen, shingles, spans = [], [], {}
+    used = 0
+    for rank, doc in enumerate(docs):
+        words = _shingles(doc.page_content)
+        if any(_jaccard(words, other) >= dedup_threshold for other in shingles):
+            metrics.count("context_duplicates_dropped")
+            continue
+        span = _span(doc)
+        key = _location(doc)
+        if span is not None:
+            taken = spans.get(key, [])
+            added = _union_length(taken + [span]) - _union_length(taken)
+            cost = -(-added // CHARS_PER_TOKEN)
+        else:
+            cost = estimate_tokens(doc.page_content)
+        if used + cost > budget:
+            if chosen:
+                continue
+            # Never send an empty context: cut the best chunk down to size.
+            doc = Document(page_content=doc.page_content[:budget * CHARS_PER_TOKEN],
+                           metadata=dict(doc.metadata))
+            span, cost = None, budget
+        used += cost
+        chosen.append((rank, doc))
+        shingles.append(words)
+        if span is not None:
+            spans.setdefault(key, []).append(span)
+    metrics.count("context_tokens", used)
+    return _merge(chosen)
+
+
+class ContextPackingRetriever(BaseRetriever):
+    """Over-retrieves from another retriever and packs the results (see pack_context)."""
+
+    retriever: BaseRetriever
+    budget: int = CONTEXT_TOKEN_BUDGET
+    dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> list:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self.pack(docs)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> list:
+        docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return self.pack(docs)
+
+    def pack(self, docs: list) -> list:
+        with metrics.stage("pack_context"):
+            return pack_context(docs, self.budget, self.dedup_threshold)
+
+
+def _merge(chosen: list) -> list:
+    """Merge chosen chunks that overlap or touch, ordered by their best rank."""
+    groups, blocks = {}, []
+    for rank, doc in chosen:
+        if _span(doc) is None:
+            blocks.append((rank, doc))
+        else:
+            groups.setdefault(_location(doc), []).append((rank, doc))
+    for members in groups.values():
+        members.sort(key=lambda member: _span(member[1]))
+        rank, doc = members[0]
+        start, end = _span(doc)
+        text = doc.page_content
+        for next_rank, next_doc in members[1:]:
+            next_start, next_end = _span(next_doc)
+            if next_start <= end:
+                text += next_doc.page_content[end - next_start:]
+                end = max(end, next_end)
+                rank = min(rank, next_rank)
+                continue
+            blocks.append((rank, _block(doc, text, start)))
+            rank, doc, (start, end), text = next_rank, next_doc, (next_start, next_end), next_doc.page_content
+        blocks.append((rank, _block(doc, text, start)))
+    blocks.sort(key=lambda block: block[0])
+    return [doc for _, doc in blocks]
+
+
+def _block(doc: Document, text: str, start: int) -> Document:
+    if text == doc.page_content:
+        return doc
+    return Document(page_content=text,
+                    metadata=dict(doc.metadata, start_index=start, end_index=start + len(text)))
+
+
+def _span(doc: Document):
+    start = doc.metadata.get("start_index")
+    if not isinstance(start, int) or start < 0:
+        return None
+    return start, start + len(doc.page_content)
+
+
+def _location(doc: Document) -> tuple:
+    return doc.metadata.get("source"), doc.metadata.get("page")
+
+
+def _union_length(spans: list) -> int:
+    total, reached = 0, None
+    for start, end in sorted(spans):
+        if reached is None or start > reached:
+            total += end - start
+            reached = end
+        elif end > reached:
+            total += end - reached
+            reached = end
+    return total
+
+
+def _shingles(text: str) -> set:
+    words = _WORD.findall(text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,149 @@
+"""Dedup module - finds near-duplicate chunks with MinHash and LSH banding."""
+
+import json
+import os
+import re
+import zlib
+import numpy as np
+from src.config import DEDUP_THRESHOLD, MINHASH_PERMUTATIONS, MINHASH_BANDS
+
+DEDUP_FILENAME = "dedup.npz"
+SIGNATURE_VERSION = 1
+
+_WORD = re.compile(r"\w+")
+_SHINGLE_WORDS = 3
+_PRIME = (1 << 61) - 1
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of representative chunks, bucketed by LSH bands.
+
+    Each chunk's word 3-grams are reduced to ``num_perm`` MinHash values,
+    whose agreement rate estimates the Jaccard similarity of two chunks.
+    Signatures are cut into ``bands`` bands, and only chunks sharing a whole
+    band are compared, so lookups stay fast however many chunks are indexed.
+    A chunk is a near-duplicate of a representative when their estimated
+    similarity is at least ``threshold``.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = MINHASH_PERMUTATIONS,
+                 bands: int = MINHASH_BANDS, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError(f"bands={bands} must divide num_perm={num_perm}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self._signatures = {}
+        self._buckets = [{} for _ in range(bands)]
+        self._dirty = False
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._signatures
+
+    def count(self) -> int:
+        """Number of representative chunks."""
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text's word 3-grams."""
+        words = _WORD.findall(text.lower())
+        shingles = {" ".join(words[i:i + _SHINGLE_WORDS])
+                    for i in range(max(len(words) - _SHINGLE_WORDS + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64,
+                             count=len(shingles))
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def find_or_add(self, chunk_id: str, text: str, exclude=()) -> str:
+        """Return the representative a chunk duplicates, or add it as its own.
+
+        Representatives in ``exclude`` are never matched.
+        """
+        if chunk_id in self._signatures:
+            return chunk_id
+        signature = self.signature(text)
+        match = self._match(signature, exclude)
+        if match is not None:
+            return match
+        self.add(chunk_id, signature)
+        return chunk_id
+
+    def add(self, chunk_id: str, signature: np.ndarray) -> None:
+        """Index a chunk as a representative."""
+        if chunk_id in self._signatures:
+            return
+        self._signatures[chunk_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, []).append(chunk_id)
+        self._dirty = True
+
+    def delete(self, chunk_ids: list) -> None:
+        """Remove representatives."""
+        for chunk_id in chunk_ids:
+            signature = self._signatures.pop(chunk_id, None)
+            if signature is None:
+                continue
+            for band, key in enumerate(self._band_keys(signature)):
+                members = self._buckets[band][key]
+                members.remove(chunk_id)
+                if not members:
+                    del self._buckets[band][key]
+            self._dirty = True
+
+    def save(self, path: str) -> None:
+        """Write the signatures to ``path`` atomically."""
+        if not self._dirty and os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        ids = list(self._signatures)
+        np.savez(
+            tmp_path,
+            meta=np.array(json.dumps(self._settings())),
+            ids=np.array(ids, dtype=str),
+            signatures=np.stack([self._signatures[i] for i in ids]) if ids
+            else np.zeros((0, self.num_perm), dtype=np.uint32),
+        )
+        os.replace(tmp_path, path)
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "NearDuplicateIndex":
+        """Load saved signatures, or return an empty index if missing or stale."""
+        index = cls(**kwargs)
+        try:
+            with np.load(path) as data:
+                if json.loads(str(data["meta"])) != index._settings():
+                    return index
+                for chunk_id, signature in zip(data["ids"].tolist(), data["signatures"]):
+                    index.add(chunk_id, signature)
+        except (OSError, KeyError, ValueError):
+            return cls(**kwargs)
+        index._dirty = False
+        return index
+
+    def _match(self, signature: np.ndarray, exclude):
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            if candidate in exclude:
+                continue
+            score = float(np.mean(self._signatures[candidate] == signature))
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+        rows = self.num_perm // self.bands
+        raw = signature.tobytes()
+        return [raw[band * rows * 4:(band + 1) * rows * 4] for band in range(self.bands)]
+
+    def _settings(self) -> dict:
+        return {"version": SIGNATURE_VERSION, "num_perm": self.num_perm,
+                "bands": self.bands, "seed": self.seed}
@@ -0,0 +1,180 @@
+"""Docstore module - chunk texts compressed on disk, read back only for hits."""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from src.config import DOCSTORE_BLOCK_SIZE, DOCSTORE_CACHE_BLOCKS
+
+_HEADER = struct.Struct("<II")  # compressed size and record count of the block that follows
+_ITEM_BITS = 16
+_MAX_ITEMS = 1 << _ITEM_BITS
+
+
+class ChunkDocstore:
+    """Chunk texts and metadata packed into zlib-compressed blocks.
+
+    Records are buffered until ``block_size`` bytes have built up or
+    ``flush`` is called, then compressed together and appended to the file
+    at ``path``, which is memory-mapped for reads. Each record is addressed
+    by an int ref (its block and its position in the block), so memory
+    holds one int per chunk and one offset per block. Reading a record
+    decompresses its block, and the ``cache_blocks`` most recently read
+    blocks are kept decompressed. The file is append-only: replaced records
+    stay in it until ``copy`` writes the live ones to a new file. Without a
+    path the compressed blocks are kept in memory.
+    """
+
+    def __init__(self, path: str = None, block_size: int = DOCSTORE_BLOCK_SIZE,
+                 cache_blocks: int = DOCSTORE_CACHE_BLOCKS):
+        self.path = path
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self.records = 0  # records written, live or not
+        self._lock = threading.Lock()
+        self._offsets = array("Q")
+        self._size = 0
+        self._data = bytearray() if path is None else None
+        self._map = None
+        self._pending = []
+        self._pending_bytes = 0
+        self._cache = OrderedDict()
+        if path:
+            self._scan()
+
+    @property
+    def nbytes(self) -> int:
+        """Compressed bytes written so far."""
+        return self._size
+
+    def add(self, texts: list, metadatas: list) -> list:
+        """Append records, returning their refs."""
+        refs = []
+        with self._lock:
+            for text, metadata in zip(texts, metadatas):
+                record = json.dumps([text, metadata or {}], ensure_ascii=False).encode("utf-8")
+                refs.append(len(self._offsets) << _ITEM_BITS | len(self._pending))
+                self._pending.append(record)
+                self._pending_bytes += len(record)
+                if self._pending_bytes >= self.block_size or len(self._pending) == _MAX_ITEMS:
+                    self._seal()
+            self.records += len(refs)
+        return refs
+
+    def get(self, refs: list) -> list:
+        """Return (text, metadata) for each ref, in order."""
+        by_block = {}
+        for i, ref in enumerate(refs):
+            by_block.setdefault(ref >> _ITEM_BITS, []).append(i)
+        records = [None] * len(refs)
+        with self._lock:
+            # Each block is decompressed at most once per call.
+            for block, positions in by_block.items():
+                items = self._pending if block == len(self._offsets) else self._block(block)
+                for i in positions:
+                    records[i] = items[refs[i] & (_MAX_ITEMS - 1)]
+        return [tuple(json.loads(record)) for record in records]
+
+    def flush(self) -> None:
+        """Write the partly filled block, so every ref handed out is on disk."""
+        with self._lock:
+            self._seal()
+
+    def copy(self, refs: list, path: str = None) -> tuple:
+        """Write the given records to a new docstore; returns it and their new refs.
+
+        Records are copied in file order, so each block is read once.
+        """
+        if path and os.path.exists(path):
+            os.remove(path)
+        target = ChunkDocstore(path, self.block_size, self.cache_blocks)
+        order = sorted(range(len(refs)), key=refs.__getitem__)
+        new_refs = [0] * len(refs)
+        for start in range(0, len(order), _MAX_ITEMS):
+            batch = order[start:start + _MAX_ITEMS]
+            texts, metadatas = zip(*self.get([refs[i] for i in batch]))
+            for i, ref in zip(batch, target.add(texts, metadatas)):
+                new_refs[i] = ref
+        target.flush()
+        return target, new_refs
+
+    def close(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def _seal(self) -> None:
+        """Compress the pending records as one block and append it."""
+        if not self._pending:
+            return
+        sizes = struct.pack(f"<{len(self._pending)}I", *map(len, self._pending))
+        payload = zlib.compress(sizes + b"".join(self._pending))
+        block = _HEADER.pack(len(payload), len(self._pending)) + payload
+        if self._data is not None:
+            self._data += block
+        else:
+            with open(self.path, "ab") as f:
+                f.write(block)
+        self._offsets.append(self._size)
+        self._size += len(block)
+        self._pending, self._pending_bytes = [], 0
+
+    def _block(self, number: int) -> list:
+        """The records of a sealed block, decompressing it on a cache miss."""
+        items = self._cache.get(number)
+        if items is not None:
+            self._cache.move_to_end(number)
+            return items
+        buffer = self._buffer()
+        start = self._offsets[number]
+        length, count = _HEADER.unpack_from(buffer, start)
+        start += _HEADER.size
+        payload = zlib.decompress(buffer[start:start + length])
+        sizes = struct.unpack_from(f"<{count}I", payload)
+        items, offset = [], 4 * count
+        for size in sizes:
+            items.append(payload[offset:offset + size])
+            offset += size
+        self._cache[number] = items
+        while len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return items
+
+    def _buffer(self):
+        if self._data is not None:
+            return self._data
+        if self._map is None or len(self._map) < self._size:
+            # Blocks were appended since the file was mapped.
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _scan(self) -> None:
+        """Find the blocks of an existing file, dropping a torn last block."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        offset = 0
+        with open(self.path, "rb") as f:
+            while offset + _HEADER.size <= size:
+                f.seek(offset)
+                length, count = _HEADER.unpack(f.read(_HEADER.size))
+                if offset + _HEADER.size + length > size:
+                    break
+                self._offsets.append(offset)
+                self.records += count
+                offset += _HEADER.size + length
+        if offset < size:
+            # The tail of an interrupted write; no table entry points into it.
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+        self._size = offset
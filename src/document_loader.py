@@ -1,9 +1,19 @@
 """Document loading and processing module."""
 
 import os
+import re
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from src.config import CHUNK_SIZE, CHUNK_OVERLAP
+from langchain_core.documents import Document
+from pypdf import PdfReader
+from src import metrics
+from src.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, LOAD_WORKERS, PDF_PAGES_PER_TASK, PARALLEL_LOAD_MIN_PAGES,
+)
 
 
 SUPPORTED_EXTENSIONS = {
@@ -13,29 +23,312 @@ SUPPORTED_EXTENSIONS = {
 
 
 def load_documents(folder_path: str) -> list:
-    """Load all supported documents from a folder."""
+    """Load all supported documents from a folder, in filename order.
+
+    Large PDF corpora are parsed on a process pool; see iter_loaded_files.
+    """
     documents = []
+    for _, pages in iter_loaded_files(folder_path, sorted(get_document_names(folder_path))):
+        documents.extend(pages)
+    return documents
+
+
+def load_file(file_path: str) -> list:
+    """Load a single supported document."""
+    return list(iter_file(file_path))
+
+
+def iter_file(file_path: str) -> Iterator:
+    """Lazily load a single supported document, one page at a time for PDFs."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return SUPPORTED_EXTENSIONS[ext](file_path).lazy_load()
 
+
+def iter_documents(folder_path: str) -> Iterator:
+    """Lazily load all supported documents from a folder, in filename order."""
+    for filename in sorted(get_document_names(folder_path)):
+        yield from iter_file(os.path.join(folder_path, filename))
+
+
+def load_documents_parallel(folder_path: str, max_workers: int = LOAD_WORKERS,
+                            pages_per_task: int = PDF_PAGES_PER_TASK) -> tuple:
+    """Load all supported documents from a folder across a process pool.
+
+    PDFs longer than ``pages_per_task`` are split into page ranges so one big
+    manual is parsed by several workers. Documents come back sorted by
+    filename and page, whatever order the workers finish in. A file that
+    fails to load is left out and reported instead of aborting the load.
+    Returns the documents and a dict mapping failed filenames to errors.
+    """
+    documents, failures = [], {}
     if not os.path.exists(folder_path):
-        return documents
+        return documents, failures
 
-    for filename in os.listdir(folder_path):
-        ext = os.path.splitext(filename)[1].lower()
-        if ext in SUPPORTED_EXTENSIONS:
-            file_path = os.path.join(folder_path, filename)
-            loader = SUPPORTED_EXTENSIONS[ext](file_path)
-            documents.extend(loader.load())
+    plan, _ = _plan_tasks(folder_path, sorted(get_document_names(folder_path)), pages_per_task, failures)
+    tasks = [(filename, args) for filename, file_tasks in plan for args in file_tasks]
+    with metrics.stage("load"), ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_load_task, *args) for _, args in tasks]
+        loaded = {}
+        for (filename, _), future in zip(tasks, futures):
+            try:
+                loaded.setdefault(filename, []).extend(future.result())
+            except Exception as e:
+                failures.setdefault(filename, f"{type(e).__name__}: {e}")
+
+    for filename, docs in loaded.items():
+        if filename not in failures:
+            documents.extend(docs)
+    return documents, failures
+
+
+def iter_loaded_files(folder_path: str, names: list, max_workers: int = None,
+                      pages_per_task: int = PDF_PAGES_PER_TASK,
+                      min_pages: int = PARALLEL_LOAD_MIN_PAGES) -> Iterator:
+    """Yield ``(name, pages)`` for each named file, in order.
+
+    ``max_workers`` defaults to LOAD_WORKERS, capped at the CPU count: extra
+    processes only add overhead. With several workers and at least
+    ``min_pages`` PDF pages to parse, files
+    are loaded on a process pool as in load_documents_parallel, a bounded
+    number of tasks ahead of the file being consumed, so parsing overlaps
+    with whatever the caller does with each file. Otherwise each file's
+    pages are loaded lazily in this process. A file that fails to load
+    raises, as it would when loaded serially.
+    """
+    if max_workers is None:
+        max_workers = min(LOAD_WORKERS, os.cpu_count() or 1)
+    if max_workers > 1 and names:
+        plan, pages = _plan_tasks(folder_path, names, pages_per_task)
+        if pages >= min_pages:
+            yield from _iter_parallel(plan, max_workers)
+            return
+    for name in names:
+        yield name, iter_file(os.path.join(folder_path, name))
+
+
+def _plan_tasks(folder_path: str, names: list, pages_per_task: int, failures: dict = None) -> tuple:
+    """Split files into load tasks: whole files, or page ranges of PDFs.
+
+    Returns ``[(name, [task args, ...]), ...]`` and the number of PDF pages.
+    A PDF whose pages cannot be counted is recorded in ``failures`` if
+    given, and otherwise loaded whole so the error surfaces from its task.
+    """
+    plan, total = [], 0
+    for name in names:
+        file_path = os.path.join(folder_path, name)
+        if os.path.splitext(name)[1].lower() != ".pdf":
+            plan.append((name, [(file_path,)]))
+            continue
+        try:
+            num_pages = len(PdfReader(file_path).pages)
+        except Exception as e:
+            if failures is None:
+                plan.append((name, [(file_path,)]))
+            else:
+                failures[name] = f"{type(e).__name__}: {e}"
+            continue
+        total += num_pages
+        plan.append((name, [(file_path, start, min(start + pages_per_task, num_pages))
+                            for start in range(0, num_pages, pages_per_task)]))
+    return plan, total
+
+
+def _iter_parallel(plan: list, max_workers: int) -> Iterator:
+    tasks = iter([args for _, file_tasks in plan for args in file_tasks])
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = deque()
+
+        def fill():
+            # Enough tasks in flight to keep every worker busy, and no more.
+            while len(futures) < 2 * max_workers:
+                args = next(tasks, None)
+                if args is None:
+                    return
+                futures.append(pool.submit(_load_task, *args))
+
+        for name, file_tasks in plan:
+            pages = []
+            for _ in file_tasks:
+                fill()
+                pages.extend(futures.popleft().result())
+            fill()
+            yield name, iter(pages)
 
-    return documents
+
+def _load_task(file_path: str, start: int = None, stop: int = None) -> list:
+    """Worker entry point: load a whole file, or a page range of a PDF."""
+    if start is None:
+        return load_file(file_path)
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    return [
+        Document(
+            page_content=reader.pages[page].extract_text(extraction_mode="plain").strip(),
+            metadata={
+                "source": file_path,
+                "total_pages": total_pages,
+                "page": page,
+                "page_label": reader.page_labels[page],
+            },
+        )
+        for page in range(start, stop)
+    ]
+
+
+class OffsetTextSplitter:
+    """Recursive character splitter that works on offsets into the text.
+
+    Produces exactly the chunks of LangChain's RecursiveCharacterTextSplitter
+    (default separators, separators kept at the start of the next piece,
+    whitespace stripped), without building intermediate strings. Separator
+    positions are found once per range with NumPy (or ``finditer`` for
+    multi-character separators), pieces are kept as arrays of boundary
+    offsets, and chunk ends are found by binary search over those offsets
+    instead of piece-by-piece accumulation. The only copies are the final
+    chunk texts. Each chunk's metadata records its exact ``start_index`` and
+    ``end_index`` in the source text; the page number from the loader is kept.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 separators: tuple = ("\n\n", "\n", " ", "")):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must not exceed chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+        self._patterns = [re.compile(re.escape(sep)) for sep in self.separators]
+
+    def split_documents(self, documents: Iterable) -> list:
+        """Split documents into chunks carrying their offsets in metadata."""
+        chunks = []
+        for document in documents:
+            text = document.page_content
+            for start, end in self.split_spans(text):
+                metadata = dict(document.metadata, start_index=start, end_index=end)
+                chunks.append(Document(page_content=text[start:end], metadata=metadata))
+        return chunks
+
+    def split_text(self, text: str) -> list:
+        """Split a text into chunk strings."""
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_spans(self, text: str) -> list:
+        """The (start, end) offsets of each chunk of a text."""
+        spans = []
+        if len(text) < self.chunk_size:
+            self._emit(text, 0, len(text), spans)
+            return spans
+        # Find every single-character separator in one vectorized pass; ranges
+        # then take their slice of these sorted offsets by binary search.
+        if text.isascii():
+            codes = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        else:
+            codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        positions = {sep: np.flatnonzero(codes == ord(sep)) for sep in self.separators if len(sep) == 1}
+        del codes
+        self._split(text, positions, 0, len(text), 0, spans)
+        return spans
+
+    def _split(self, text: str, positions: dict, start: int, end: int, level: int,
+               spans: list) -> None:
+        # Use the first separator present in the range; "" always matches.
+        index, deeper = len(self.separators) - 1, False
+        for i in range(level, len(self.separators)):
+            separator = self.separators[i]
+            if not separator:
+                index = i
+                break
+            if text.find(separator, start, end) != -1:
+                index, deeper = i, i + 1 < len(self.separators)
+                break
+
+        # Piece k is text[bounds[k]:bounds[k + 1]]; separators open the next piece.
+        bounds = self._bounds(text, positions, index, start, end)
+        large = np.flatnonzero(np.diff(bounds) >= self.chunk_size).tolist()
+        bounds = bounds.tolist()
+        run = 0  # first piece of the current run of small pieces
+        for k in large:
+            if run < k:
+                self._merge(text, bounds[run:k + 1], spans)
+            if deeper:
+                self._split(text, positions, bounds[k], bounds[k + 1], index + 1, spans)
+            else:
+                spans.append((bounds[k], bounds[k + 1]))
+            run = k + 1
+        if run < len(bounds) - 1:
+            self._merge(text, bounds[run:], spans)
+
+    def _bounds(self, text: str, positions: dict, index: int, start: int, end: int) -> np.ndarray:
+        separator = self.separators[index]
+        if not separator:
+            return np.arange(start, end + 1)
+        if separator in positions:
+            found = positions[separator]
+            lo, hi = np.searchsorted(found, (start, end))
+            inner = found[lo:hi]
+        else:
+            inner = np.fromiter((m.start() for m in self._patterns[index].finditer(text, start, end)),
+                                dtype=np.int64)
+        if len(inner) and inner[0] == start:
+            inner = inner[1:]
+        return np.concatenate(([start], inner, [end]))
+
+    def _merge(self, text: str, bounds: list, spans: list) -> None:
+        """Pack consecutive pieces into chunks of at most chunk_size, with overlap.
+
+        Same result as adding pieces one at a time, emitting a chunk when the
+        next piece would overflow it and then dropping pieces from its front
+        until at most chunk_overlap remains and the next piece fits.
+        """
+        last = len(bounds) - 1
+        first = 0
+        while True:
+            # The first piece that no longer fits ends the chunk.
+            k = max(bisect_right(bounds, bounds[first] + self.chunk_size) - 1, first + 1)
+            if k >= last:
+                break
+            self._emit(text, bounds[first], bounds[k], spans)
+            keep = max(bisect_left(bounds, bounds[k] - self.chunk_overlap),
+                       bisect_left(bounds, bounds[k + 1] - self.chunk_size))
+            first = min(k, max(first, keep))
+        self._emit(text, bounds[first], bounds[last], spans)
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, spans: list) -> None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
 
 
 def split_documents(documents: list) -> list:
     """Split documents into chunks for embedding."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-    )
-    return splitter.split_documents(documents)
+    return _make_splitter().split_documents(documents)
+
+
+def iter_chunks(documents: Iterable) -> Iterator:
+    """Split a stream of documents into chunks without materialising either."""
+    splitter = _make_splitter()
+    for document in documents:
+        yield from splitter.split_documents([document])
+
+
+def batched(items: Iterable, size: int) -> Iterator:
+    """Group a stream into lists of at most ``size`` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _make_splitter() -> OffsetTextSplitter:
+    return OffsetTextSplitter(CHUNK_SIZE, CHUNK_OVERLAP)
 
 
 def get_document_names(folder_path: str) -> list:
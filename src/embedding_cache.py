@@ -0,0 +1,301 @@
+"""Embedding cache module - reuses chunk embeddings across runs."""
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src import metrics
+from src.config import QUERY_CACHE_SIZE, QUERY_BATCH_SIZE
+
+_KEY_BYTES = 16
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, model_name: str) -> bytes:
+    """Cache key for a text embedded by a given model."""
+    payload = f"{model_name}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=_KEY_BYTES).digest()
+
+
+def query_key(text: str) -> str:
+    """Cache key for a query: case and whitespace differences don't matter."""
+    return normalize_text(text).lower()
+
+
+class _Pending:
+    __slots__ = ("text", "vector", "error", "done")
+
+    def __init__(self, text: str):
+        self.text, self.vector, self.error, self.done = text, None, None, False
+
+
+class QueryBatcher:
+    """Coalesces concurrent query embeddings into batched model calls.
+
+    A query arriving while no batch is running is embedded at once, so a
+    lone query never waits. Queries arriving while one is running queue up
+    and go in the next call together, up to ``max_batch`` at a time.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch: int = QUERY_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.batches = 0
+        self._cond = threading.Condition()
+        self._queue = []
+        self._running = False
+
+    def embed(self, text: str) -> list:
+        item = _Pending(text)
+        with self._cond:
+            self._queue.append(item)
+            while not item.done:
+                if self._running:
+                    self._cond.wait()
+                    continue
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                self._running = True
+                self._cond.release()
+                try:
+                    self._run(batch)
+                finally:
+                    self._cond.acquire()
+                    self._running = False
+                    self._cond.notify_all()
+        if item.error is not None:
+            raise item.error
+        return item.vector
+
+    def _run(self, batch: list) -> None:
+        self.batches += 1
+        metrics.count("query_embedding_batches")
+        try:
+            if len(batch) == 1:
+                vectors = [self.embeddings.embed_query(batch[0].text)]
+            else:
+                vectors = self.embeddings.embed_documents([item.text for item in batch])
+            for item, vector in zip(batch, vectors):
+                item.vector = vector
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        for item in batch:
+            item.done = True
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that keeps document vectors in a disk cache.
+
+    Vectors live in a memory-mapped matrix of ``max_entries`` rows, next to
+    memory-mapped arrays of row keys and last-use ticks, so entries are
+    written in place and nothing has to be rewritten or loaded up front.
+    When the cache is full the least recently used rows are reused. Query
+    embeddings are kept in a separate in-memory LRU of ``query_entries``
+    vectors, keyed by case- and whitespace-normalized text, and concurrent
+    query misses are embedded together by a QueryBatcher.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_dir: str,
+                 max_entries: int, dtype: str = "float16", query_entries: int = QUERY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.query_entries = query_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.query_hits = 0
+        self.query_misses = 0
+        self._lock = threading.Lock()
+        self._rows = None
+        self._queries = OrderedDict()
+        self._batcher = QueryBatcher(embeddings)
+        self._open()
+
+    def embed_documents(self, texts: list) -> list:
+        with metrics.stage("embed_documents"):
+            return self._embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        with metrics.stage("embed_query"):
+            key = query_key(text)
+            vector = self._cached_query(key)
+            if vector is None:
+                vector = self._store_query(key, self._batcher.embed(text))
+            return vector.tolist()
+
+    def embed_queries(self, texts: list) -> list:
+        """Embed many queries, all cache misses in one batched call."""
+        with metrics.stage("embed_query"):
+            keys = [query_key(text) for text in texts]
+            vectors = [self._cached_query(key) for key in keys]
+            missing = {}
+            for i, vector in enumerate(vectors):
+                if vector is None:
+                    missing.setdefault(keys[i], []).append(i)
+            if missing:
+                fresh = self.embeddings.embed_documents([texts[idx[0]] for idx in missing.values()])
+                for (key, idx), vector in zip(missing.items(), fresh):
+                    vector = self._store_query(key, vector)
+                    for i in idx:
+                        vectors[i] = vector
+            return [vector.tolist() for vector in vectors]
+
+    def _embed_documents(self, texts: list) -> list:
+        keys = [cache_key(text, self.model_name) for text in texts]
+        with self._lock:
+            vectors = [None] * len(texts)
+            missing = {}
+            for i, key in enumerate(keys):
+                row = self._rows.get(key) if self._rows is not None else None
+                if row is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    vectors[i] = self._read(row)
+            misses = sum(len(idx) for idx in missing.values())
+            self.hits += len(texts) - misses
+            self.misses += misses
+        metrics.count("embedding_cache_hits", len(texts) - misses)
+        metrics.count("embedding_cache_misses", misses)
+
+        if missing:
+            fresh = self.embeddings.embed_documents([texts[idx[0]] for idx in missing.values()])
+            with self._lock:
+                self._store(list(missing), fresh)
+            for idx, vector in zip(missing.values(), fresh):
+                for i in idx:
+                    vectors[i] = list(vector)
+        return vectors
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            query_lookups = self.query_hits + self.query_misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._rows or {}),
+                "max_entries": self.max_entries,
+                "query_hits": self.query_hits,
+                "query_misses": self.query_misses,
+                "query_hit_rate": self.query_hits / query_lookups if query_lookups else 0.0,
+                "query_entries": len(self._queries),
+                "query_batches": self._batcher.batches,
+            }
+
+    def _cached_query(self, key: str):
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                self.query_hits += 1
+            else:
+                self.query_misses += 1
+        metrics.count("query_embedding_cache_hits" if vector is not None
+                      else "query_embedding_cache_misses")
+        return vector
+
+    def _store_query(self, key: str, vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._queries[key] = vector
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.query_entries:
+                self._queries.popitem(last=False)
+        return vector
+
+    def _read(self, row: int) -> list:
+        self._tick += 1
+        self._used[row] = self._tick
+        return self._vectors[row].astype(np.float32).tolist()
+
+    def _store(self, keys: list, vectors: list) -> None:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if self._rows is None or self._vectors.shape[1] != matrix.shape[1]:
+            self._create(matrix.shape[1])
+        self._lru = []
+        for key, vector in zip(keys, matrix):
+            if key in self._rows:
+                continue
+            row = self._free_row()
+            self._tick += 1
+            self._keys[row] = np.frombuffer(key, dtype=np.uint8)
+            self._vectors[row] = vector
+            self._used[row] = self._tick
+            self._rows[key] = row
+        self._flush()
+
+    def _free_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        # Full: evict the least recently used entry. Candidates are picked a
+        # block at a time so a batch of misses costs one partial sort.
+        if not self._lru:
+            used = np.asarray(self._used)
+            k = min(len(used), 1024)
+            oldest = np.argpartition(used, k - 1)[:k]
+            self._lru = oldest[np.argsort(used[oldest])[::-1]].tolist()
+        row = self._lru.pop()
+        del self._rows[bytes(self._keys[row])]
+        self.evictions += 1
+        return row
+
+    def _paths(self) -> dict:
+        return {
+            name: os.path.join(self.cache_dir, name)
+            for name in ("meta.json", "keys.bin", "vectors.bin", "used.bin")
+        }
+
+    def _open(self) -> None:
+        paths = self._paths()
+        try:
+            with open(paths["meta.json"], encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("dtype") != self.dtype.name or meta.get("max_entries") != self.max_entries:
+            return
+        self._map(meta["dim"], "r+")
+        used = np.asarray(self._used)
+        filled = np.flatnonzero(used)
+        keys = np.asarray(self._keys[filled]).tobytes()
+        self._rows = {
+            keys[i * _KEY_BYTES:(i + 1) * _KEY_BYTES]: int(row) for i, row in enumerate(filled)
+        }
+        self._free = np.flatnonzero(used == 0)[::-1].tolist()
+        self._tick = int(used.max()) if self.max_entries else 0
+
+    def _create(self, dim: int) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._map(dim, "w+")
+        with open(self._paths()["meta.json"], "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "dtype": self.dtype.name, "max_entries": self.max_entries}, f)
+        self._rows = {}
+        self._free = list(reversed(range(self.max_entries)))
+        self._tick = 0
+
+    def _map(self, dim: int, mode: str) -> None:
+        paths = self._paths()
+        self._keys = np.memmap(paths["keys.bin"], np.uint8, mode, shape=(self.max_entries, _KEY_BYTES))
+        self._vectors = np.memmap(paths["vectors.bin"], self.dtype, mode, shape=(self.max_entries, dim))
+        self._used = np.memmap(paths["used.bin"], np.int64, mode, shape=(self.max_entries,))
+        self._lru = []
+
+    def _flush(self) -> None:
+        self._keys.flush()
+        self._vectors.flush()
+        self._used.flush()
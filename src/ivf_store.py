@@ -0,0 +1,288 @@
+"""IVF-PQ vector store module - approximate search for very large corpora."""
+
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.numpy_store import NumpyVectorStore, _VECTORS_FILE, _map, _top_k
+
+_CODES_FILE = "codes.bin"
+_LISTS_FILE = "lists.bin"
+_QUANTIZER_FILE = "quantizer.npz"
+_REFINE_FILE = "refine.bin"
+_KSUB = 256
+_ENCODE_ROWS = 1 << 14
+
+
+class IvfPqVectorStore(NumpyVectorStore):
+    """Inverted-file index with product-quantized residuals.
+
+    Until ``train_size`` vectors have been added the store behaves exactly
+    like NumpyVectorStore. It then learns ``nlist`` k-means centroids and,
+    for the residual of every vector from its centroid, ``m`` sub-space
+    codebooks of 256 codewords, and keeps only one list id and ``m`` bytes
+    per vector. Later vectors are encoded with the trained quantizer as they
+    arrive. A search scores the ``nprobe`` lists whose centroids are closest
+    to the query, reading their rows from per-list postings rather than
+    scanning every list id; raise ``nprobe`` for recall, lower it for
+    speed. With
+    ``refine`` set, the best ``k * refine`` candidates are re-scored exactly
+    against float16 copies of the vectors, which stay on disk and are only
+    read for those candidates.
+    """
+
+    def __init__(self, embedding: Embeddings, directory: str = None, nlist: int = 1024,
+                 m: int = 48, nprobe: int = 16, refine: int = 16, train_size: int = 50_000,
+                 kmeans_iters: int = 10, seed: int = 0):
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.refine = refine
+        self.train_size = max(train_size, nlist, _KSUB)
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self._centroids = self._codebooks = None
+        self._codes = self._lists = self._refine = None
+        self._postings = None
+        super().__init__(embedding, directory, "float32")
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def delete_collection(self) -> None:
+        with self._lock:
+            self._centroids = self._codebooks = None
+            self._codes = self._lists = self._refine = None
+            self._postings = None
+            super().delete_collection()
+
+    def memory_per_vector(self) -> float:
+        """Resident bytes per stored vector: index, quantizer and side table.
+
+        Refinement vectors are not counted: they are only paged in for the
+        candidates being re-scored. Texts stay in the docstore file.
+        """
+        n = max(len(self._ids), 1)
+        table = self._table_bytes() / n
+        if not self.trained:
+            return table + (self._dim * 4 if self._dim else 0.0)
+        quantizer = self._centroids.nbytes + self._codebooks.nbytes
+        postings = sum(posting.nbytes for posting in self._postings)
+        return table + self.m + 4 + (quantizer + postings) / n
+
+    def _score(self, queries: np.ndarray, k: int, nprobe: int = None, refine: int = None,
+               **kwargs):
+        if not self.trained:
+            yield from super()._score(queries, k)
+            return
+        refine = self.refine if refine is None else refine
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        dsub = self._dim // self.m
+        offsets = np.arange(self.m) * _KSUB
+        for query in queries:
+            coarse = self._centroids @ query
+            probes = np.argpartition(coarse, self.nlist - nprobe)[self.nlist - nprobe:]
+            postings = [self._postings[probe] for probe in probes]
+            candidates = np.concatenate(postings)
+            # Inner product = query . centroid + sum of per-sub-space lookups.
+            table = np.einsum("mkd,md->mk", self._codebooks, query.reshape(self.m, dsub)).ravel()
+            codes = np.asarray(self._codes[candidates], dtype=np.intp) + offsets
+            scores = table[codes].sum(axis=1) + np.repeat(coarse[probes], [len(p) for p in postings])
+            if refine and self._refine is not None:
+                candidates = np.sort(candidates[_top_k(scores, k * refine)])
+                scores = self._refine[candidates].astype(np.float32) @ query
+            yield candidates, scores
+
+    def _write_rows(self, rows: np.ndarray, matrix: np.ndarray) -> None:
+        if self.trained:
+            # Rows being overwritten leave their old lists; new rows are in none.
+            self._unpost(rows, self._lists[rows])
+            self._lists[rows], self._codes[rows] = self._encode(matrix)
+            self._post(rows, self._lists[rows])
+            if self._refine is not None:
+                self._refine[rows] = matrix
+            return
+        super()._write_rows(rows, matrix)
+        if len(self._ids) >= self.train_size:
+            self._train()
+
+    def _remove(self, doc_id: str):
+        moved = super()._remove(doc_id)
+        if moved is not None and self.trained:
+            row, last = moved
+            # The last row takes over the freed one, as _move_row does below.
+            self._unpost(np.array([row, last]), self._lists[[row, last]])
+            if row != last:
+                self._post(np.array([row]), self._lists[[last]])
+        return moved
+
+    def _move_row(self, source: int, target: int) -> None:
+        if not self.trained:
+            super()._move_row(source, target)
+            return
+        self._codes[target] = self._codes[source]
+        self._lists[target] = self._lists[source]
+        if self._refine is not None:
+            self._refine[target] = self._refine[source]
+
+    def _allocate(self, dim: int, capacity: int) -> None:
+        if not self.trained:
+            super()._allocate(dim, capacity)
+            return
+        old = self._arrays()
+        self._dim, self._capacity = dim, capacity
+        self._map_codes(capacity)
+        if not self.directory and old:
+            for array, previous in zip(self._arrays(), old):
+                array[:len(previous)] = previous
+        self._write_meta()
+
+    def _arrays(self) -> list:
+        if not self.trained:
+            return super()._arrays()
+        return [a for a in (self._codes, self._lists, self._refine) if a is not None]
+
+    def _files(self) -> list:
+        return super()._files() + [_CODES_FILE, _LISTS_FILE, _REFINE_FILE, _QUANTIZER_FILE]
+
+    def _meta(self) -> dict:
+        return dict(super()._meta(), trained=self.trained, nlist=self.nlist, m=self.m,
+                    refine=bool(self.refine))
+
+    def _compatible(self, meta: dict) -> bool:
+        return (
+            super()._compatible(meta)
+            and meta.get("nlist") == self.nlist
+            and meta.get("m") == self.m
+            and meta.get("refine", False) == bool(self.refine)
+        )
+
+    def _restore(self, meta: dict) -> None:
+        if meta.get("trained"):
+            quantizer = np.load(self._path(_QUANTIZER_FILE))
+            self._centroids = quantizer["centroids"]
+            self._codebooks = quantizer["codebooks"]
+        super()._restore(meta)
+        if self.trained:
+            self._postings = [np.empty(0, dtype=np.int32) for _ in range(self.nlist)]
+            self._post(np.arange(len(self._ids)), self._lists[:len(self._ids)])
+
+    def _map_codes(self, capacity: int) -> None:
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._codes = _map(self._path(_CODES_FILE), np.uint8, (capacity, self.m))
+            self._lists = _map(self._path(_LISTS_FILE), np.int32, (capacity,))
+            if self.refine:
+                self._refine = _map(self._path(_REFINE_FILE), np.float16, (capacity, self._dim))
+        else:
+            self._codes = np.zeros((capacity, self.m), dtype=np.uint8)
+            self._lists = np.zeros(capacity, dtype=np.int32)
+            if self.refine:
+                self._refine = np.zeros((capacity, self._dim), dtype=np.float16)
+
+    def _train(self) -> None:
+        """Learn the quantizer from the stored vectors and re-encode them."""
+        if self._dim % self.m:
+            raise ValueError(f"m={self.m} must divide the embedding size {self._dim}")
+        n = len(self._ids)
+        raw = self._vectors
+        rng = np.random.default_rng(self.seed)
+        sample = np.asarray(raw[np.sort(rng.choice(n, min(n, self.train_size), replace=False))])
+        centroids = _kmeans(sample, self.nlist, self.kmeans_iters, rng)
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(1e-12)
+        residuals = sample - centroids[_nearest(sample, centroids)]
+        dsub = self._dim // self.m
+        codebooks = np.stack([
+            _kmeans(residuals[:, j * dsub:(j + 1) * dsub], _KSUB, self.kmeans_iters, rng)
+            for j in range(self.m)
+        ])
+
+        self._centroids, self._codebooks = centroids, codebooks
+        self._map_codes(self._capacity)
+        for start in range(0, n, _ENCODE_ROWS):
+            end = min(start + _ENCODE_ROWS, n)
+            block = np.asarray(raw[start:end])
+            self._lists[start:end], self._codes[start:end] = self._encode(block)
+            if self._refine is not None:
+                self._refine[start:end] = block
+        self._postings = [np.empty(0, dtype=np.int32) for _ in range(self.nlist)]
+        self._post(np.arange(n), self._lists[:n])
+        self._vectors = self._scales = None
+        if self.directory:
+            self._flush()
+            np.savez(self._path(_QUANTIZER_FILE), centroids=centroids, codebooks=codebooks)
+            self._write_meta()
+            os.remove(self._path(_VECTORS_FILE))
+
+    def _post(self, rows: np.ndarray, lists: np.ndarray) -> None:
+        """Append rows to the postings of their lists."""
+        for key, group in _groups(rows, lists):
+            self._postings[key] = np.concatenate([self._postings[key], group.astype(np.int32)])
+
+    def _unpost(self, rows: np.ndarray, lists: np.ndarray) -> None:
+        """Remove rows from the postings of their lists, if they are there."""
+        for key, group in _groups(rows, lists):
+            posting = self._postings[key]
+            self._postings[key] = posting[~np.isin(posting, group)]
+
+    def _encode(self, matrix: np.ndarray) -> tuple:
+        lists = _nearest(matrix, self._centroids)
+        residuals = matrix - self._centroids[lists]
+        dsub = self._dim // self.m
+        codes = np.empty((len(matrix), self.m), dtype=np.uint8)
+        for j, codebook in enumerate(self._codebooks):
+            codes[:, j] = _nearest(residuals[:, j * dsub:(j + 1) * dsub], codebook)
+        return lists.astype(np.int32), codes
+
+
+def exact_top_k(vectors: np.ndarray, ids: list, queries: np.ndarray, k: int) -> list:
+    """Ids of the exact cosine top-k for each query, best first."""
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(1e-12)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True).clip(1e-12)
+    results = []
+    for query in queries:
+        scores = np.concatenate([unit[s:s + _ENCODE_ROWS] @ query for s in range(0, len(unit), _ENCODE_ROWS)])
+        top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+        results.append([ids[i] for i in top[np.argsort(-scores[top])]])
+    return results
+
+
+def recall_at_k(store: NumpyVectorStore, queries: np.ndarray, expected: list, k: int,
+                **search_kwargs) -> float:
+    """Fraction of the exact top-k ids (see exact_top_k) that the store returns."""
+    found = store.similarity_search_by_vectors(queries, k=k, **search_kwargs)
+    hits = sum(len({doc.id for doc in docs} & set(truth[:k])) for docs, truth in zip(found, expected))
+    return hits / (k * len(expected)) if expected else 1.0
+
+
+def _groups(rows: np.ndarray, keys: np.ndarray):
+    """Yield (key, rows with that key) for each distinct key."""
+    keys = np.asarray(keys)
+    order = np.argsort(keys, kind="stable")
+    distinct, starts = np.unique(keys[order], return_index=True)
+    return zip(distinct.tolist(), np.split(np.asarray(rows)[order], starts[1:]))
+
+
+def _nearest(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (Euclidean) for each row."""
+    half_norms = (centroids ** 2).sum(axis=1) / 2
+    return np.concatenate([
+        np.argmax(matrix[s:s + _ENCODE_ROWS] @ centroids.T - half_norms, axis=1)
+        for s in range(0, len(matrix), _ENCODE_ROWS)
+    ]) if len(matrix) else np.empty(0, dtype=np.intp)
+
+
+def _kmeans(data: np.ndarray, k: int, iters: int, rng) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are reseeded from random points."""
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iters):
+        labels = _nearest(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        order = np.argsort(labels, kind="stable")
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = np.add.reduceat(data[order], starts) / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = data[rng.choice(len(data), len(empty))]
+    return centroids.astype(np.float32)
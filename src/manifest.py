@@ -0,0 +1,131 @@
+"""Manifest module - tracks content hashes for incremental indexing."""
+
+import hashlib
+import json
+import os
+from src.config import EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, DEDUP_THRESHOLD
+from src.document_loader import get_document_names
+
+
+MANIFEST_VERSION = 2
+MANIFEST_FILENAME = "manifest.json"
+
+_READ_BLOCK = 1 << 20
+
+
+def manifest_settings() -> dict:
+    """Settings that invalidate every stored chunk when they change."""
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "dedup_threshold": DEDUP_THRESHOLD,
+    }
+
+
+def new_manifest() -> dict:
+    """Create an empty manifest for the current settings."""
+    return {"version": MANIFEST_VERSION, "settings": manifest_settings(), "files": {}}
+
+
+def is_compatible(manifest: dict) -> bool:
+    """Check whether a manifest was built with the current settings."""
+    return (
+        manifest.get("version") == MANIFEST_VERSION
+        and manifest.get("settings") == manifest_settings()
+    )
+
+
+def hash_file(file_path: str) -> str:
+    """Hash a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_chunk(text: str) -> str:
+    """Hash a chunk's text; the hash doubles as the chunk's vector store ID."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def scan_folder(folder_path: str, manifest: dict = None) -> dict:
+    """Hash every supported file in a folder.
+
+    Files whose size and mtime match the previous manifest reuse the stored
+    hash, so repeated scans only read files that were touched.
+    """
+    known = manifest["files"] if manifest else {}
+    scanned = {}
+    for name in sorted(get_document_names(folder_path)):
+        stat = os.stat(os.path.join(folder_path, name))
+        entry = known.get(name)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            file_hash = entry["hash"]
+        else:
+            file_hash = hash_file(os.path.join(folder_path, name))
+        scanned[name] = {"hash": file_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return scanned
+
+
+def diff_manifest(manifest: dict, scanned: dict) -> dict:
+    """Compare a manifest against a folder scan.
+
+    A removed file whose hash matches an added file is reported as a rename,
+    so its chunks can be kept without re-embedding.
+    """
+    files = manifest["files"]
+    added = [name for name in scanned if name not in files]
+    removed = [name for name in files if name not in scanned]
+    changed = [
+        name for name in scanned
+        if name in files and files[name]["hash"] != scanned[name]["hash"]
+    ]
+
+    removed_by_hash = {}
+    for name in removed:
+        removed_by_hash.setdefault(files[name]["hash"], []).append(name)
+
+    renamed = []
+    for name in list(added):
+        candidates = removed_by_hash.get(scanned[name]["hash"])
+        if candidates:
+            old_name = candidates.pop(0)
+            renamed.append((old_name, name))
+            added.remove(name)
+            removed.remove(old_name)
+
+    return {"added": added, "changed": changed, "removed": removed, "renamed": renamed}
+
+
+def chunk_ids(manifest: dict) -> set:
+    """All chunk IDs referenced by at least one file in the manifest."""
+    return {cid for entry in manifest["files"].values() for cid in entry["chunks"]}
+
+
+def corpus_fingerprint(scanned: dict) -> str:
+    """Fingerprint a corpus from its file names, contents and settings."""
+    payload = json.dumps(
+        [manifest_settings(), sorted((name, entry["hash"]) for name, entry in scanned.items())]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: str) -> dict:
+    """Load a manifest, falling back to an empty one if missing or stale."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return new_manifest()
+    return manifest if is_compatible(manifest) else new_manifest()
+
+
+def save_manifest(manifest: dict, path: str) -> None:
+    """Write a manifest atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
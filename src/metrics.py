@@ -0,0 +1,187 @@
+"""Metrics module - per-stage timings and counters for the RAG pipeline.
+
+Code marks its hot paths with ``stage`` and ``count``. Every measurement
+feeds process-wide histograms and counters (exportable in Prometheus text
+format or as JSON), and is also attached to the active ``trace`` so a single
+question or ingestion run can be broken down afterwards.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from src.config import METRICS_JSON_LOG
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = ContextVar("rag_trace", default=None)
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+class Trace:
+    """Stage timings and counters collected for one operation."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.total_ms = None
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def add_count(self, name: str, value: float) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "total_ms": round(self.total_ms, 3) if self.total_ms is not None else None,
+            "stages": {k: round(v, 3) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+@contextmanager
+def trace(name: str):
+    """Collect every stage and count recorded inside the block into a Trace."""
+    current = Trace(name)
+    try:
+        with activate(current):
+            yield current
+    finally:
+        finish(current)
+
+
+@contextmanager
+def activate(current: Trace):
+    """Make an existing trace the active one for the block.
+
+    Generators that yield mid-operation use this around each resumed
+    section instead of holding a trace open across their yields.
+    """
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+def finish(current: Trace) -> None:
+    """Close a trace: record its total time and emit the JSON log line."""
+    current.total_ms = (time.perf_counter() - current.started) * 1000
+    _observe(f"{current.name}_total", current.total_ms / 1000)
+    if METRICS_JSON_LOG:
+        logger.info(json.dumps(current.to_dict()))
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a stage duration measured elsewhere."""
+    _observe(name, seconds)
+    current = _current.get()
+    if current is not None:
+        current.add_stage(name, seconds)
+
+
+def timed_iter(name: str, iterable):
+    """Yield from an iterable, recording the time spent producing items as a stage."""
+    iterator = iter(iterable)
+    spent = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                spent += time.perf_counter() - start
+            yield item
+    finally:
+        record_stage(name, spent)
+
+
+def count(name: str, value: float = 1) -> None:
+    """Increment a counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    current = _current.get()
+    if current is not None:
+        current.add_count(name, value)
+
+
+def current_trace():
+    """The trace being collected in this context, if any."""
+    return _current.get()
+
+
+def snapshot() -> dict:
+    """All histograms and counters as plain data."""
+    with _lock:
+        return {
+            "stages": {
+                name: {"count": h["count"], "sum_seconds": round(h["sum"], 6),
+                       "buckets": dict(zip(map(str, BUCKETS), h["buckets"]))}
+                for name, h in _histograms.items()
+            },
+            "counters": dict(_counters),
+        }
+
+
+def to_json() -> str:
+    """All metrics as a JSON document."""
+    return json.dumps(snapshot())
+
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = ["# TYPE rag_stage_seconds histogram"]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, hits in zip(BUCKETS, h["buckets"]):
+                cumulative += hits
+                lines.append(f'rag_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'rag_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h["count"]}')
+            lines.append(f'rag_stage_seconds_sum{{stage="{name}"}} {h["sum"]}')
+            lines.append(f'rag_stage_seconds_count{{stage="{name}"}} {h["count"]}')
+        lines.append("# TYPE rag_events_total counter")
+        for name, value in sorted(_counters.items()):
+            lines.append(f'rag_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Clear all process-wide metrics."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _observe(name: str, seconds: float) -> None:
+    with _lock:
+        h = _histograms.setdefault(name, {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)})
+        h["count"] += 1
+        h["sum"] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h["buckets"][i] += 1
+                break
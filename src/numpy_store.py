@@ -0,0 +1,447 @@
+"""NumPy vector store module - exact search over a memory-mapped matrix."""
+
+import glob
+import json
+import os
+import sys
+import threading
+import uuid
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from src.docstore import ChunkDocstore
+
+_META_FILE = "meta.json"
+_TABLE_FILE = "table.jsonl"
+_VECTORS_FILE = "vectors.bin"
+_SCALES_FILE = "scales.bin"
+_TEXTS_FILE = "texts-{}.bin"
+_DTYPES = ("float32", "float16", "int8")
+_MIN_CAPACITY = 1024
+_SCAN_ROWS = 1 << 12
+
+
+class NumpyVectorStore(VectorStore):
+    """Vector store that keeps normalized embeddings in one NumPy matrix.
+
+    Rows are stored as float32, float16 or int8 (each int8 row with its own
+    scale) in a memory-mapped file under ``directory``, so opening a store
+    maps the file instead of reading it. Texts and metadata are kept
+    compressed in a ChunkDocstore and only read for the rows returned; the
+    side table in memory maps each id to its row and docstore ref. A search
+    is an exact cosine scan of the matrix followed by ``argpartition``.
+    float16 and int8 rows are widened to float32 a block at a time into
+    one reused buffer, so they keep their smaller footprint in RAM too, at
+    the cost of a slower scan. Without a directory the store is kept in
+    memory.
+    """
+
+    def __init__(self, embedding: Embeddings, directory: str = None, dtype: str = "float32"):
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {_DTYPES}")
+        self._embedding = embedding
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._ids, self._refs = [], []
+        self._rows = {}
+        self._dim = self._capacity = None
+        self._vectors = None
+        self._scales = None
+        self._docstore = None
+        self._open_texts(0)
+        self._open()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def count(self) -> int:
+        """Number of stored vectors."""
+        return len(self._ids)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs) -> list:
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(self, texts: list, embeddings: list, metadatas: list = None,
+                       ids: list = None) -> list:
+        """Upsert texts with precomputed embeddings."""
+        texts = list(texts)
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        if not texts:
+            return []
+        matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            if self._dim is None:
+                self._allocate(matrix.shape[1], _MIN_CAPACITY)
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding size {matrix.shape[1]} does not match the store's {self._dim}"
+                )
+            refs = self._docstore.add(texts, metadatas)
+            rows = [self._put(doc_id, ref) for doc_id, ref in zip(ids, refs)]
+            if len(self._ids) > self._capacity:
+                self._allocate(self._dim, max(len(self._ids), 2 * self._capacity))
+            self._write_rows(np.asarray(rows), matrix)
+            self._docstore.flush()
+            self._flush()
+            self._log([["put", doc_id, ref] for doc_id, ref in zip(ids, refs)])
+        return ids
+
+    def delete(self, ids: list = None, **kwargs) -> None:
+        """Remove vectors by id, moving the last rows into the freed slots."""
+        if not ids:
+            return
+        with self._lock:
+            deleted = []
+            for doc_id in ids:
+                moved = self._remove(doc_id)
+                if moved is None:
+                    continue
+                row, last = moved
+                if row != last:
+                    self._move_row(last, row)
+                deleted.append(["del", doc_id])
+            if deleted:
+                self._flush()
+                self._log(deleted)
+
+    def delete_collection(self) -> None:
+        """Remove every vector and the files backing them."""
+        with self._lock:
+            self._ids, self._refs = [], []
+            self._rows = {}
+            self._dim = self._capacity = None
+            self._vectors = self._scales = None
+            self._log_lines = 0
+            self._docstore.close()
+            if self.directory:
+                for name in self._files():
+                    path = os.path.join(self.directory, name)
+                    if os.path.exists(path):
+                        os.remove(path)
+                for path in glob.glob(self._texts_path("*")):
+                    os.remove(path)
+            self._open_texts(0)
+
+    def get(self, ids: list = None, include: list = None) -> dict:
+        """Fetch stored entries in the same shape as Chroma's ``get``."""
+        include = include or ["documents", "metadatas"]
+        with self._lock:
+            rows = range(len(self._ids)) if ids is None else [
+                self._rows[doc_id] for doc_id in ids if doc_id in self._rows
+            ]
+            result = {"ids": [self._ids[row] for row in rows]}
+            if "documents" in include or "metadatas" in include:
+                records = self._docstore.get([self._refs[row] for row in rows])
+            if "documents" in include:
+                result["documents"] = [text for text, _ in records]
+            if "metadatas" in include:
+                result["metadatas"] = [metadata for _, metadata in records]
+        return result
+
+    def get_by_ids(self, ids, /) -> list:
+        found = self.get(list(ids))
+        return [
+            Document(id=doc_id, page_content=text, metadata=meta)
+            for doc_id, text, meta in zip(found["ids"], found["documents"], found["metadatas"])
+        ]
+
+    def update_metadata(self, ids: list, metadatas: list) -> None:
+        """Replace the metadata of stored entries without touching vectors."""
+        with self._lock:
+            found = [(doc_id, self._rows[doc_id], metadata)
+                     for doc_id, metadata in zip(ids, metadatas) if doc_id in self._rows]
+            if not found:
+                return
+            texts = [text for text, _ in self._docstore.get([self._refs[row] for _, row, _ in found])]
+            refs = self._docstore.add(texts, [metadata for _, _, metadata in found])
+            for (_, row, _), ref in zip(found, refs):
+                self._refs[row] = ref
+            self._docstore.flush()
+            self._log([["put", doc_id, ref] for (doc_id, _, _), ref in zip(found, refs)])
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> list:
+        query = np.asarray([self._embedding.embed_query(query)], np.float32)
+        return self._search(query, k, **kwargs)[0]
+
+    def similarity_search_by_vector(self, embedding: list, k: int = 4, **kwargs) -> list:
+        return [doc for doc, _ in self._search(np.asarray([embedding], np.float32), k, **kwargs)[0]]
+
+    def similarity_search_by_vectors(self, embeddings: list, k: int = 4, **kwargs) -> list:
+        """Search for many query vectors with one scan of the matrix."""
+        return [
+            [doc for doc, _ in hits]
+            for hits in self._search(np.asarray(embeddings, np.float32), k, **kwargs)
+        ]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities; map them onto [0, 1].
+        return lambda score: (score + 1) / 2
+
+    @classmethod
+    def from_texts(cls, texts, embedding: Embeddings, metadatas=None, ids=None,
+                   directory: str = None, dtype: str = "float32", **kwargs) -> "NumpyVectorStore":
+        store = cls(embedding, directory=directory, dtype=dtype)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def _search(self, queries: np.ndarray, k: int, **kwargs) -> list:
+        queries = _normalize(queries)
+        with self._lock:
+            if not self._ids or k <= 0:
+                return [[] for _ in queries]
+            results = []
+            for candidates, scores in self._score(queries, k, **kwargs):
+                top = _top_k(scores, k)
+                rows = (top if candidates is None else candidates[top]).tolist()
+                # Only the rows returned are read from the docstore.
+                records = self._docstore.get([self._refs[row] for row in rows])
+                results.append([
+                    (Document(id=self._ids[row], page_content=text, metadata=metadata), float(scores[i]))
+                    for row, (text, metadata), i in zip(rows, records, top.tolist())
+                ])
+        return results
+
+    # The methods below own the vector layout; other stores override them.
+
+    def _score(self, queries: np.ndarray, k: int, **kwargs):
+        """Yield (candidate rows or None for all rows, scores) per query."""
+        n = len(self._ids)
+        if self.dtype == np.float32:
+            scores = queries @ self._vectors[:n].T
+        else:
+            # Widen the used rows a block at a time; a small block stays in cache.
+            scores = np.empty((len(queries), n), dtype=np.float32)
+            buffer = np.empty((min(n, _SCAN_ROWS), self._dim), dtype=np.float32)
+            for start in range(0, n, _SCAN_ROWS):
+                end = min(start + _SCAN_ROWS, n)
+                block = buffer[:end - start]
+                block[...] = self._vectors[start:end]
+                scores[:, start:end] = queries @ block.T
+            if self._scales is not None:
+                scores *= self._scales[:n]
+        for query_scores in scores:
+            yield None, query_scores
+
+    def _write_rows(self, rows: np.ndarray, matrix: np.ndarray) -> None:
+        if self.dtype == np.int8:
+            scales = np.abs(matrix).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            self._vectors[rows] = np.round(matrix / scales[:, None]).astype(np.int8)
+            self._scales[rows] = scales
+        else:
+            self._vectors[rows] = matrix.astype(self.dtype)
+
+    def _move_row(self, source: int, target: int) -> None:
+        self._vectors[target] = self._vectors[source]
+        if self._scales is not None:
+            self._scales[target] = self._scales[source]
+
+    def _allocate(self, dim: int, capacity: int) -> None:
+        """Create or grow the vector matrix, keeping existing rows."""
+        old_vectors, old_scales = self._vectors, self._scales
+        self._dim, self._capacity = dim, capacity
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            # Growing the file in place keeps the rows already written.
+            self._vectors = _map(self._path(_VECTORS_FILE), self.dtype, (capacity, dim))
+            if self.dtype == np.int8:
+                self._scales = _map(self._path(_SCALES_FILE), np.float32, (capacity,))
+            self._write_meta()
+        else:
+            self._vectors = np.zeros((capacity, dim), dtype=self.dtype)
+            if self.dtype == np.int8:
+                self._scales = np.zeros(capacity, dtype=np.float32)
+            if old_vectors is not None:
+                self._vectors[:len(old_vectors)] = old_vectors
+                if old_scales is not None:
+                    self._scales[:len(old_scales)] = old_scales
+
+    def _arrays(self) -> list:
+        return [a for a in (self._vectors, self._scales) if a is not None]
+
+    def _files(self) -> list:
+        return [_META_FILE, _TABLE_FILE, _VECTORS_FILE, _SCALES_FILE]
+
+    def _meta(self) -> dict:
+        return {"dim": self._dim, "capacity": self._capacity, "dtype": self.dtype.name}
+
+    def _compatible(self, meta: dict) -> bool:
+        return meta.get("dtype") == self.dtype.name
+
+    def _restore(self, meta: dict) -> None:
+        self._allocate(meta["dim"], meta["capacity"])
+
+    def _table_bytes(self) -> int:
+        """Bytes of RAM held by the side table: ids, rows and docstore refs.
+
+        Counts every object, so it takes time proportional to the store size.
+        """
+        objects = sum(sys.getsizeof(doc_id) for doc_id in self._ids)
+        objects += sum(sys.getsizeof(value) for value in self._refs + list(self._rows.values()))
+        return objects + sum(sys.getsizeof(table) for table in (self._ids, self._refs, self._rows))
+
+    def _write_meta(self) -> None:
+        if self.directory:
+            _write_json(self._path(_META_FILE), self._meta())
+
+    def _put(self, doc_id: str, ref) -> int:
+        row = self._rows.get(doc_id)
+        if row is None:
+            row = len(self._ids)
+            self._rows[doc_id] = row
+            self._ids.append(doc_id)
+            self._refs.append(ref)
+        else:
+            self._refs[row] = ref
+        return row
+
+    def _remove(self, doc_id: str):
+        """Drop an id from the table; returns its row and the row moved into it."""
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return None
+        last = len(self._ids) - 1
+        if row != last:
+            self._ids[row] = self._ids[last]
+            self._refs[row] = self._refs[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._refs.pop()
+        return row, last
+
+    def _open(self) -> None:
+        self._log_lines = 0
+        if not self.directory:
+            return
+        try:
+            with open(self._path(_META_FILE), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not self._compatible(meta):
+            # Rows written with other settings cannot be reused.
+            self.delete_collection()
+            return
+        # Replaying the table log repeats the row moves made when it was written.
+        try:
+            with open(self._path(_TABLE_FILE), encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            lines = []
+        try:
+            ops = json.loads(f"[{','.join(lines)}]")
+            torn = False
+        except ValueError:
+            ops, torn = [], True  # the last line of an interrupted write
+            for line in lines:
+                try:
+                    ops.append(json.loads(line))
+                except ValueError:
+                    break
+        generation = 0
+        for op in ops:
+            if op[0] == "put":
+                self._put(op[1], op[2])
+            elif op[0] == "del":
+                self._remove(op[1])
+            elif op[0] == "texts":
+                generation = op[1]
+        self._log_lines = len(ops)
+        self._open_texts(generation)
+        for path in glob.glob(self._texts_path("*")):
+            if path != self._docstore.path:
+                os.remove(path)  # left by a compaction that did not finish
+        self._restore(meta)
+        if torn:
+            self._compact()
+
+    def _flush(self) -> None:
+        # Vectors reach disk before the table entries that make them visible.
+        if self.directory:
+            for array in self._arrays():
+                array.flush()
+
+    def _log(self, ops: list) -> None:
+        """Append table changes, compacting the log once it dwarfs the table."""
+        if not self.directory or not ops:
+            return
+        self._log_lines += len(ops)
+        if self._log_lines > 2 * len(self._ids) + _MIN_CAPACITY:
+            self._compact()
+            return
+        with open(self._path(_TABLE_FILE), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(op) + "\n" for op in ops)
+
+    def _compact(self) -> None:
+        """Rewrite the table log as one entry per stored row.
+
+        Replaced and deleted texts are dropped by first copying the live
+        ones to a new docstore file; the old file is removed once the
+        rewritten table points at the new one.
+        """
+        old = None
+        if self._docstore.records > len(self._refs):
+            old = self._docstore
+            self._docstore, self._refs = old.copy(self._refs, self._texts_path(self._generation + 1))
+            self._generation += 1
+        ops = [["texts", self._generation]] + [["put", doc_id, ref]
+                                               for doc_id, ref in zip(self._ids, self._refs)]
+        self._log_lines = len(ops)
+        tmp_path = self._path(_TABLE_FILE) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(op) + "\n" for op in ops)
+        os.replace(tmp_path, self._path(_TABLE_FILE))
+        if old is not None:
+            old.close()
+            os.remove(old.path)
+
+    def _open_texts(self, generation: int) -> None:
+        if self._docstore is not None:
+            self._docstore.close()
+        self._generation = generation
+        self._docstore = ChunkDocstore(self._texts_path(generation) if self.directory else None)
+
+    def _texts_path(self, generation: int) -> str:
+        return self._path(_TEXTS_FILE.format(generation))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    return top[np.argsort(-scores[top])]
+
+
+def _map(path: str, dtype, shape: tuple) -> np.memmap:
+    """Map a file with the given shape, extending it if it is too small."""
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with open(path, "ab") as f:
+        if f.tell() < size:
+            f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
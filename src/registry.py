@@ -0,0 +1,302 @@
+"""Index registry module - shares loaded indexes across sessions."""
+
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.chatbot import invalidate_chatbots
+from src.config import INDEX_CACHE_SIZE, INDEX_WORKERS
+from src.manifest import scan_folder, corpus_fingerprint
+from src.vector_store import load_or_create_vector_store, drop_vector_store
+
+
+class IndexLease:
+    """A session's handle on a shared, read-only index.
+
+    A rebuild of the folder goes into a new generation of the index, so a
+    lease held across it keeps searching the chunks it was leased with.
+
+    The lease is returned to the registry by release() or, failing that, when
+    the lease is garbage collected along with the session that held it.
+    """
+
+    def __init__(self, registry, key: str, entry: dict):
+        self.fingerprint = key
+        self.vector_store = entry["vector_store"]
+        self.manifest = entry["manifest"]
+        self.num_chunks = entry["num_chunks"]
+        self.mounts = []
+        self._finalizer = weakref.finalize(self, registry._release, key, entry)
+
+    @property
+    def mounted_stores(self) -> list:
+        return [lease.vector_store for lease in self.mounts]
+
+    def mount(self, leases: list) -> None:
+        """Attach leases on shared base indexes, searched alongside this one.
+
+        They are released along with this lease, and its fingerprint and
+        chunk count then cover them too.
+        """
+        self.mounts = list(leases)
+        fingerprints = [self.fingerprint] + [lease.fingerprint for lease in leases]
+        self.fingerprint = hashlib.sha256("\n".join(fingerprints).encode()).hexdigest()
+        self.num_chunks += sum(lease.num_chunks for lease in leases)
+
+    def release(self) -> None:
+        """Give the index back to the registry; safe to call more than once."""
+        self._finalizer()
+        for lease in self.mounts:
+            lease.release()
+
+
+class IndexJob:
+    """Status of a background index build, safe to poll from any thread.
+
+    ``status`` goes from "queued" to "running" to "done" or "failed";
+    ``files_done`` and ``files_total`` track progress while it runs.
+    """
+
+    def __init__(self, key: str, folder_path: str):
+        self.fingerprint = key
+        self.folder_path = folder_path
+        self.status = "queued"
+        self.files_done = 0
+        self.files_total = 0
+        self.error = None
+        self.submitted = time.time()
+        self._finished = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    @property
+    def progress(self) -> float:
+        if self.status == "done":
+            return 1.0
+        return self.files_done / self.files_total if self.files_total else 0.0
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job has finished; returns whether it did."""
+        return self._finished.wait(timeout)
+
+    def _on_progress(self, done: int, total: int) -> None:
+        self.files_done, self.files_total = done, total
+
+    def _finish(self, error: Exception = None) -> None:
+        if error is not None:
+            self.status, self.error = "failed", f"{type(error).__name__}: {error}"
+        else:
+            self.status = "done"
+        self._finished.set()
+
+
+class IndexRegistry:
+    """Process-wide indexes keyed by corpus fingerprint.
+
+    Indexes are reference counted by their leases. Once nobody holds one it
+    stays cached for reuse, and the least recently used idle indexes beyond
+    ``max_idle`` are dropped. Each tenant has its own folder, so idle
+    tenants are evicted this way while shared base corpora mounted into
+    active tenants stay loaded. Indexes can also be built in the background
+    by ``submit``, on a pool of ``workers`` threads.
+
+    Builds for one folder run one at a time, each into a new generation
+    (``stats["directory"]``) copied from the one it replaces
+    (``stats["replaced"]``). A finished build retires the folder's other
+    indexes: they are never leased again, and ``dropper(vector_store,
+    directory)`` deletes each one's generation once no lease holds it.
+    Chains cached for an evicted or dropped index are invalidated with it.
+    """
+
+    def __init__(self, max_idle: int = INDEX_CACHE_SIZE, builder=load_or_create_vector_store,
+                 workers: int = INDEX_WORKERS, dropper=drop_vector_store):
+        self._max_idle = max_idle
+        self._builder = builder
+        self._dropper = dropper
+        # Re-entrant because lease finalizers can run during garbage
+        # collection triggered while this thread already holds the lock.
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._building = {}
+        self._manifests = {}
+        self._jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index")
+
+    def acquire(self, folder_path: str, on_progress=None, mounts: tuple = ()) -> IndexLease:
+        """Lease the index for a folder's current contents, building it if needed.
+
+        ``on_progress`` is passed to the builder, so it only fires for the
+        session that actually builds the index. The indexes of the folders in
+        ``mounts`` are leased too and mounted read-only into the returned
+        lease; each is built once and shared by every tenant that mounts it.
+        """
+        key = self._fingerprint(folder_path)
+        with self._lock:
+            lease = self._lease_existing(key)
+        if not lease:
+            lease = self._build(key, folder_path, on_progress)
+        if mounts:
+            lease.mount([self.acquire(path) for path in mounts])
+        return lease
+
+    def submit(self, folder_path: str) -> IndexJob:
+        """Build a folder's index in the background and return the job.
+
+        Sessions keep serving from the index they hold while the job runs,
+        then ``acquire`` the new one once the job is done. Submitting a
+        corpus that is already queued or building returns the existing job,
+        and one that is already built returns a finished job at once.
+        """
+        key = self._fingerprint(folder_path)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.finished:
+                return job
+            job = IndexJob(key, folder_path)
+            if self._current(key) is not None:
+                job._finish()
+                return job
+            self._jobs[key] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: IndexJob) -> None:
+        job.status = "running"
+        try:
+            # Built with no lease held: the index waits, idle, for acquire().
+            self._build(job.fingerprint, job.folder_path, job._on_progress).release()
+        except Exception as e:
+            job._finish(e)
+        else:
+            job._finish()
+        finally:
+            with self._lock:
+                if self._jobs.get(job.fingerprint) is job:
+                    del self._jobs[job.fingerprint]
+
+    def _fingerprint(self, folder_path: str) -> str:
+        with self._lock:
+            previous = self._manifests.get(folder_path)
+        return corpus_fingerprint(scan_folder(folder_path, previous))
+
+    def _build(self, key: str, folder_path: str, on_progress) -> IndexLease:
+        with self._lock:
+            build_lock = self._building.setdefault(folder_path, threading.Lock())
+
+        # Only one session builds a given folder; the rest wait and share it.
+        with build_lock:
+            with self._lock:
+                lease = self._lease_existing(key)
+                if lease:
+                    return lease
+            vector_store, manifest, stats = self._builder(folder_path, on_progress=on_progress)
+            with self._lock:
+                # Older indexes of the folder are superseded, held or not.
+                unused = self._retire(folder_path)
+                replaced = stats.get("replaced")
+                known = [entry.get("directory") for entry in list(self._entries.values()) + unused]
+                if replaced and replaced not in known:
+                    # Evicted or left by an earlier process: nothing has it open.
+                    unused.append({"vector_store": None, "directory": replaced})
+                self._entries[key] = {
+                    "vector_store": vector_store,
+                    "manifest": manifest,
+                    "num_chunks": stats["chunks"],
+                    "folder": folder_path,
+                    "directory": stats.get("directory"),
+                    "retired": False,
+                    "refs": 1,
+                }
+                self._manifests[folder_path] = manifest
+                lease = IndexLease(self, key, self._entries[key])
+                evicted = self._evict()
+            self._forget(evicted)
+            self._drop(unused)
+            return lease
+
+    def stats(self) -> dict:
+        """Counts of cached indexes, split by whether a session holds them."""
+        with self._lock:
+            in_use = sum(1 for entry in self._entries.values() if entry["refs"] > 0)
+            return {"indexes": len(self._entries), "in_use": in_use, "idle": len(self._entries) - in_use}
+
+    def _current(self, key: str):
+        entry = self._entries.get(key)
+        return None if entry is None or entry["retired"] else entry
+
+    def _lease_existing(self, key: str):
+        entry = self._current(key)
+        if entry is None:
+            return None
+        entry["refs"] += 1
+        self._entries.move_to_end(key)
+        return IndexLease(self, key, entry)
+
+    def _retire(self, folder_path: str) -> list:
+        """Mark a folder's indexes superseded; returns the idle ones, now removed."""
+        unused = []
+        for key, entry in list(self._entries.items()):
+            if entry["folder"] == folder_path:
+                entry["retired"] = True
+                if entry["refs"] <= 0:
+                    unused.append(self._entries.pop(key))
+        return unused
+
+    def _release(self, key: str, entry: dict) -> None:
+        with self._lock:
+            entry["refs"] -= 1
+            if self._entries.get(key) is not entry:
+                return
+            if entry["retired"] and entry["refs"] <= 0:
+                del self._entries[key]
+                evicted, unused = [], [entry]
+            else:
+                self._entries.move_to_end(key)
+                evicted, unused = self._evict(), []
+        self._forget(evicted)
+        self._drop(unused)
+
+    def _drop(self, entries: list) -> None:
+        """Delete the generations of superseded indexes nobody holds any more."""
+        self._forget(entries)
+        for entry in entries:
+            if entry.get("directory"):
+                self._dropper(entry["vector_store"], entry["directory"])
+
+    def _forget(self, entries: list) -> None:
+        """Invalidate the cached chatbots of indexes the registry no longer holds."""
+        for entry in entries:
+            if entry.get("vector_store") is not None:
+                invalidate_chatbots(entry["vector_store"])
+
+    def _evict(self) -> list:
+        """Remove the least recently used idle indexes beyond max_idle; returns them."""
+        idle = [key for key, entry in self._entries.items() if entry["refs"] <= 0]
+        return [self._entries.pop(key) for key in idle[:max(0, len(idle) - self._max_idle)]]
+
+
+_registry = IndexRegistry()
+
+
+def get_registry() -> IndexRegistry:
+    """Return the process-wide registry."""
+    return _registry
+
+
+def acquire_index(folder_path: str, on_progress=None, mounts: tuple = ()) -> IndexLease:
+    """Lease a folder's index from the process-wide registry."""
+    return _registry.acquire(folder_path, on_progress, mounts)
+
+
+def submit_index(folder_path: str) -> IndexJob:
+    """Build a folder's index in the background on the process-wide registry."""
+    return _registry.submit(folder_path)
+
+
+def registry_stats() -> dict:
+    """Counts for the process-wide registry."""
+    return _registry.stats()
@@ -0,0 +1,134 @@
+"""Reranker module - reorders retrieved chunks with a local cross-encoder."""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from src import metrics
+from src.config import (
+    TOP_K, RERANK_MODEL, RERANK_TIMEOUT, RERANK_CACHE_SIZE, RERANK_MAX_PENDING,
+)
+from src.manifest import hash_chunk
+
+logger = logging.getLogger(__name__)
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+class Reranker:
+    """Scores (question, chunk) pairs and keeps the best chunks.
+
+    All pairs not already in the score cache are scored in one batched
+    call. ``scorer`` takes a list of (question, text) pairs and returns
+    their scores; by default it is a CPU cross-encoder loaded on first use.
+    Scoring runs on a worker thread, and a request that would wait more
+    than ``timeout`` seconds keeps the retrieval order instead. The
+    abandoned work still finishes and fills the cache for next time. So
+    does a request that finds ``max_pending`` jobs already queued or
+    running, which keeps a slow model from piling up work, and one whose
+    scoring fails.
+    """
+
+    def __init__(self, scorer=None, model_name: str = RERANK_MODEL,
+                 timeout: float = RERANK_TIMEOUT, max_entries: int = RERANK_CACHE_SIZE,
+                 max_pending: int = RERANK_MAX_PENDING):
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.max_pending = max_pending
+        self._scorer = scorer
+        self._lock = threading.Lock()
+        self._scores = OrderedDict()
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+
+    def rerank(self, question: str, docs: list, k: int = TOP_K) -> list:
+        """Return the ``k`` best docs for the question, best first."""
+        if len(docs) <= 1:
+            return docs[:k]
+        keys = [(question, hash_chunk(doc.page_content)) for doc in docs]
+        with self._lock:
+            scores = {key: self._scores[key] for key in keys if key in self._scores}
+            for key in scores:
+                self._scores.move_to_end(key)
+        missing = {key: doc.page_content for key, doc in zip(keys, docs) if key not in scores}
+        metrics.count("rerank_cache_hits", len(keys) - len(missing))
+        metrics.count("rerank_cache_misses", len(missing))
+
+        if missing:
+            with self._lock:
+                busy = self._pending >= self.max_pending
+                if not busy:
+                    self._pending += 1
+            if busy:
+                metrics.count("rerank_skipped")
+                return docs[:k]
+            future = self._executor.submit(self._score, question, missing)
+            future.add_done_callback(self._finished)
+            try:
+                scores.update(future.result(timeout=self.timeout))
+            except FutureTimeout:
+                metrics.count("rerank_timeouts")
+                return docs[:k]
+            except Exception:
+                logger.warning("Rerank failed; keeping the retrieval order", exc_info=True)
+                metrics.count("rerank_failures")
+                return docs[:k]
+        order = sorted(range(len(docs)), key=lambda i: -scores[keys[i]])
+        return [docs[i] for i in order[:k]]
+
+    def _score(self, question: str, missing: dict) -> dict:
+        scorer = self._scorer or self._load()
+        values = scorer([(question, text) for text in missing.values()])
+        scored = dict(zip(missing, map(float, values)))
+        with self._lock:
+            self._scores.update(scored)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+        return scored
+
+    def _finished(self, future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _load(self):
+        # Only the worker thread loads the model, so no lock is needed.
+        from sentence_transformers import CrossEncoder
+        model = CrossEncoder(self.model_name, device="cpu")
+        self._scorer = lambda pairs: model.predict(pairs, batch_size=len(pairs))
+        return self._scorer
+
+
+class RerankingRetriever(BaseRetriever):
+    """Over-retrieves from another retriever and keeps the ``k`` best by reranking."""
+
+    retriever: BaseRetriever
+    reranker: Reranker
+    k: int = TOP_K
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> list:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self.rerank(query, docs)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> list:
+        docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return self.rerank(query, docs)
+
+    def rerank(self, query: str, docs: list) -> list:
+        with metrics.stage("rerank"):
+            return self.reranker.rerank(query, docs, self.k)
+
+
+def get_reranker() -> Reranker:
+    """Return the process-wide reranker, so its model and cache are shared."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = Reranker()
+        return _reranker
@@ -0,0 +1,142 @@
+"""Retrieval cache module - reuses the chunks retrieved for repeated questions."""
+
+import threading
+from collections import OrderedDict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src import metrics
+from src.config import TOP_K, RETRIEVAL_CACHE_SIZE
+from src.embedding_cache import query_key
+from src.manifest import hash_chunk
+
+
+class RetrievalCache:
+    """Chunk ids retrieved per corpus fingerprint, question and k.
+
+    Questions are matched after case and whitespace normalization. The
+    least recently used entries beyond ``max_entries`` are dropped. A new
+    fingerprint never sees results from older documents, so entries for
+    a changed index simply age out.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._counts = {"hits": 0, "misses": 0, "stale": 0}
+
+    def get(self, fingerprint: str, question: str, k: int):
+        """Return the cached chunk ids for the question, or None."""
+        key = (fingerprint, query_key(question), k)
+        with self._lock:
+            ids = self._entries.get(key)
+            if ids is None:
+                self._counts["misses"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+        return ids
+
+    def put(self, fingerprint: str, question: str, k: int, ids: list) -> None:
+        """Store the chunk ids retrieved for the question."""
+        key = (fingerprint, query_key(question), k)
+        with self._lock:
+            self._entries[key] = list(ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, fingerprint: str, question: str, k: int) -> None:
+        """Drop an entry whose chunks are no longer in the index."""
+        with self._lock:
+            if self._entries.pop((fingerprint, query_key(question), k), None) is not None:
+                self._counts["hits"] -= 1
+                self._counts["misses"] += 1
+                self._counts["stale"] += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters for the cache."""
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return dict(
+                self._counts,
+                hit_rate=self._counts["hits"] / lookups if lookups else 0.0,
+                entries=len(self._entries),
+            )
+
+
+class CachedRetriever(BaseRetriever):
+    """Serves repeated questions from a RetrievalCache.
+
+    Hits skip the query embedding and search entirely; their chunks are
+    read back by id from ``stores``. An entry whose chunks are missing is
+    treated as a miss.
+    """
+
+    retriever: BaseRetriever
+    cache: RetrievalCache
+    fingerprint: str
+    stores: list
+    k: int = TOP_K
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> list:
+        docs = self.lookup(query)
+        if docs is None:
+            docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            self.store(query, docs)
+        return docs
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> list:
+        docs = self.lookup(query)
+        if docs is None:
+            docs = await self.retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+            self.store(query, docs)
+        return docs
+
+    def lookup(self, query: str):
+        """Return the cached documents for a query, or None on a miss."""
+        with metrics.stage("retrieval_cache"):
+            ids = self.cache.get(self.fingerprint, query, self.k)
+            docs = fetch_by_ids(self.stores, ids) if ids is not None else None
+        if docs is not None and len(docs) != len(ids):
+            self.cache.discard(self.fingerprint, query, self.k)
+            docs = None
+        metrics.count("retrieval_cache_hits" if docs is not None else "retrieval_cache_misses")
+        return docs
+
+    def store(self, query: str, docs: list) -> None:
+        ids = [doc.id or hash_chunk(doc.page_content) for doc in docs]
+        self.cache.put(self.fingerprint, query, self.k, ids)
+
+
+def fetch_by_ids(stores: list, ids: list) -> list:
+    """Read chunks back by id from the first store holding each, in order."""
+    found = {}
+    for store in stores:
+        wanted = [chunk_id for chunk_id in ids if chunk_id not in found]
+        if not wanted:
+            break
+        if hasattr(store, "get"):
+            result = store.get(ids=wanted, include=["documents", "metadatas"])
+            for chunk_id, text, meta in zip(result["ids"], result["documents"], result["metadatas"]):
+                found[chunk_id] = Document(id=chunk_id, page_content=text, metadata=meta or {})
+        else:
+            found.update((doc.id, doc) for doc in store.get_by_ids(wanted))
+    return [found[chunk_id] for chunk_id in ids if chunk_id in found]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Return the process-wide retrieval cache, shared by every session."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RetrievalCache()
+    return _cache
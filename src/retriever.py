@@ -0,0 +1,86 @@
+"""Retriever module - hybrid lexical + dense retrieval, across mounted indexes."""
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from src import metrics
+from src.bm25 import BM25Index
+from src.config import TOP_K, HYBRID_FETCH_K, RRF_K
+from src.manifest import hash_chunk
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> list:
+    """Fuse ranked lists of keys into one, best first.
+
+    Each key scores ``sum(1 / (k + rank))`` over the lists it appears in,
+    so items ranked well by several retrievers rise to the top.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 and dense vector search with reciprocal rank fusion.
+
+    Both retrievers fetch ``fetch_k`` candidates; the ``k`` best fused
+    chunks are returned. Lexical hits missing from the dense results are
+    read back from the vector store by id.
+    """
+
+    vector_store: VectorStore
+    lexical: BM25Index
+    k: int = TOP_K
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> list:
+        return self.fuse(query, self.vector_store.similarity_search(query, k=self.fetch_k))
+
+    def fuse(self, query: str, dense: list) -> list:
+        """Fuse a query's dense results with its BM25 results into the ``k`` best documents."""
+        with metrics.stage("lexical_search"):
+            lexical = [chunk_id for chunk_id, _ in self.lexical.search(query, self.fetch_k)]
+
+        # Chunk ids are content hashes, so dense hits can be matched to lexical ones.
+        by_id = {hash_chunk(doc.page_content): doc for doc in dense}
+        fused = reciprocal_rank_fusion([list(by_id), lexical], self.rrf_k)[:self.k]
+        missing = [chunk_id for chunk_id in fused if chunk_id not in by_id]
+        if missing:
+            found = self.vector_store.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, meta in zip(found["ids"], found["documents"], found["metadatas"]):
+                by_id[chunk_id] = Document(page_content=text, metadata=meta or {})
+        return [by_id[chunk_id] for chunk_id in fused if chunk_id in by_id]
+
+
+class MountedRetriever(BaseRetriever):
+    """Searches a tenant's own index together with shared indexes mounted into it.
+
+    The rankings of the per-index retrievers are fused with reciprocal rank
+    fusion, and a chunk found in more than one index is returned once.
+    """
+
+    retrievers: list
+    k: int = TOP_K
+    rrf_k: int = RRF_K
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> list:
+        config = {"callbacks": run_manager.get_child()}
+        return self.fuse([retriever.invoke(query, config=config) for retriever in self.retrievers])
+
+    def fuse(self, results: list) -> list:
+        """Fuse one result list per index into the ``k`` best documents."""
+        by_id, rankings = {}, []
+        for docs in results:
+            ids = [hash_chunk(doc.page_content) for doc in docs]
+            for chunk_id, doc in zip(ids, docs):
+                by_id.setdefault(chunk_id, doc)
+            rankings.append(ids)
+        return [by_id[chunk_id] for chunk_id in reciprocal_rank_fusion(rankings, self.rrf_k)[:self.k]]
@@ -0,0 +1,239 @@
+"""Service module - headless HTTP API for ingesting documents and asking questions.
+
+Run with: uvicorn src.service:create_app --factory --port 8000
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from langchain_core.language_models import BaseChatModel
+from pydantic import BaseModel
+from src import metrics
+from src.answer_cache import AnswerCache, get_answer_cache
+from src.chatbot import aask_stream, create_chatbot, get_chatbot
+from src.config import (
+    DOCUMENTS_DIR, SERVICE_WORKERS, SERVICE_MAX_PENDING, SERVICE_RETRY_AFTER, WARMUP,
+)
+from src.registry import IndexRegistry, get_registry
+from src.startup import start_warmup
+
+_EXTENSIONS = (".pdf", ".txt")
+
+
+class Question(BaseModel):
+    question: str
+
+
+class _Index:
+    """The leased index and the chatbot built on it, swapped in as one.
+
+    ``requests`` counts the questions admitted on it that are still
+    running; once it has been swapped out, the last of them releases the
+    lease.
+    """
+
+    def __init__(self, lease, chatbot):
+        self.lease = lease
+        self.chatbot = chatbot
+        self.requests = 0
+        self.retired = False
+
+
+class _Service:
+    """State shared by every request: the current index and the worker pool.
+
+    Embedding, retrieval and index swaps run on a pool of ``workers``
+    threads, so they never block the event loop; the LLM is awaited on the
+    loop itself. At most ``max_pending`` questions are in flight at once,
+    counting those waiting for a worker; the rest are turned away with a
+    503 and Retry-After.
+    """
+
+    def __init__(self, folder, registry, llm, cache, workers, max_pending):
+        self.folder = folder
+        self.registry = registry
+        self.llm = llm
+        self.cache = cache
+        self.max_pending = max_pending
+        self.pending = 0
+        self.index = None
+        self.job = None
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service")
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def admit(self) -> _Index:
+        """Claim a slot for a question, or refuse it when busy or empty."""
+        if self.index is None:
+            raise HTTPException(503, "No documents are indexed yet.")
+        if self.pending >= self.max_pending:
+            metrics.count("service_rejected")
+            raise HTTPException(503, "Too many questions in flight.",
+                                headers={"Retry-After": str(SERVICE_RETRY_AFTER)})
+        with self._lock:
+            self.pending += 1
+            index = self.index
+            index.requests += 1
+        return index
+
+    def done(self, index: _Index) -> None:
+        with self._lock:
+            self.pending -= 1
+            index.requests -= 1
+            release = index.retired and not index.requests
+        if release:
+            index.lease.release()
+
+    def events(self, index: _Index, question: str):
+        return aask_stream(index.chatbot, question, self.cache, index.lease.fingerprint,
+                           executor=self.executor)
+
+    def load(self) -> None:
+        """Lease the folder's current index and swap it in (runs on a worker)."""
+        lease = self.registry.acquire(self.folder)
+        if not lease.num_chunks:
+            lease.release()
+            return
+        if self.llm is None:
+            chatbot = get_chatbot(lease.vector_store, fingerprint=lease.fingerprint)
+        else:
+            chatbot = create_chatbot(lease.vector_store, llm=self.llm, fingerprint=lease.fingerprint)
+        # Requests already running keep the index they started with; the
+        # last of them to finish releases it.
+        with self._lock:
+            old, self.index = self.index, _Index(lease, chatbot)
+            if old is not None:
+                old.retired = True
+            release = old is not None and not old.requests
+        if release:
+            old.lease.release()
+
+    async def ingest(self):
+        """Index the folder in the background, swapping it in once it is built."""
+        job = self.registry.submit(self.folder)
+        if job is not self.job:
+            self.job = job
+            asyncio.get_running_loop().create_task(self._swap_when_done(job))
+        return job
+
+    async def _swap_when_done(self, job) -> None:
+        await asyncio.to_thread(job.wait)
+        if job.status == "done":
+            await self.run(self.load)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.index is not None:
+            self.index.lease.release()
+
+
+def create_app(folder: str = DOCUMENTS_DIR, registry: IndexRegistry = None,
+               llm: BaseChatModel = None, cache: AnswerCache = None,
+               workers: int = SERVICE_WORKERS, max_pending: int = SERVICE_MAX_PENDING) -> FastAPI:
+    """Create the HTTP service for one document folder.
+
+    The folder's index is loaded at startup and shared by every request.
+    Uses Claude and the process-wide registry and answer cache unless
+    others are given.
+    """
+    service = _Service(folder, registry or get_registry(), llm, cache, workers, max_pending)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        os.makedirs(folder, exist_ok=True)
+        if WARMUP and llm is None:
+            # Models load alongside the index instead of on the first question.
+            start_warmup()
+        if service.cache is None:
+            service.cache = await service.run(get_answer_cache)
+        await service.run(service.load)
+        yield
+        service.close()
+
+    app = FastAPI(title="DocuChat AI", lifespan=lifespan)
+    app.state.service = service
+
+    @app.get("/health")
+    async def health():
+        index = service.index
+        return {
+            "fingerprint": index.lease.fingerprint if index else None,
+            "chunks": index.lease.num_chunks if index else 0,
+            "pending": service.pending,
+        }
+
+    @app.put("/documents/{name}", status_code=201)
+    async def upload(name: str, request: Request):
+        if os.path.basename(name) != name or not name.lower().endswith(_EXTENSIONS):
+            raise HTTPException(400, "Expected a .pdf or .txt file name.")
+        data = await request.body()
+        await asyncio.to_thread(_write, os.path.join(folder, name), data)
+        return {"name": name, "bytes": len(data)}
+
+    @app.post("/ingest", status_code=202)
+    async def ingest():
+        return _job_status(await service.ingest())
+
+    @app.get("/ingest")
+    async def ingest_status():
+        if service.job is None:
+            raise HTTPException(404, "Nothing has been ingested yet.")
+        return _job_status(service.job)
+
+    @app.post("/ask")
+    async def ask_question(body: Question):
+        index = service.admit()
+        try:
+            async for event in service.events(index, body.question):
+                result = event
+        finally:
+            service.done(index)
+        result.pop("type")
+        return _serialize(result)
+
+    @app.post("/ask/stream")
+    async def ask_question_stream(body: Question):
+        index = service.admit()
+
+        async def lines():
+            try:
+                async for event in service.events(index, body.question):
+                    yield json.dumps(_serialize(event)) + "\n"
+            finally:
+                service.done(index)
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+def _write(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _job_status(job) -> dict:
+    return {
+        "fingerprint": job.fingerprint,
+        "status": job.status,
+        "files_done": job.files_done,
+        "files_total": job.files_total,
+        "error": job.error,
+    }
+
+
+def _serialize(result: dict) -> dict:
+    """Make an ask result or stream event JSON-ready."""
+    if "sources" not in result:
+        return result
+    sources = [{"content": doc.page_content, "metadata": doc.metadata} for doc in result["sources"]]
+    return dict(result, sources=sources)
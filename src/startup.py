@@ -0,0 +1,113 @@
+"""Startup module - background warmup and an import-time profile for cold starts.
+
+Usage: python -m src.startup [--imports] [--top 15] [--warmup FOLDER]
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# What the app and service import before they can render or accept requests.
+STARTUP_MODULES = ("src.registry", "src.chatbot", "src.answer_cache", "src.document_loader")
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def warm_up(folder_path: str = None) -> dict:
+    """Load everything the first answer needs, returning seconds per step.
+
+    With a folder, its index is opened on the registry's background worker
+    while the embedding model and LLM client load here.
+    """
+    from src.chatbot import get_llm
+    from src.registry import submit_index
+    from src.vector_store import get_embeddings
+
+    seconds = {}
+    start = time.perf_counter()
+    job = submit_index(folder_path) if folder_path else None
+
+    step = time.perf_counter()
+    get_embeddings().embed_query("warmup")
+    seconds["embedding_model"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    get_llm()
+    seconds["llm_client"] = time.perf_counter() - step
+
+    if job is not None:
+        job.wait()
+        if job.error:
+            raise RuntimeError(job.error)
+        seconds["index_ready"] = time.perf_counter() - start
+    seconds["total"] = time.perf_counter() - start
+    return seconds
+
+
+def start_warmup(folder_path: str = None) -> threading.Thread:
+    """Run warm_up on a background thread, once per process.
+
+    Later calls return the thread started by the first. Failures are
+    logged, not raised: anything not warmed up just loads on first use.
+    """
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = threading.Thread(target=_warm_up_quietly, args=(folder_path,),
+                                       name="warmup", daemon=True)
+            _warmup.start()
+        return _warmup
+
+
+def _warm_up_quietly(folder_path: str) -> None:
+    try:
+        logger.info("Warmup took %s", json.dumps(warm_up(folder_path)))
+    except Exception:
+        logger.warning("Warmup failed", exc_info=True)
+
+
+def import_profile(modules=STARTUP_MODULES) -> dict:
+    """Import modules in a fresh interpreter; seconds spent per top-level package.
+
+    Each package's total counts only the time spent in its own modules, so
+    the totals add up to the whole import time.
+    """
+    code = "import " + ", ".join(modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--imports", action="store_true", help="profile startup imports")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--warmup", metavar="FOLDER", help="time a warmup with this folder")
+    args = parser.parse_args()
+
+    report = {}
+    if args.imports or not args.warmup:
+        packages = import_profile()
+        report["import_seconds"] = round(sum(packages.values()), 3)
+        report["imports"] = {name: round(s, 3) for name, s in list(packages.items())[:args.top]}
+    if args.warmup:
+        report["warmup_seconds"] = {name: round(s, 3) for name, s in warm_up(args.warmup).items()}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
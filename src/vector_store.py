@@ -1,11 +1,526 @@
 """Vector store management module."""
 
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from src.config import EMBEDDING_MODEL
+from langchain_core.embeddings import Embeddings
+from src import metrics
+from src.config import (
+    EMBEDDING_MODEL, PERSIST_DIR, TENANTS_DIR, EMBED_BATCH_SIZE,
+    EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_DTYPE,
+    VECTOR_BACKEND, NUMPY_STORE_DTYPE,
+    IVF_NLIST, IVF_PQ_M, IVF_NPROBE, IVF_REFINE, IVF_TRAIN_SIZE,
+)
+from src.bm25 import BM25Index, LEXICAL_FILENAME, attach_lexical_index
+from src.dedup import DEDUP_FILENAME, NearDuplicateIndex
+from src.document_loader import iter_loaded_files, iter_chunks, batched
+from src.embedding_cache import CachedEmbeddings
+from src.manifest import (
+    MANIFEST_FILENAME, new_manifest, is_compatible, scan_folder, diff_manifest,
+    chunk_ids, hash_chunk, load_manifest, save_manifest, corpus_fingerprint,
+)
+from src.ivf_store import IvfPqVectorStore
+from src.numpy_store import NumpyVectorStore, _META_FILE
 
 
-def create_vector_store(chunks: list) -> Chroma:
-    """Create an in-memory vector store from document chunks."""
-    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-    return Chroma.from_documents(documents=chunks, embedding=embeddings)
+_embeddings = None
+_embeddings_lock = threading.Lock()
+_TENANT_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+CURRENT_FILENAME = "current.json"
+# Only ever rewritten whole, through a temporary file and os.replace, so a new
+# generation can share them with the one it was copied from until it does.
+_REPLACED_FILES = {MANIFEST_FILENAME, LEXICAL_FILENAME, DEDUP_FILENAME, _META_FILE}
+
+
+class _LazyEmbeddings(Embeddings):
+    """Embeddings that build their model on first use.
+
+    Opening an index only needs the embedding function, not the model, so
+    a warm start can serve from disk while the model is still loading.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+
+    def model(self) -> Embeddings:
+        with self._lock:
+            if self._model is None:
+                with metrics.stage("load_embedding_model"):
+                    self._model = self._factory()
+            return self._model
+
+    def embed_documents(self, texts: list) -> list:
+        return self.model().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return self.model().embed_query(text)
+
+
+def _load_embedding_model() -> Embeddings:
+    # Imports sentence-transformers and torch, which take seconds.
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def get_embeddings() -> Embeddings:
+    """Return the process-wide embedding model.
+
+    Document embeddings go through a disk cache keyed by text and model, so
+    chunks seen before (in any corpus, in any run) are never re-embedded.
+    The model itself is loaded on first use; see src.startup.start_warmup.
+    """
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = CachedEmbeddings(
+                _LazyEmbeddings(_load_embedding_model),
+                model_name=EMBEDDING_MODEL,
+                cache_dir=EMBEDDING_CACHE_DIR,
+                max_entries=EMBEDDING_CACHE_SIZE,
+                dtype=EMBEDDING_CACHE_DTYPE,
+            )
+    return _embeddings
+
+
+def create_vector_store(chunks, batch_size: int = EMBED_BATCH_SIZE, on_progress=None,
+                        embeddings: Embeddings = None, collection_name: str = "langchain") -> Chroma:
+    """Create an in-memory vector store from a list or stream of chunks.
+
+    Duplicate and near-duplicate chunks are stored once. A BM25 index of the
+    same chunks is built alongside and attached to the store for hybrid
+    retrieval.
+    """
+    vector_store = _new_store(collection_name, None, embeddings or get_embeddings())
+    lexical = BM25Index()
+    add_chunks_in_batches(vector_store, chunks, batch_size=batch_size, on_progress=on_progress,
+                          lexical=lexical, dedup=NearDuplicateIndex())
+    attach_lexical_index(vector_store, lexical)
+    return vector_store
+
+
+def add_chunks_in_batches(vector_store: Chroma, chunks, batch_size: int = EMBED_BATCH_SIZE,
+                          on_progress=None, lexical: BM25Index = None,
+                          dedup: NearDuplicateIndex = None) -> int:
+    """Embed and upsert a stream of chunks a batch at a time.
+
+    Chunks are stored under their content hash, and also indexed in
+    ``lexical`` when one is given. A chunk identical to one already stored,
+    or nearly so according to ``dedup``, is not embedded again; its source
+    is added to the stored chunk's ``sources`` metadata instead. Only one
+    batch of chunks and their embeddings is held at once, so memory stays
+    flat however large the stream is. ``on_progress`` is called with the
+    running chunk count after every batch. Returns the number added.
+    """
+    added = 0
+    stored, shared = set(), {}
+    for batch in batched(chunks, batch_size):
+        unique = {}
+        for chunk in batch:
+            cid = hash_chunk(chunk.page_content)
+            if dedup is not None and cid not in stored:
+                with metrics.stage("dedup"):
+                    cid = dedup.find_or_add(cid, chunk.page_content)
+            if cid in stored or cid in unique:
+                metrics.count("duplicate_chunks")
+                shared.setdefault(cid, set()).add(chunk.metadata.get("source"))
+            else:
+                unique[cid] = chunk
+        if unique:
+            vector_store.add_documents(list(unique.values()), ids=list(unique))
+        if lexical is not None:
+            lexical.add(list(unique), [chunk.page_content for chunk in unique.values()])
+        stored.update(unique)
+        added += len(batch)
+        if on_progress:
+            on_progress(added)
+
+    for batch in batched(sorted(shared), batch_size):
+        existing = vector_store.get(ids=batch, include=["metadatas"])
+        metadatas = []
+        for cid, meta in zip(existing["ids"], existing["metadatas"]):
+            sources = (shared[cid] | {(meta or {}).get("source")}) - {None}
+            metadatas.append(dict(meta or {}, sources="\n".join(sorted(sources))))
+        _update_metadata(vector_store, existing["ids"], metadatas)
+    return added
+
+
+def tenant_folder(tenant_id: str, root: str = TENANTS_DIR) -> str:
+    """A tenant's own documents folder, created if missing.
+
+    Collections and manifests are derived from the folder, so every tenant
+    gets its own, and an upload only invalidates its tenant's index.
+    """
+    if not _TENANT_ID.fullmatch(tenant_id):
+        raise ValueError(f"Invalid tenant id {tenant_id!r}")
+    folder = os.path.join(root, tenant_id)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def collection_name_for(folder_path: str) -> str:
+    """Derive a stable Chroma collection name for a documents folder."""
+    digest = hashlib.sha256(os.path.abspath(folder_path).encode("utf-8")).hexdigest()
+    return f"docs-{digest[:16]}"
+
+
+def store_directory_for(folder_path: str, persist_dir: str = PERSIST_DIR) -> str:
+    """Directory holding a folder's index generations and the pointer to the current one.
+
+    Each backend gets its own directory, so switching VECTOR_BACKEND never
+    pairs a manifest with vectors it does not describe.
+    """
+    directory = os.path.join(persist_dir, collection_name_for(folder_path))
+    return directory if VECTOR_BACKEND == "chroma" else os.path.join(directory, VECTOR_BACKEND)
+
+
+def open_vector_store(collection_name: str, persist_directory: str = None) -> Chroma:
+    """Open a vector store, in memory unless a persist directory is given."""
+    return _new_store(collection_name, persist_directory, get_embeddings())
+
+
+def _new_store(collection_name: str, directory: str, embeddings: Embeddings):
+    """Instantiate the store selected by VECTOR_BACKEND."""
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore(embeddings, directory=directory, dtype=NUMPY_STORE_DTYPE)
+    if VECTOR_BACKEND == "ivf":
+        return IvfPqVectorStore(
+            embeddings, directory=directory, nlist=IVF_NLIST, m=IVF_PQ_M,
+            nprobe=IVF_NPROBE, refine=IVF_REFINE, train_size=IVF_TRAIN_SIZE,
+        )
+    if VECTOR_BACKEND != "chroma":
+        raise ValueError(f"Unknown VECTOR_BACKEND {VECTOR_BACKEND!r}")
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=directory,
+    )
+
+
+def load_or_create_vector_store(folder_path: str, persist_dir: str = PERSIST_DIR,
+                                on_progress=None, embeddings: Embeddings = None) -> tuple:
+    """Open the persisted index for a folder, embedding only what changed.
+
+    Each version of the folder is indexed into its own generation directory,
+    which is never written to once it is current. When the current
+    generation's manifest still matches the folder it is opened as it is, so
+    a warm start only pays for opening the collection. Otherwise it is
+    copied to a new generation, the copy is synced with the folder and
+    becomes current, and sessions still searching the old one are not
+    disturbed; drop_vector_store deletes it once they are done. The copy
+    hard-links the side files that are only ever replaced whole, but the
+    vectors and texts, which are written in place, are copied in full. The folder's
+    BM25 index and the MinHash signatures used to spot near-duplicate chunks
+    are kept in each generation too. Returns the store, its manifest and sync
+    stats, with the generation's directory in ``stats["directory"]`` and the
+    one it replaced, if any, in ``stats["replaced"]``.
+    """
+    root = store_directory_for(folder_path, persist_dir)
+    current = _current_generation(root)
+    if current is not None:
+        manifest = load_manifest(os.path.join(current, MANIFEST_FILENAME))
+        if corpus_fingerprint(manifest["files"]) == corpus_fingerprint(scan_folder(folder_path, manifest)):
+            return _open_generation(folder_path, current, on_progress, embeddings, None)
+
+    directory = os.path.join(root, f"gen-{uuid.uuid4().hex[:12]}")
+    if current is not None:
+        shutil.copytree(current, directory, copy_function=_copy_generation_file)
+    try:
+        result = _open_generation(folder_path, directory, on_progress, embeddings, current)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    _write_current(root, directory)
+    return result
+
+
+def drop_vector_store(vector_store, directory: str) -> None:
+    """Delete a generation that is no longer current, closing its store first if open."""
+    if vector_store is not None:
+        vector_store.delete_collection()
+        client = getattr(vector_store, "_client", None)
+        if hasattr(client, "close"):
+            client.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _open_generation(folder_path: str, directory: str, on_progress, embeddings, replaced) -> tuple:
+    """Open one generation's store and side indexes and sync them with the folder."""
+    collection_name = collection_name_for(folder_path)
+    manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+    lexical_path = os.path.join(directory, LEXICAL_FILENAME)
+    dedup_path = os.path.join(directory, DEDUP_FILENAME)
+    manifest = load_manifest(manifest_path)
+    embeddings = embeddings or get_embeddings()
+
+    vector_store = _new_store(collection_name, directory, embeddings)
+    lexical = BM25Index.load(lexical_path)
+    dedup = NearDuplicateIndex.load(dedup_path)
+    if not manifest["files"] and _count(vector_store):
+        # Vectors without a usable manifest were built with other settings.
+        vector_store.delete_collection()
+        vector_store = _new_store(collection_name, directory, embeddings)
+        lexical, dedup = BM25Index(), NearDuplicateIndex()
+    elif lexical.count() != _count(vector_store) or dedup.count() != _count(vector_store):
+        # Indexes built before these side indexes existed, or out of step with them.
+        found = vector_store.get(include=["documents"])
+        if lexical.count() != len(found["ids"]):
+            lexical = BM25Index()
+            lexical.add(found["ids"], found["documents"])
+        if dedup.count() != len(found["ids"]):
+            dedup = NearDuplicateIndex()
+            for chunk_id, text in zip(found["ids"], found["documents"]):
+                dedup.add(chunk_id, dedup.signature(text))
+
+    updated, stats = sync_vector_store(
+        vector_store, folder_path, manifest, manifest_path, on_progress=on_progress,
+        lexical=lexical, lexical_path=lexical_path, dedup=dedup, dedup_path=dedup_path,
+    )
+    attach_lexical_index(vector_store, lexical)
+    return vector_store, updated, dict(stats, directory=directory, replaced=replaced)
+
+
+def _current_generation(root: str):
+    """Directory of a folder's current generation, or None if there is none."""
+    try:
+        with open(os.path.join(root, CURRENT_FILENAME), encoding="utf-8") as f:
+            directory = os.path.join(root, json.load(f)["generation"])
+    except (OSError, ValueError, KeyError):
+        return None
+    return directory if os.path.isdir(directory) else None
+
+
+def _copy_generation_file(source: str, target: str) -> str:
+    """Copy one file into a new generation, hard-linking it if it is never written in place."""
+    if os.path.basename(source) in _REPLACED_FILES:
+        try:
+            os.link(source, target)
+            return target
+        except OSError:
+            pass  # e.g. a filesystem without hard links
+    return shutil.copy2(source, target)
+
+
+def _write_current(root: str, directory: str) -> None:
+    """Point a folder at a new generation atomically."""
+    path = os.path.join(root, CURRENT_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"generation": os.path.basename(directory)}, f)
+    os.replace(tmp_path, path)
+
+
+def sync_vector_store(vector_store: Chroma, folder_path: str, manifest: dict = None,
+                      manifest_path: str = None, batch_size: int = EMBED_BATCH_SIZE,
+                      on_progress=None, lexical: BM25Index = None, lexical_path: str = None,
+                      dedup: NearDuplicateIndex = None, dedup_path: str = None) -> tuple:
+    """Bring a vector store in line with a folder, embedding only what changed.
+
+    Chunks are stored under their content hash, so a chunk shared by several
+    files (or surviving an edit) is embedded once. Renamed files only have
+    their source metadata rewritten. Changed files are streamed page by page
+    through splitting, embedding and upserting in batches of ``batch_size``,
+    and ``on_progress(files_done, files_total)`` is called after every batch
+    and file. Returns the updated manifest and a dict of counts describing
+    the work done, including a ``trace`` of the time spent per stage; the
+    manifest is also saved to ``manifest_path`` when one is given. A BM25
+    ``lexical`` index is kept in step and saved to ``lexical_path``.
+
+    Identical chunks are always stored once. With a ``dedup`` index, a new
+    chunk that nearly duplicates a stored one (say, the same paragraph in
+    another version of a manual) is not embedded either: the files share
+    the stored chunk. A chunk shared by several files lists them all in its
+    ``sources`` metadata (one path per line). Stats report the duplicates
+    collapsed and the embedding time they saved, estimated from this run.
+    """
+    with metrics.trace("ingest") as current:
+        updated, stats = _sync(vector_store, folder_path, manifest, manifest_path,
+                               batch_size, on_progress, lexical, lexical_path, dedup, dedup_path)
+    return updated, dict(stats, trace=current.to_dict())
+
+
+def _sync(vector_store, folder_path, manifest, manifest_path, batch_size, on_progress,
+          lexical, lexical_path, dedup, dedup_path) -> tuple:
+    if manifest is None or not is_compatible(manifest):
+        manifest = new_manifest()
+
+    with metrics.stage("scan"):
+        scanned = scan_folder(folder_path, manifest)
+    diff = diff_manifest(manifest, scanned)
+    files = {name: dict(entry) for name, entry in manifest["files"].items()}
+
+    for name in diff["removed"]:
+        del files[name]
+
+    renamed_ids = []
+    for old_name, new_name in diff["renamed"]:
+        entry = files.pop(old_name)
+        entry.update(scanned[new_name])
+        files[new_name] = entry
+        renamed_ids.append((entry["chunks"], os.path.join(folder_path, new_name)))
+
+    old_ids = chunk_ids(manifest)
+    to_index = diff["added"] + diff["changed"]
+    # Chunks only the files being re-indexed use may go away, so they must
+    # not absorb new near-duplicates (an edited paragraph keeps its edit).
+    kept_ids = {cid for name, entry in files.items() if name not in diff["changed"] for cid in entry["chunks"]}
+    retiring = old_ids - kept_ids
+    seen, refreshed = set(), set()
+    to_embed, to_refresh = [], []
+    counts = {"embedded": 0, "refreshed": 0, "duplicates": 0, "near_duplicates": 0}
+
+    def flush_embed():
+        if to_embed:
+            with metrics.stage("embed_upsert"):
+                vector_store.add_documents([chunk for _, chunk in to_embed], ids=[cid for cid, _ in to_embed])
+            metrics.count("chunks_embedded", len(to_embed))
+            if lexical is not None:
+                with metrics.stage("lexical_index"):
+                    lexical.add([cid for cid, _ in to_embed], [chunk.page_content for _, chunk in to_embed])
+            counts["embedded"] += len(to_embed)
+            to_embed.clear()
+
+    def flush_refresh():
+        # Chunks that already had a vector only need fresh metadata.
+        if to_refresh:
+            with metrics.stage("metadata_update"):
+                _update_metadata(vector_store, [cid for cid, _ in to_refresh],
+                                 [chunk.metadata for _, chunk in to_refresh])
+            counts["refreshed"] += len(to_refresh)
+            refreshed.update(cid for cid, _ in to_refresh)
+            to_refresh.clear()
+
+    for done, (name, pages) in enumerate(iter_loaded_files(folder_path, to_index)):
+        ids = []
+        chunks = iter_chunks(pages)
+        for chunk in metrics.timed_iter("load_split", chunks):
+            cid = hash_chunk(chunk.page_content)
+            if cid in seen:
+                counts["duplicates"] += 1
+                ids.append(cid)
+                continue
+            if dedup is not None and cid not in old_ids:
+                with metrics.stage("dedup"):
+                    representative = dedup.find_or_add(cid, chunk.page_content, exclude=retiring)
+                if representative != cid:
+                    counts["near_duplicates"] += 1
+                    ids.append(representative)
+                    continue
+            ids.append(cid)
+            seen.add(cid)
+            if cid in old_ids:
+                to_refresh.append((cid, chunk))
+                if len(to_refresh) >= batch_size:
+                    flush_refresh()
+            else:
+                to_embed.append((cid, chunk))
+                if len(to_embed) >= batch_size:
+                    flush_embed()
+                    if on_progress:
+                        on_progress(done, len(to_index))
+        files[name] = dict(scanned[name], chunks=list(dict.fromkeys(ids)))
+        if on_progress:
+            on_progress(done + 1, len(to_index))
+    flush_embed()
+    flush_refresh()
+
+    with metrics.stage("metadata_update"):
+        for ids, source in renamed_ids:
+            _rewrite_source(vector_store, [cid for cid in ids if cid not in seen], source, batch_size)
+
+    updated = {"version": manifest["version"], "settings": manifest["settings"], "files": files}
+    live_ids = chunk_ids(updated)
+    stale = sorted(old_ids - live_ids)
+    with metrics.stage("delete"):
+        for batch in batched(stale, batch_size):
+            vector_store.delete(ids=batch)
+        if lexical is not None:
+            lexical.delete(stale)
+        if dedup is not None:
+            dedup.delete(stale)
+
+    with metrics.stage("metadata_update"):
+        _update_sources(vector_store, folder_path, manifest, updated, refreshed, batch_size)
+
+    collapsed = counts["duplicates"] + counts["near_duplicates"]
+    metrics.count("duplicate_chunks", counts["duplicates"])
+    metrics.count("near_duplicate_chunks", counts["near_duplicates"])
+    current = metrics.current_trace()
+    embed_ms = current.stages.get("embed_upsert", 0.0) if current else 0.0
+    stats = {
+        "embedded": counts["embedded"],
+        "deleted": len(stale),
+        "refreshed": counts["refreshed"],
+        "renamed": len(diff["renamed"]),
+        "chunks": len(live_ids),
+        "duplicates": counts["duplicates"],
+        "near_duplicates": counts["near_duplicates"],
+        "embed_seconds_saved": round(collapsed * embed_ms / 1000 / counts["embedded"], 3)
+        if counts["embedded"] else 0.0,
+    }
+    # The manifest is written last: a crash before it just redoes the sync.
+    if lexical is not None and lexical_path:
+        lexical.save(lexical_path)
+    if dedup is not None and dedup_path:
+        dedup.save(dedup_path)
+    if manifest_path and updated != manifest:
+        save_manifest(updated, manifest_path)
+    return updated, stats
+
+
+def _update_metadata(vector_store: Chroma, ids: list, metadatas: list) -> None:
+    """Replace chunk metadata in place without re-embedding."""
+    if isinstance(vector_store, NumpyVectorStore):
+        vector_store.update_metadata(ids, metadatas)
+    else:
+        vector_store._collection.update(ids=ids, metadatas=metadatas)
+
+
+def _update_sources(vector_store: Chroma, folder_path: str, old: dict, new: dict,
+                    refreshed: set, batch_size: int = EMBED_BATCH_SIZE) -> None:
+    """Record every file sharing a chunk in its ``sources`` metadata.
+
+    Only chunks whose set of files changed, or whose metadata was just
+    refreshed, are rewritten; chunks used by one file carry no list.
+    """
+    def files_by_chunk(manifest):
+        refs = {}
+        for name, entry in manifest["files"].items():
+            for cid in entry["chunks"]:
+                refs.setdefault(cid, []).append(name)
+        return refs
+
+    before, after = files_by_chunk(old), files_by_chunk(new)
+    changed = sorted(
+        cid for cid, names in after.items()
+        if (len(names) > 1 or len(before.get(cid, ())) > 1)
+        and (sorted(names) != sorted(before.get(cid, ())) or cid in refreshed)
+    )
+    for batch in batched(changed, batch_size):
+        existing = vector_store.get(ids=batch, include=["metadatas"])
+        metadatas = [
+            dict(meta or {}, sources="\n".join(os.path.join(folder_path, name) for name in sorted(after[cid])))
+            for cid, meta in zip(existing["ids"], existing["metadatas"])
+        ]
+        _update_metadata(vector_store, existing["ids"], metadatas)
+
+
+def _count(vector_store: Chroma) -> int:
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.count()
+    return vector_store._collection.count()
+
+
+def _rewrite_source(vector_store: Chroma, ids: list, source: str,
+                    batch_size: int = EMBED_BATCH_SIZE) -> None:
+    """Point existing chunks at a renamed file."""
+    for batch in batched(ids, batch_size):
+        existing = vector_store.get(ids=batch, include=["metadatas"])
+        metadatas = [dict(meta or {}, source=source) for meta in existing["metadatas"]]
+        _update_metadata(vector_store, existing["ids"], metadatas)
@@ -0,0 +1,57 @@
+"""Tests for the answer cache module."""
+
+from src.answer_cache import AnswerCache
+
+
+class KeywordEmbeddings:
+    """Embeds questions by which keywords they mention."""
+
+    KEYWORDS = ["rag", "vector", "career"]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [1.0 if word in text else 0.0 for word in self.KEYWORDS] + [0.1]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    """Test that trivially different phrasings hit the same entry."""
+    cache = AnswerCache()
+    cache.put("What is RAG?", "corpus-1", {"answer": "Retrieval."})
+    assert cache.get("  what is rag", "corpus-1") == {"answer": "Retrieval."}
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_match_uses_threshold():
+    """Test that paraphrases hit only above the similarity threshold."""
+    cache = AnswerCache(KeywordEmbeddings(), threshold=0.95)
+    cache.put("Explain RAG", "corpus-1", {"answer": "Retrieval."})
+    assert cache.get("Tell me about RAG", "corpus-1") == {"answer": "Retrieval."}
+    assert cache.get("Tell me about vector databases", "corpus-1") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_new_fingerprint_misses():
+    """Test that answers do not leak across document versions."""
+    cache = AnswerCache(KeywordEmbeddings())
+    cache.put("What is RAG?", "corpus-1", {"answer": "Old."})
+    assert cache.get("What is RAG?", "corpus-2") is None
+
+
+def test_entries_expire_and_evict():
+    """Test TTL expiry and LRU eviction."""
+    clock = FakeClock()
+    cache = AnswerCache(ttl=10, max_entries=1, clock=clock)
+    cache.put("first", "c", {"answer": 1})
+    cache.put("second", "c", {"answer": 2})
+    assert cache.get("first", "c") is None
+    assert cache.get("second", "c") == {"answer": 2}
+    clock.now = 11
+    assert cache.get("second", "c") is None
@@ -0,0 +1,118 @@
+"""Tests for the BM25 and hybrid retriever modules."""
+
+import os
+import tempfile
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.bm25 import BM25Index, attach_lexical_index, tokenize
+from src.chatbot import ask_many, create_chatbot
+from src.numpy_store import NumpyVectorStore
+from src.retriever import HybridRetriever, reciprocal_rank_fusion
+from src.vector_store import add_chunks_in_batches
+
+TEXTS = [
+    "The pump reported error ERR-404 after the firmware update.",
+    "Replace gasket XJ-9000 when the pump leaks.",
+    "The pump manual covers routine maintenance of the pump.",
+]
+
+
+def test_tokenize_keeps_part_numbers():
+    """Test that compound codes are kept whole and split into their parts."""
+    assert tokenize("Order XJ-9000/b now") == ["order", "xj-9000/b", "xj", "9000", "b", "now"]
+
+
+def test_search_ranks_rare_term_first():
+    """Test that the chunk containing a rare query term ranks first."""
+    index = BM25Index()
+    index.add(["a", "b", "c"], TEXTS)
+    hits = index.search("pump gasket xj-9000", k=3)
+    assert hits[0][0] == "b"
+    assert index.search("unknown words", k=3) == []
+
+
+def test_incremental_updates_survive_save_and_load():
+    """Test that adds and deletes give the same results before and after a reload."""
+    index = BM25Index()
+    index.add(["a", "b", "c"], TEXTS)
+    index.delete(["a"])
+    index.add(["d"], ["Error ERR-404 also appears on the XJ-9000 gasket."])
+    before = index.search("err-404", k=5)
+    assert [chunk_id for chunk_id, _ in before] == ["d"]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "bm25.npz")
+        index.save(path)
+        loaded = BM25Index.load(path)
+    assert loaded.count() == 3 and "a" not in loaded
+    assert [chunk_id for chunk_id, _ in loaded.search("err-404", k=5)] == ["d"]
+    assert loaded.search("gasket", k=5) == index.search("gasket", k=5)
+
+
+def test_frequent_term_scores_only_its_top_postings():
+    """Test that a capped frequent term still ranks its best chunks first, updates included."""
+    texts = [f"pump {'valve ' * (i + 1)}seal" for i in range(60)]
+    capped, exact = BM25Index(max_postings=5), BM25Index(max_postings=None)
+    for index in (capped, exact):
+        index.add([str(i) for i in range(60)], texts)
+    assert capped.search("valve", k=3) == exact.search("valve", k=3)
+    for index in (capped, exact):
+        index.add(["new"], ["valve " * 100])
+        index.delete(["59"])
+    assert capped.search("valve", k=3) == exact.search("valve", k=3)
+    assert capped.search("valve", k=3)[0][0] == "new"
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Test that items ranked by both lists beat items ranked by one."""
+    assert reciprocal_rank_fusion([["x", "y"], ["y", "z"]])[0] == "y"
+
+
+def test_chatbot_uses_hybrid_retrieval():
+    """Test that an attached BM25 index lets an exact code reach the answer context."""
+    store = NumpyVectorStore(DeterministicFakeEmbedding(size=16))
+    lexical = BM25Index()
+    chunks = [Document(page_content=text, metadata={"source": f"{i}.txt"})
+              for i, text in enumerate(TEXTS)]
+    add_chunks_in_batches(store, chunks, lexical=lexical)
+    attach_lexical_index(store, lexical)
+
+    chatbot = create_chatbot(store, llm=FakeListChatModel(responses=["ok"]))
+    assert isinstance(chatbot.retriever.retriever, HybridRetriever)
+    docs = chatbot.retriever.invoke("What does ERR-404 mean?")
+    assert "0.txt" in [doc.metadata["source"] for doc in docs]
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Counts embedding calls."""
+
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+def test_ask_many_embeds_hybrid_questions_in_one_call():
+    """Test that batched hybrid retrieval embeds all questions at once and still fuses BM25 hits."""
+    embeddings = CountingEmbeddings(size=16)
+    store = NumpyVectorStore(embeddings)
+    lexical = BM25Index()
+    chunks = [Document(page_content=text, metadata={"source": f"{i}.txt"})
+              for i, text in enumerate(TEXTS)]
+    add_chunks_in_batches(store, chunks, lexical=lexical)
+    attach_lexical_index(store, lexical)
+
+    chatbot = create_chatbot(store, llm=FakeListChatModel(responses=["ok"]), rerank=False)
+    embeddings.calls = 0
+    questions = ["What does ERR-404 mean?", "Which gasket is XJ-9000?"]
+    results = ask_many(chatbot, questions)
+    assert embeddings.calls == 1
+    assert [[doc.metadata["source"] for doc in r["sources"]] for r in results] == \
+        [[doc.metadata["source"] for doc in chatbot.retriever.invoke(q)] for q in questions]
+    assert "0.txt" in [doc.metadata["source"] for doc in results[0]["sources"]]
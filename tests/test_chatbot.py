@@ -0,0 +1,163 @@
+"""Tests for the chatbot module."""
+
+import asyncio
+import threading
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.answer_cache import AnswerCache
+from src.chatbot import (
+    create_chatbot, get_chatbot, invalidate_chatbots, ask, ask_stream, aask, ask_many,
+)
+
+
+def _chatbot(responses=("RAG retrieves context first.",)):
+    vector_store = InMemoryVectorStore.from_documents(
+        [Document(page_content="RAG stands for retrieval-augmented generation.",
+                  metadata={"source": "guide.txt"})],
+        DeterministicFakeEmbedding(size=16),
+    )
+    return create_chatbot(vector_store, llm=FakeListChatModel(responses=list(responses)))
+
+
+def test_ask_returns_answer_and_sources():
+    """Test that ask returns the LLM answer with its sources."""
+    result = ask(_chatbot(), "What is RAG?")
+    assert result["answer"] == "RAG retrieves context first."
+    assert result["sources"][0].metadata["source"] == "guide.txt"
+    assert result["cached"] is False
+
+
+def test_ask_stream_yields_sources_then_tokens():
+    """Test that streaming sends sources first and reassembles the answer."""
+    events = list(ask_stream(_chatbot(), "What is RAG?"))
+    assert events[0]["type"] == "sources"
+    tokens = [e["text"] for e in events if e["type"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == events[-1]["answer"] == "RAG retrieves context first."
+
+
+def test_ask_uses_answer_cache():
+    """Test that a repeated question is served from the cache."""
+    chatbot = _chatbot(responses=["first answer", "second answer"])
+    cache = AnswerCache()
+    ask(chatbot, "What is RAG?", cache, "corpus")
+    result = ask(chatbot, "what is rag", cache, "corpus")
+    assert result["answer"] == "first answer"
+    assert result["cached"] is True
+
+
+def test_ask_reports_stage_trace():
+    """Test that answers carry a per-stage timing breakdown."""
+    result = ask(_chatbot(), "What is RAG?")
+    assert {"retrieve", "prompt", "llm"} <= set(result["trace"]["stages"])
+    assert result["trace"]["counters"]["retrieved_chunks"] == 1
+    done = list(ask_stream(_chatbot(), "What is RAG?"))[-1]
+    assert {"retrieve", "llm_first_token", "llm"} <= set(done["trace"]["stages"])
+
+
+class RateLimitError(Exception):
+    """Mimics the provider's rate-limit error."""
+
+    status_code = 429
+
+
+class FlakyChatModel(FakeListChatModel):
+    """Fails with a rate-limit error on its first calls."""
+
+    failures: int = 1
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitError("slow down")
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def test_ask_many_keeps_question_order():
+    """Test that batched answers line up with their questions."""
+    chatbot = _chatbot(responses=["answer"])
+    results = ask_many(chatbot, ["What is RAG?", "Why chunk documents?"], max_concurrency=2)
+    assert [r["answer"] for r in results] == ["answer", "answer"]
+    assert all(r["sources"] for r in results)
+
+
+def test_ask_many_retries_rate_limits():
+    """Test that rate-limited requests are retried and others fail per question."""
+    vector_store = InMemoryVectorStore.from_documents(
+        [Document(page_content="RAG context.")], DeterministicFakeEmbedding(size=16)
+    )
+    chatbot = create_chatbot(vector_store, llm=FlakyChatModel(responses=["ok"], failures=1))
+    assert ask_many(chatbot, ["q"], backoff=0.001)[0]["answer"] == "ok"
+
+    chatbot = create_chatbot(vector_store, llm=FlakyChatModel(responses=["ok"], failures=5))
+    result = ask_many(chatbot, ["q"], max_retries=1, backoff=0.001)[0]
+    assert result["answer"] is None
+    assert "RateLimitError" in result["error"]
+
+
+def test_aask():
+    """Test the async ask."""
+    result = asyncio.run(aask(_chatbot(), "What is RAG?"))
+    assert result["answer"] == "RAG retrieves context first."
+
+
+def test_get_chatbot_reuses_chain_and_client(monkeypatch):
+    """Test that chains and the LLM client are built once per vector store."""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    vector_store = InMemoryVectorStore(DeterministicFakeEmbedding(size=16))
+    other_store = InMemoryVectorStore(DeterministicFakeEmbedding(size=16))
+
+    chatbot = get_chatbot(vector_store)
+    assert get_chatbot(vector_store) is chatbot
+    assert get_chatbot(other_store) is not chatbot
+    llm_of = lambda bot: bot.combine_documents_chain.llm_chain.llm
+    assert llm_of(get_chatbot(other_store)) is llm_of(chatbot)
+
+    invalidate_chatbots(vector_store)
+    assert get_chatbot(vector_store) is not chatbot
+
+
+def test_mounted_stores_are_searched_with_the_tenant_store():
+    """Test that a mounted base store's chunks are retrieved alongside the tenant's own."""
+    embeddings = DeterministicFakeEmbedding(size=16)
+    shared = Document(page_content="Shared chapter.", metadata={"source": "base.txt"})
+    own = InMemoryVectorStore.from_documents(
+        [Document(page_content="Tenant notes.", metadata={"source": "notes.txt"}), shared], embeddings)
+    base = InMemoryVectorStore.from_documents([shared], embeddings)
+    chatbot = create_chatbot(own, llm=FakeListChatModel(responses=["ok"]), mounts=(base,))
+
+    sources = [doc.metadata["source"] for doc in ask(chatbot, "What do the docs say?")["sources"]]
+    assert sorted(sources) == ["base.txt", "notes.txt"]
+    batch = ask_many(chatbot, ["What do the docs say?"])
+    assert len(batch[0]["sources"]) == 2
+
+
+class ThreadRecordingEmbeddings(DeterministicFakeEmbedding):
+    """Records the calls made to it and the threads they ran on."""
+
+    calls: list = []
+
+    def embed_query(self, text):
+        self.calls.append(("embed_query", threading.get_ident()))
+        return super().embed_query(text)
+
+    def embed_queries(self, texts):
+        self.calls.append(("embed_queries", threading.get_ident()))
+        return [DeterministicFakeEmbedding.embed_query(self, text) for text in texts]
+
+
+def test_async_asks_embed_for_the_cache_once_off_the_event_loop():
+    """Test that aask and ask_many embed each batch once, on a worker thread, for lookup and put."""
+    embeddings = ThreadRecordingEmbeddings(size=16, calls=[])
+    cache = AnswerCache(embeddings)
+    loop_thread = threading.get_ident()
+
+    ask_many(_chatbot(responses=["a", "b"]), ["What is RAG?", "Define vectors"], cache=cache,
+             fingerprint="corpus")
+    asyncio.run(aask(_chatbot(), "Explain chunking", cache, "corpus"))
+    assert [name for name, _ in embeddings.calls] == ["embed_queries", "embed_queries"]
+    assert all(thread != loop_thread for _, thread in embeddings.calls)
+    assert cache.get("what is rag", "corpus")["answer"] in ("a", "b")
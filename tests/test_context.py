@@ -0,0 +1,44 @@
+"""Tests for the context packing module."""
+
+from langchain_core.documents import Document
+from src.context import estimate_tokens, pack_context
+from src.document_loader import split_documents
+
+TEXT = " ".join(f"Sentence {i} explains part {i} of the manual." for i in range(200))
+
+
+def _chunks():
+    return split_documents([Document(page_content=TEXT, metadata={"source": "manual.txt"})])
+
+
+def test_overlapping_chunks_are_merged():
+    """Test that neighbouring chunks of one source become one block without repeated text."""
+    chunks = _chunks()
+    packed = pack_context([chunks[2], chunks[1]], budget=10_000)
+    assert len(packed) == 1
+    start = chunks[1].metadata["start_index"]
+    assert packed[0].page_content == TEXT[start:start + len(packed[0].page_content)]
+    assert packed[0].metadata["start_index"] == start
+
+
+def test_near_duplicates_are_dropped():
+    """Test that a copy of a chosen chunk in another file is left out."""
+    chunk = _chunks()[0]
+    copy = Document(page_content=chunk.page_content + " Copied.", metadata={"source": "copy.txt"})
+    assert pack_context([chunk, copy], budget=10_000) == [chunk]
+
+
+def test_budget_keeps_best_chunks_in_rank_order():
+    """Test that packing stays under budget, keeping higher-ranked chunks first."""
+    chunks = _chunks()
+    ranked = [chunks[9], chunks[0], chunks[5], chunks[3]]
+    budget = estimate_tokens(chunks[0].page_content) * 2 + 10
+    packed = pack_context(ranked, budget=budget)
+    assert [doc.page_content for doc in packed] == [chunks[9].page_content, chunks[0].page_content]
+    assert sum(estimate_tokens(doc.page_content) for doc in packed) <= budget
+
+
+def test_oversized_best_chunk_is_truncated():
+    """Test that the context is never empty, even under a tiny budget."""
+    packed = pack_context(_chunks()[:2], budget=10)
+    assert len(packed) == 1 and estimate_tokens(packed[0].page_content) <= 10
@@ -0,0 +1,85 @@
+"""Tests for the dedup module."""
+
+import os
+import random
+import tempfile
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.dedup import NearDuplicateIndex
+from src.numpy_store import NumpyVectorStore
+from src.vector_store import sync_vector_store
+
+WORDS = ["pump", "valve", "seal", "pressure", "manual", "replace", "check", "torque",
+         "bolt", "filter", "inspect", "flow", "gasket", "motor", "sensor", "drain"]
+
+
+def _paragraph(seed: int, words: int = 80) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randrange(50)) for _ in range(words))
+
+
+def test_finds_near_duplicates_only():
+    """Test that a lightly edited chunk matches and an unrelated one does not."""
+    index = NearDuplicateIndex()
+    original = _paragraph(1)
+    assert index.find_or_add("a", original) == "a"
+    assert index.find_or_add("b", original.replace("pump", "PUMP", 1) + " v2") == "a"
+    assert index.find_or_add("c", _paragraph(2)) == "c"
+    assert index.find_or_add("d", original, exclude={"a"}) == "d"
+
+
+def test_save_and_load_keep_matches():
+    """Test that saved signatures still match after a reload."""
+    index = NearDuplicateIndex()
+    index.find_or_add("a", _paragraph(1))
+    index.delete(["a"])
+    index.find_or_add("b", _paragraph(2))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "dedup.npz")
+        index.save(path)
+        loaded = NearDuplicateIndex.load(path)
+    assert loaded.count() == 1
+    assert loaded.find_or_add("c", _paragraph(2) + " extra") == "b"
+    assert loaded.find_or_add("d", _paragraph(1)) == "d"
+
+
+def test_sync_collapses_manual_versions():
+    """Test that a second version of a manual reuses chunks and lists both sources."""
+    chapters = [_paragraph(seed) for seed in range(6)]
+    with tempfile.TemporaryDirectory() as docs, tempfile.TemporaryDirectory() as store_dir:
+        with open(os.path.join(docs, "manual_v1.txt"), "w") as f:
+            f.write("\n\n".join(chapters))
+        with open(os.path.join(docs, "manual_v2.txt"), "w") as f:
+            f.write("\n\n".join(chapters[:-1] + [chapters[-1] + " Revised."]))
+
+        store = NumpyVectorStore(DeterministicFakeEmbedding(size=16), store_dir)
+        manifest, stats = sync_vector_store(store, docs, dedup=NearDuplicateIndex())
+        assert stats["embedded"] == stats["chunks"] == store.count() == 6
+        assert stats["duplicates"] == 5 and stats["near_duplicates"] == 1
+        assert stats["embed_seconds_saved"] >= 0
+        for meta in store.get(include=["metadatas"])["metadatas"]:
+            assert [os.path.basename(s) for s in meta["sources"].split("\n")] == [
+                "manual_v1.txt", "manual_v2.txt",
+            ]
+
+        os.remove(os.path.join(docs, "manual_v1.txt"))
+        manifest, stats = sync_vector_store(store, docs, manifest, dedup=NearDuplicateIndex())
+        assert stats["deleted"] == 0
+        for meta in store.get(include=["metadatas"])["metadatas"]:
+            assert os.path.basename(meta["sources"]) == "manual_v2.txt"
+
+
+def test_edited_chunk_is_not_folded_into_its_old_version():
+    """Test that a small edit to a file is embedded rather than matched to the text it replaces."""
+    with tempfile.TemporaryDirectory() as docs, tempfile.TemporaryDirectory() as store_dir:
+        path = os.path.join(docs, "manual.txt")
+        with open(path, "w") as f:
+            f.write(_paragraph(1))
+        store = NumpyVectorStore(DeterministicFakeEmbedding(size=16), store_dir)
+        dedup = NearDuplicateIndex()
+        manifest, _ = sync_vector_store(store, docs, dedup=dedup)
+
+        with open(path, "a") as f:
+            f.write(" Revised.")
+        manifest, stats = sync_vector_store(store, docs, manifest, dedup=dedup)
+        assert stats["embedded"] == stats["deleted"] == 1 and stats["near_duplicates"] == 0
+        assert store.get(include=["documents"])["documents"][0].endswith("Revised.")
@@ -0,0 +1,42 @@
+"""Tests for the docstore module."""
+
+import os
+import tempfile
+from src.docstore import ChunkDocstore
+
+
+def _records(n, start=0):
+    numbers = range(start, start + n)
+    texts = [f"Chunk {i}: valve {i} opens clockwise. " * 20 for i in numbers]
+    return texts, [{"source": "manual.txt", "i": i} for i in numbers]
+
+
+def test_round_trip_across_blocks_and_reopen():
+    """Test that records read back by ref before and after reopening, torn tail dropped."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "texts.bin")
+        texts, metadatas = _records(200)
+        store = ChunkDocstore(path, block_size=4096, cache_blocks=2)
+        refs = store.add(texts, metadatas)
+        assert store.get([refs[199], refs[0]]) == [(texts[199], metadatas[199]), (texts[0], metadatas[0])]
+        store.flush()
+        assert store.nbytes < sum(map(len, texts)) / 4
+
+        with open(path, "ab") as f:
+            f.write(b"\x40\x00\x00\x00\x01\x00\x00\x00partial")
+        reopened = ChunkDocstore(path, block_size=4096)
+        assert reopened.records == 200 and os.path.getsize(path) == store.nbytes
+        assert [text for text, _ in reopened.get(refs)] == texts
+        [text], [metadata] = _records(1, start=200)
+        assert reopened.get(reopened.add([text], [metadata])) == [(text, metadata)]
+
+
+def test_copy_keeps_only_live_records():
+    """Test that copying rewrites live records in order with new refs."""
+    store = ChunkDocstore(block_size=1024)
+    texts, metadatas = _records(50)
+    refs = store.add(texts, metadatas)
+    live = refs[::-5]
+    copied, new_refs = store.copy(live)
+    assert copied.records == len(live)
+    assert copied.get(new_refs) == store.get(live)
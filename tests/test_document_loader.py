@@ -1,8 +1,15 @@
 """Tests for the document loader module."""
 
 import os
+import random
 import tempfile
-from src.document_loader import load_documents, split_documents, get_document_names
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.document_loader import (
+    load_documents, load_documents_parallel, iter_documents, iter_loaded_files, iter_chunks, batched,
+    split_documents, get_document_names, OffsetTextSplitter,
+)
 
 
 def test_load_txt_documents():
@@ -63,3 +70,97 @@ def test_get_document_names_empty():
     with tempfile.TemporaryDirectory() as tmpdir:
         names = get_document_names(tmpdir)
         assert names == []
+
+
+def test_load_documents_parallel_is_ordered():
+    """Test that parallel loading returns documents in filename order."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ["b.txt", "a.txt", "c.txt"]:
+            with open(os.path.join(tmpdir, name), "w") as f:
+                f.write(f"Contents of {name}")
+
+        docs, failures = load_documents_parallel(tmpdir, max_workers=2)
+        assert failures == {}
+        assert [d.page_content for d in docs] == [
+            "Contents of a.txt", "Contents of b.txt", "Contents of c.txt",
+        ]
+
+
+def test_load_documents_parallel_reports_failures():
+    """Test that a broken file is reported without aborting the load."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, "good.txt"), "w") as f:
+            f.write("Still loaded.")
+        with open(os.path.join(tmpdir, "broken.pdf"), "w") as f:
+            f.write("not a pdf")
+
+        docs, failures = load_documents_parallel(tmpdir, max_workers=2)
+        assert [d.page_content for d in docs] == ["Still loaded."]
+        assert "broken.pdf" in failures
+
+
+def test_iter_loaded_files_on_a_pool_matches_serial():
+    """Test that the sync path's pooled loading yields each file in order, as serial loading does."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        names = ["a.txt", "b.txt", "c.txt"]
+        for name in names:
+            with open(os.path.join(tmpdir, name), "w") as f:
+                f.write(f"Contents of {name}")
+
+        def load(**kwargs):
+            return [(name, [d.page_content for d in pages])
+                    for name, pages in iter_loaded_files(tmpdir, names, **kwargs)]
+
+        assert load(max_workers=2, min_pages=0) == load(max_workers=1) == [
+            (name, [f"Contents of {name}"]) for name in names
+        ]
+        with open(os.path.join(tmpdir, "broken.pdf"), "w") as f:
+            f.write("not a pdf")
+        with pytest.raises(Exception):
+            list(iter_loaded_files(tmpdir, ["broken.pdf"], max_workers=2, min_pages=0))
+
+
+def test_iter_chunks_matches_split_documents():
+    """Test that streaming chunks gives the same result as splitting a list."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ["a.txt", "b.txt"]:
+            with open(os.path.join(tmpdir, name), "w") as f:
+                f.write(f"{name} talks about AI engineering. " * 100)
+
+        streamed = list(iter_chunks(iter_documents(tmpdir)))
+        expected = split_documents(load_documents(tmpdir))
+        assert sorted(c.page_content for c in streamed) == sorted(c.page_content for c in expected)
+
+
+def test_batched():
+    """Test that a stream is grouped into bounded batches."""
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def _messy_text(rng):
+    """Paragraphs, lines, long words and unbroken runs, with stray whitespace."""
+    words = ["retrieval", "chunk", "vector", "Claude", "café", "x" * 40]
+    parts = []
+    for _ in range(rng.randint(1, 30)):
+        if rng.random() < 0.1:
+            parts.append("z" * rng.randint(1, 2500))
+        else:
+            parts.append(" ".join(rng.choices(words, k=rng.randint(1, 300))))
+    return "".join(part + rng.choice(["\n\n", "\n", " ", "\n\n\n", " \n "]) for part in parts)
+
+
+def test_offset_splitter_matches_recursive_splitter():
+    """Test that the offset splitter gives LangChain's chunks, at exact offsets."""
+    rng = random.Random(0)
+    for _ in range(30):
+        text = _messy_text(rng)
+        for size, overlap in [(1000, 200), (100, 20), (30, 0)]:
+            expected = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap).split_text(text)
+            chunks = OffsetTextSplitter(size, overlap).split_documents(
+                [Document(page_content=text, metadata={"page": 3})]
+            )
+            assert [c.page_content for c in chunks] == expected
+            for c in chunks:
+                start, end = c.metadata["start_index"], c.metadata["end_index"]
+                assert text[start:end] == c.page_content and c.metadata["page"] == 3
@@ -0,0 +1,95 @@
+"""Tests for the embedding cache module."""
+
+import tempfile
+import threading
+import time
+from langchain_core.embeddings import Embeddings
+from src.embedding_cache import CachedEmbeddings, QueryBatcher
+
+
+class CountingEmbeddings(Embeddings):
+    """Tiny deterministic embedder that counts the texts it embeds."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        self.batches.append(len(texts))
+        time.sleep(self.delay)
+        return [[float(len(t)), float(t.count("a")), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _cache(tmpdir, base, max_entries=10):
+    return CachedEmbeddings(base, "test-model", tmpdir, max_entries, dtype="float32")
+
+
+def test_repeated_texts_hit_the_cache():
+    """Test that a text is embedded once and then served from the cache."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = CountingEmbeddings()
+        cache = _cache(tmpdir, base)
+        first = cache.embed_documents(["alpha", "beta", "alpha"])
+        second = cache.embed_documents(["beta  ", "alpha"])
+        assert base.calls == 2
+        assert second == [first[1], first[0]]
+        assert cache.stats()["hits"] == 2
+
+
+def test_cache_survives_reopening():
+    """Test that cached vectors are reused by a new instance."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _cache(tmpdir, CountingEmbeddings()).embed_documents(["alpha", "beta"])
+        base = CountingEmbeddings()
+        reopened = _cache(tmpdir, base)
+        assert reopened.embed_documents(["alpha", "beta"]) == [[5.0, 2.0, 1.0], [4.0, 1.0, 1.0]]
+        assert base.calls == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    """Test that a full cache drops its least recently used entry."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = CountingEmbeddings()
+        cache = _cache(tmpdir, base, max_entries=2)
+        cache.embed_documents(["alpha", "beta"])
+        cache.embed_documents(["alpha"])
+        cache.embed_documents(["gamma"])
+        assert cache.stats()["evictions"] == 1
+        cache.embed_documents(["alpha"])
+        assert base.calls == 3
+
+
+def test_rephrased_queries_hit_the_query_cache():
+    """Test that case and whitespace variants of a question are embedded once."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        base = CountingEmbeddings()
+        cache = _cache(tmpdir, base)
+        first = cache.embed_query("What is RAG?")
+        assert cache.embed_query("  what is  rag?") == first
+        assert cache.embed_queries(["WHAT IS RAG?", "new question"])[0] == first
+        assert base.calls == 2
+        stats = cache.stats()
+        assert stats["query_hits"] == 2 and stats["query_misses"] == 2
+
+
+def test_concurrent_queries_are_embedded_together():
+    """Test that queries arriving during a model call share the next one."""
+    base = CountingEmbeddings(delay=0.05)
+    batcher = QueryBatcher(base)
+    results = {}
+
+    def embed(text):
+        results[text] = batcher.embed(text)
+
+    threads = [threading.Thread(target=embed, args=(f"q{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert base.calls == 8 and len(base.batches) < 8
+    assert all(results[f"q{i}"] == [2.0, 0.0, 1.0] for i in range(8))
@@ -0,0 +1,79 @@
+"""Tests for the IVF-PQ vector store module."""
+
+import tempfile
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.ivf_store import IvfPqVectorStore, exact_top_k, recall_at_k
+
+DIM = 32
+
+
+def _clustered(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(42).normal(size=(50, DIM))
+    return (centers[rng.integers(0, 50, n)] + 0.5 * rng.normal(size=(n, DIM))).astype(np.float32)
+
+
+def _store(directory=None, **kwargs):
+    return IvfPqVectorStore(DeterministicFakeEmbedding(size=DIM), directory, nlist=16, m=8,
+                            train_size=2000, **kwargs)
+
+
+def _add(store, vectors, offset=0):
+    ids = [str(offset + i) for i in range(len(vectors))]
+    for start in range(0, len(vectors), 500):
+        store.add_embeddings(ids[start:start + 500], vectors[start:start + 500], ids=ids[start:start + 500])
+    return ids
+
+
+def test_exact_until_trained():
+    """Test that a small store answers exactly and keeps no quantizer."""
+    store = _store()
+    vectors = _clustered(300)
+    ids = _add(store, vectors)
+    queries = _clustered(10, seed=1)
+    assert not store.trained
+    assert recall_at_k(store, queries, exact_top_k(vectors, ids, queries, 5), 5) == 1.0
+
+
+def test_recall_improves_with_nprobe_and_refine():
+    """Test the recall knobs on a trained index, including late insertions."""
+    store = _store()
+    vectors = _clustered(4000)
+    ids = _add(store, vectors[:2500]) + _add(store, vectors[2500:], offset=2500)
+    assert store.trained and store.count() == 4000
+    queries = _clustered(30, seed=1)
+    expected = exact_top_k(vectors, ids, queries, 10)
+    coarse = recall_at_k(store, queries, expected, 10, nprobe=1, refine=0)
+    refined = recall_at_k(store, queries, expected, 10, nprobe=16, refine=8)
+    assert refined >= 0.95
+    assert refined > coarse
+    assert store.memory_per_vector() < DIM * 4 + store._table_bytes() / store.count()
+
+
+def test_persisted_index_reopens_trained():
+    """Test that a trained index survives reopening, with deletes applied."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir)
+        vectors = _clustered(2500)
+        _add(store, vectors)
+        store.delete(["0", "1"])
+        reopened = _store(tmpdir)
+        assert reopened.trained and reopened.count() == 2498
+        assert reopened.get(["0"])["ids"] == []
+        assert reopened.similarity_search_by_vector(vectors[7], k=1)[0].id == "7"
+
+
+def test_full_probe_sees_every_row_once_after_updates():
+    """Test that the list postings track deletes, upserts and reopening."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _store(tmpdir)
+        vectors = _clustered(2500)
+        ids = _add(store, vectors)
+        store.delete(["0", "2499", "17"])
+        store.add_embeddings(["moved"], vectors[:1] * -1, ids=["5"])
+        _add(store, _clustered(10, seed=2), offset=2500)
+        expected = sorted(set(ids[:2500] + [str(i) for i in range(2500, 2510)]) - {"0", "2499", "17"})
+        for index in (store, _store(tmpdir)):
+            found = index.similarity_search_by_vector(vectors[3], k=5000, nprobe=16, refine=0)
+            assert sorted(doc.id for doc in found) == expected
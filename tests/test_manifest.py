@@ -0,0 +1,82 @@
+"""Tests for the manifest module."""
+
+import os
+import tempfile
+from src.manifest import (
+    new_manifest, scan_folder, diff_manifest, corpus_fingerprint,
+    load_manifest, save_manifest,
+)
+
+
+def _write(folder, name, text):
+    with open(os.path.join(folder, name), "w") as f:
+        f.write(text)
+
+
+def _manifest_for(folder):
+    manifest = new_manifest()
+    for name, entry in scan_folder(folder).items():
+        manifest["files"][name] = dict(entry, chunks=[])
+    return manifest
+
+
+def test_diff_detects_added_and_removed():
+    """Test that new and deleted files are reported."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write(tmpdir, "a.txt", "alpha")
+        manifest = _manifest_for(tmpdir)
+        os.remove(os.path.join(tmpdir, "a.txt"))
+        _write(tmpdir, "b.txt", "beta")
+
+        diff = diff_manifest(manifest, scan_folder(tmpdir, manifest))
+        assert diff["added"] == ["b.txt"]
+        assert diff["removed"] == ["a.txt"]
+        assert diff["changed"] == []
+
+
+def test_diff_detects_in_place_edit():
+    """Test that editing a file without renaming it is detected."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write(tmpdir, "a.txt", "alpha")
+        manifest = _manifest_for(tmpdir)
+        _write(tmpdir, "a.txt", "alpha, revised")
+
+        diff = diff_manifest(manifest, scan_folder(tmpdir, manifest))
+        assert diff["changed"] == ["a.txt"]
+        assert diff["added"] == [] and diff["removed"] == []
+
+
+def test_diff_detects_rename():
+    """Test that a renamed file is not treated as new content."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write(tmpdir, "old.txt", "same content")
+        manifest = _manifest_for(tmpdir)
+        os.rename(os.path.join(tmpdir, "old.txt"), os.path.join(tmpdir, "new.txt"))
+
+        diff = diff_manifest(manifest, scan_folder(tmpdir, manifest))
+        assert diff["renamed"] == [("old.txt", "new.txt")]
+        assert diff["added"] == [] and diff["removed"] == []
+
+
+def test_fingerprint_tracks_content():
+    """Test that the corpus fingerprint changes when content changes."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write(tmpdir, "a.txt", "alpha")
+        before = corpus_fingerprint(scan_folder(tmpdir))
+        _write(tmpdir, "a.txt", "omega")
+        assert corpus_fingerprint(scan_folder(tmpdir)) != before
+
+
+def test_manifest_round_trip():
+    """Test that a saved manifest loads back unchanged."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write(tmpdir, "a.txt", "alpha")
+        manifest = _manifest_for(tmpdir)
+        path = os.path.join(tmpdir, "index", "manifest.json")
+        save_manifest(manifest, path)
+        assert load_manifest(path) == manifest
+
+
+def test_load_missing_manifest():
+    """Test that a missing manifest loads as empty."""
+    assert load_manifest("/nonexistent/manifest.json")["files"] == {}
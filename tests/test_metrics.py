@@ -0,0 +1,41 @@
+"""Tests for the metrics module."""
+
+from src import metrics
+
+
+def test_trace_collects_stages_and_counters():
+    """Test that stages and counts inside a trace are attached to it."""
+    metrics.reset()
+    with metrics.trace("ask") as current:
+        with metrics.stage("retrieve"):
+            pass
+        metrics.record_stage("llm", 0.25)
+        metrics.count("retrieved_chunks", 3)
+    result = current.to_dict()
+    assert set(result["stages"]) == {"retrieve", "llm"}
+    assert result["stages"]["llm"] == 250.0
+    assert result["counters"] == {"retrieved_chunks": 3}
+    assert result["total_ms"] >= 0
+    assert metrics.current_trace() is None
+
+
+def test_timed_iter_records_one_stage():
+    """Test that a timed iterator passes items through and records once."""
+    metrics.reset()
+    with metrics.trace("ingest") as current:
+        assert list(metrics.timed_iter("load_split", range(3))) == [0, 1, 2]
+    assert "load_split" in current.stages
+    assert metrics.snapshot()["stages"]["load_split"]["count"] == 1
+
+
+def test_prometheus_text_format():
+    """Test that histograms are cumulative and counters are exported."""
+    metrics.reset()
+    metrics.record_stage("llm", 0.003)
+    metrics.record_stage("llm", 0.2)
+    metrics.count("answer_cache_hits")
+    text = metrics.prometheus_text()
+    assert 'rag_stage_seconds_bucket{stage="llm",le="0.005"} 1' in text
+    assert 'rag_stage_seconds_bucket{stage="llm",le="0.25"} 2' in text
+    assert 'rag_stage_seconds_count{stage="llm"} 2' in text
+    assert 'rag_events_total{event="answer_cache_hits"} 1' in text
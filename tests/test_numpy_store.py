@@ -0,0 +1,111 @@
+"""Tests for the NumPy vector store module."""
+
+import os
+import tempfile
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.numpy_store import NumpyVectorStore
+from src.vector_store import sync_vector_store
+
+
+def _random_store(n=500, dim=32, dtype="float32", directory=None):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    store = NumpyVectorStore(DeterministicFakeEmbedding(size=dim), directory, dtype)
+    store.add_embeddings([f"doc {i}" for i in range(n)], vectors,
+                         [{"i": i} for i in range(n)], [str(i) for i in range(n)])
+    return store, vectors
+
+
+def _exact_top(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [str(i) for i in np.argsort(-(unit @ query))[:k]]
+
+
+def test_search_matches_brute_force():
+    """Test that search returns the exact cosine top-k in order."""
+    store, vectors = _random_store()
+    query = np.random.default_rng(1).normal(size=32).astype(np.float32)
+    hits = store.similarity_search_by_vector(query, k=5)
+    assert [doc.id for doc in hits] == _exact_top(vectors, query, 5)
+    assert hits[0].metadata == {"i": int(hits[0].id)}
+
+
+def test_int8_keeps_recall():
+    """Test that int8 quantization still finds nearly all true neighbours."""
+    store, vectors = _random_store(dtype="int8")
+    queries = np.random.default_rng(2).normal(size=(20, 32)).astype(np.float32)
+    found = store.similarity_search_by_vectors(queries, k=10)
+    recall = np.mean([
+        len({doc.id for doc in hits} & set(_exact_top(vectors, q, 10))) / 10
+        for q, hits in zip(queries, found)
+    ])
+    assert recall >= 0.9
+
+
+def test_float16_search_follows_writes():
+    """Test that float16 search stays exact for its rows across upserts, deletes and growth.
+
+    The store grows past one scan block, so rows are widened in more than one.
+    """
+    store, vectors = _random_store(dtype="float16")
+    query = np.random.default_rng(3).normal(size=32).astype(np.float32)
+    assert [doc.id for doc in store.similarity_search_by_vector(query, k=5)] == _exact_top(vectors, query, 5)
+
+    extra = np.random.default_rng(4).normal(size=(4000, 32)).astype(np.float32)
+    vectors = np.concatenate([vectors, extra])
+    vectors[7] = query
+    store.add_embeddings(["doc 7"], vectors[7:8], [{"i": 7}], ["7"])
+    store.add_embeddings([f"doc {i}" for i in range(500, 4500)], extra,
+                         [{"i": i} for i in range(500, 4500)], [str(i) for i in range(500, 4500)])
+    store.delete(["3"])
+    hits = store.similarity_search_by_vector(query, k=5)
+    assert hits[0].id == "7"
+    assert [doc.id for doc in hits] == [i for i in _exact_top(vectors, query, 6) if i != "3"][:5]
+
+
+def test_persistence_upsert_and_delete():
+    """Test that a reopened store sees upserts and deletes."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store, vectors = _random_store(n=1500, dtype="float16", directory=tmpdir)
+        store.delete(["0", "1", "1499"])
+        store.add_embeddings(["replaced"], vectors[5:6], [{"new": True}], ["5"])
+        store.update_metadata(["6"], [{"tag": "x"}])
+
+        reopened = NumpyVectorStore(store.embeddings, tmpdir, "float16")
+        assert reopened.count() == 1497
+        assert reopened.get(["0"])["ids"] == []
+        assert reopened.get(["5"])["documents"] == ["replaced"]
+        assert reopened.get(["6"], include=["metadatas"])["metadatas"] == [{"tag": "x"}]
+        hit = reopened.similarity_search_by_vector(vectors[1498], k=1)[0]
+        assert hit.id == "1498"
+
+
+def test_sync_into_numpy_store():
+    """Test incremental indexing of a folder into the NumPy backend."""
+    with tempfile.TemporaryDirectory() as docs, tempfile.TemporaryDirectory() as store_dir:
+        with open(os.path.join(docs, "a.txt"), "w") as f:
+            f.write("Retrieval augmented generation grounds answers in documents.")
+        store = NumpyVectorStore(DeterministicFakeEmbedding(size=16), store_dir)
+        manifest, stats = sync_vector_store(store, docs)
+        assert stats["embedded"] == 1
+
+        os.rename(os.path.join(docs, "a.txt"), os.path.join(docs, "b.txt"))
+        manifest, stats = sync_vector_store(store, docs, manifest)
+        assert stats["embedded"] == 0
+        [doc] = store.as_retriever(search_kwargs={"k": 1}).invoke("retrieval")
+        assert doc.metadata["source"].endswith("b.txt")
+
+
+def test_compaction_drops_replaced_texts():
+    """Test that rewriting chunks many times keeps only live texts on disk."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = NumpyVectorStore(DeterministicFakeEmbedding(size=16), tmpdir)
+        for round_ in range(30):
+            store.add_texts([f"round {round_} chunk {i}" for i in range(100)], ids=[str(i) for i in range(100)])
+        assert store._docstore.records < 30 * 100
+        assert len([name for name in os.listdir(tmpdir) if name.startswith("texts-")]) == 1
+
+        reopened = NumpyVectorStore(store.embeddings, tmpdir)
+        assert reopened.get(["7"])["documents"] == ["round 29 chunk 7"]
+        assert reopened.similarity_search("round 29 chunk 7", k=1)[0].id == "7"
@@ -0,0 +1,209 @@
+"""Tests for the index registry module."""
+
+import functools
+import glob
+import os
+import tempfile
+import threading
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.chatbot import get_chatbot
+from src.bm25 import LEXICAL_FILENAME
+from src.dedup import DEDUP_FILENAME
+from src.manifest import MANIFEST_FILENAME
+from src.registry import IndexRegistry
+from src.vector_store import load_or_create_vector_store, store_directory_for, tenant_folder
+
+
+class CountingBuilder:
+    """Stand-in for load_or_create_vector_store that counts builds."""
+
+    def __init__(self):
+        self.builds = 0
+
+    def __call__(self, folder_path, on_progress=None):
+        self.builds += 1
+        return object(), {"files": {}}, {"chunks": 1}
+
+
+class BlockingBuilder(CountingBuilder):
+    """Builder that reports progress, then waits until it is released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def __call__(self, folder_path, on_progress=None):
+        if on_progress:
+            on_progress(1, 2)
+        self.release.wait(5)
+        return super().__call__(folder_path, on_progress)
+
+
+def _folder_with(tmpdir, text):
+    with open(os.path.join(tmpdir, "doc.txt"), "w") as f:
+        f.write(text)
+    return tmpdir
+
+
+def test_sessions_share_one_index():
+    """Test that leases for the same corpus share a single build."""
+    builder = CountingBuilder()
+    registry = IndexRegistry(builder=builder)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "shared corpus")
+        first = registry.acquire(folder)
+        second = registry.acquire(folder)
+        assert first.vector_store is second.vector_store
+        assert builder.builds == 1
+        assert registry.stats()["in_use"] == 1
+
+
+def test_idle_indexes_are_evicted():
+    """Test that released indexes beyond the idle limit are dropped."""
+    registry = IndexRegistry(max_idle=0, builder=CountingBuilder())
+    with tempfile.TemporaryDirectory() as tmpdir:
+        lease = registry.acquire(_folder_with(tmpdir, "corpus"))
+        lease.release()
+        lease.release()
+        assert registry.stats()["indexes"] == 0
+
+
+def test_lease_released_on_garbage_collection():
+    """Test that a dropped lease no longer pins its index."""
+    registry = IndexRegistry(max_idle=1, builder=CountingBuilder())
+    with tempfile.TemporaryDirectory() as tmpdir:
+        lease = registry.acquire(_folder_with(tmpdir, "corpus"))
+        del lease
+        assert registry.stats() == {"indexes": 1, "in_use": 0, "idle": 1}
+
+
+def test_reverted_folder_is_rebuilt():
+    """Test that a folder changed and changed back is not served a superseded index."""
+    builder = CountingBuilder()
+    registry = IndexRegistry(builder=builder)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "version A")
+        held = registry.acquire(folder)
+        registry.acquire(_folder_with(tmpdir, "version B")).release()
+        registry.acquire(_folder_with(tmpdir, "version A")).release()
+        assert builder.builds == 3
+        held.release()
+        assert registry.stats() == {"indexes": 1, "in_use": 0, "idle": 1}
+
+
+def test_background_jobs_are_coalesced():
+    """Test that resubmitting a corpus while it builds joins the running job."""
+    builder = BlockingBuilder()
+    registry = IndexRegistry(builder=builder)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "corpus")
+        job = registry.submit(folder)
+        assert registry.submit(folder) is job
+        builder.release.set()
+        assert job.wait(5) and job.status == "done"
+        assert builder.builds == 1
+        assert registry.submit(folder).status == "done"
+
+
+def test_old_index_serves_while_new_one_builds():
+    """Test that a held lease stays usable until the new index is acquired."""
+    builder = BlockingBuilder()
+    registry = IndexRegistry(builder=builder)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "first version")
+        builder.release.set()
+        old = registry.acquire(folder)
+        builder.release.clear()
+
+        _folder_with(tmpdir, "second version")
+        job = registry.submit(folder)
+        while job.files_total == 0 and not job.wait(0.01):
+            pass
+        assert job.status == "running" and job.progress == 0.5
+        assert registry.stats()["in_use"] == 1 and old.vector_store is not None
+
+        builder.release.set()
+        assert job.wait(5)
+        new = registry.acquire(folder)
+        assert new.fingerprint == job.fingerprint != old.fingerprint
+        assert builder.builds == 2
+
+
+def test_rebuild_leaves_held_index_untouched():
+    """Test that a real rebuild goes to a new generation and the old one is deleted on release."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder, persist = os.path.join(tmpdir, "docs"), os.path.join(tmpdir, "db")
+        os.makedirs(folder)
+        builder = functools.partial(load_or_create_vector_store, persist_dir=persist,
+                                    embeddings=DeterministicFakeEmbedding(size=16))
+        registry = IndexRegistry(builder=builder)
+        old = registry.acquire(_folder_with(folder, "Valve A opens clockwise."))
+        old_files = {}
+        for name in (MANIFEST_FILENAME, LEXICAL_FILENAME, DEDUP_FILENAME):
+            with open(os.path.join(old.vector_store._persist_directory, name), "rb") as f:
+                old_files[name] = f.read()
+
+        _folder_with(folder, "Valve B opens counterclockwise.")
+        job = registry.submit(folder)
+        assert job.wait(30) and job.status == "done"
+        new = registry.acquire(folder)
+
+        def texts(lease):
+            return [doc.page_content for doc in lease.vector_store.similarity_search("valve", k=5)]
+
+        assert texts(old) == ["Valve A opens clockwise."]
+        assert texts(new) == ["Valve B opens counterclockwise."]
+        for name, data in old_files.items():
+            # Side files are hard-linked into the new generation, never written through.
+            with open(os.path.join(old.vector_store._persist_directory, name), "rb") as f:
+                assert f.read() == data
+        generations = os.path.join(store_directory_for(folder, persist), "gen-*")
+        assert len(glob.glob(generations)) == 2
+        old.release()
+        assert glob.glob(generations) == [new.vector_store._persist_directory]
+        assert texts(new) == ["Valve B opens counterclockwise."]
+
+        new.release()
+        reopened = IndexRegistry(builder=builder).acquire(folder)
+        assert texts(reopened) == ["Valve B opens counterclockwise."]
+        assert len(glob.glob(generations)) == 1
+
+
+def test_base_corpus_is_mounted_into_tenants_without_rebuilding():
+    """Test that tenants share one build of a mounted base corpus."""
+    builder = CountingBuilder()
+    registry = IndexRegistry(builder=builder)
+    with tempfile.TemporaryDirectory() as root:
+        base = _folder_with(tenant_folder("base", root), "shared guide")
+        alice = registry.acquire(_folder_with(tenant_folder("alice", root), "alice notes"), mounts=(base,))
+        bob = registry.acquire(_folder_with(tenant_folder("bob", root), "bob notes"), mounts=(base,))
+        assert builder.builds == 3
+        assert alice.mounted_stores[0] is bob.mounted_stores[0]
+        assert alice.num_chunks == 2 and alice.fingerprint != bob.fingerprint
+
+        alice.release()
+        assert registry.stats() == {"indexes": 3, "in_use": 2, "idle": 1}
+        with pytest.raises(ValueError):
+            tenant_folder("../bob", root)
+
+
+def test_evicted_and_dropped_indexes_release_their_chatbots(monkeypatch):
+    """Test that the chatbot cache does not keep serving an index the registry let go."""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    builder = lambda folder, on_progress=None: (
+        InMemoryVectorStore(DeterministicFakeEmbedding(size=16)), {"files": {}}, {"chunks": 1})
+    registry = IndexRegistry(max_idle=0, builder=builder)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        lease = registry.acquire(_folder_with(tmpdir, "version A"))
+        chatbot = get_chatbot(lease.vector_store)
+        lease.release()
+        assert get_chatbot(lease.vector_store) is not chatbot
+
+        held = registry.acquire(_folder_with(tmpdir, "version B"))
+        chatbot = get_chatbot(held.vector_store)
+        registry.acquire(_folder_with(tmpdir, "version C")).release()
+        assert get_chatbot(held.vector_store) is chatbot
+        held.release()
+        assert get_chatbot(held.vector_store) is not chatbot
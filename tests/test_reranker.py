@@ -0,0 +1,79 @@
+"""Tests for the reranker module."""
+
+import sys
+import time
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.chatbot import create_chatbot
+from src.reranker import Reranker, RerankingRetriever
+
+DOCS = [Document(page_content=text) for text in (
+    "Chroma persists vectors on disk.",
+    "Claude answers the question from the context.",
+    "The reranker scores question and chunk pairs.",
+)]
+
+
+class OverlapScorer:
+    """Scores pairs by shared words, recording every batch it is given."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, pairs):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay)
+        return [len(set(q.lower().split()) & set(t.lower().split())) for q, t in pairs]
+
+
+def test_rerank_orders_by_score_in_one_batch():
+    """Test that all pairs are scored in one call and the best are kept."""
+    scorer = OverlapScorer()
+    kept = Reranker(scorer).rerank("how does the reranker score pairs", DOCS, k=2)
+    assert kept[0] is DOCS[2] and len(kept) == 2
+    assert scorer.batches == [3]
+
+
+def test_rerank_reuses_cached_scores():
+    """Test that pairs scored before are not sent to the model again."""
+    scorer = OverlapScorer()
+    reranker = Reranker(scorer)
+    reranker.rerank("what does claude answer", DOCS[:2])
+    reranker.rerank("what does claude answer", DOCS)
+    assert scorer.batches == [2, 1]
+
+
+def test_slow_rerank_falls_back_to_retrieval_order():
+    """Test that a rerank slower than the timeout keeps the original order."""
+    reranker = Reranker(OverlapScorer(delay=0.3), timeout=0.01)
+    assert reranker.rerank("how does the reranker score pairs", DOCS, k=2) == DOCS[:2]
+
+
+def test_failing_scorer_keeps_retrieval_order(monkeypatch):
+    """Test that a scorer that raises, or a model that cannot load, keeps the original order."""
+    def broken(pairs):
+        raise RuntimeError("model crashed")
+
+    assert Reranker(broken).rerank("how does the reranker score pairs", DOCS, k=2) == DOCS[:2]
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    assert Reranker().rerank("how does the reranker score pairs", DOCS, k=2) == DOCS[:2]
+
+
+def test_rerank_skips_scoring_when_jobs_are_pending():
+    """Test that requests beyond max_pending keep the retrieval order without queueing work."""
+    scorer = OverlapScorer(delay=0.3)
+    reranker = Reranker(scorer, timeout=0.01, max_pending=1)
+    assert reranker.rerank("how does the reranker score pairs", DOCS, k=2) == DOCS[:2]
+    assert reranker.rerank("what does claude answer", DOCS, k=2) == DOCS[:2]
+    reranker._executor.shutdown(wait=True)
+    assert scorer.batches == [3]
+
+
+def test_chatbot_reranks_when_enabled():
+    """Test that create_chatbot puts the reranker between retrieval and packing."""
+    store = InMemoryVectorStore.from_documents(DOCS, DeterministicFakeEmbedding(size=16))
+    chatbot = create_chatbot(store, llm=FakeListChatModel(responses=["ok"]), rerank=True)
+    assert isinstance(chatbot.retriever.retriever, RerankingRetriever)
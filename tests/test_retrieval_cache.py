@@ -0,0 +1,75 @@
+"""Tests for the retrieval cache module."""
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.chatbot import ask, ask_many, create_chatbot
+from src.retrieval_cache import RetrievalCache, CachedRetriever
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Fake embedder that counts query embeddings."""
+
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def _store():
+    docs = [Document(page_content=f"Valve {i} opens clockwise.", metadata={"source": "manual.txt"})
+            for i in range(5)]
+    return InMemoryVectorStore.from_documents(docs, CountingEmbedding(size=16))
+
+
+def _cached_retriever(chatbot) -> CachedRetriever:
+    return chatbot.retriever.retriever
+
+
+def test_repeated_question_skips_embedding_and_search():
+    """Test that a rephrased repeat is answered from cached chunk ids."""
+    store = _store()
+    chatbot = create_chatbot(store, llm=FakeListChatModel(responses=["ok"]), rerank=False,
+                             fingerprint="v1")
+    cache = RetrievalCache()
+    _cached_retriever(chatbot).cache = cache
+
+    first = ask(chatbot, "Which way does valve 3 open?")["sources"]
+    again = ask(chatbot, "which way does  VALVE 3 open?")["sources"]
+    assert store.embeddings.queries == 1
+    assert [d.page_content for d in again] == [d.page_content for d in first]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_new_fingerprint_and_missing_chunks_miss():
+    """Test that a changed index never serves stale chunk ids."""
+    store = _store()
+    cache = RetrievalCache()
+    llm = FakeListChatModel(responses=["ok"])
+    old = create_chatbot(store, llm=llm, rerank=False, fingerprint="v1")
+    _cached_retriever(old).cache = cache
+    ask(old, "Which way does valve 3 open?")
+
+    new = create_chatbot(store, llm=llm, rerank=False, fingerprint="v2")
+    _cached_retriever(new).cache = cache
+    ask(new, "Which way does valve 3 open?")
+    assert cache.stats()["hits"] == 0
+
+    store.delete(list(store.store))
+    store.add_documents([Document(page_content="Valve 3 now opens counterclockwise.")])
+    assert ask(new, "Which way does valve 3 open?")["sources"][0].page_content.endswith("counterclockwise.")
+    assert cache.stats()["stale"] == 1
+
+
+def test_batch_retrieval_uses_the_cache():
+    """Test that ask_many serves cached questions and fills the cache for the rest."""
+    store = _store()
+    chatbot = create_chatbot(store, llm=FakeListChatModel(responses=["ok"]), rerank=False,
+                             fingerprint="v1")
+    cache = RetrievalCache()
+    _cached_retriever(chatbot).cache = cache
+    ask(chatbot, "Which way does valve 1 open?")
+    ask_many(chatbot, ["which way does valve 1 open?", "Which way does valve 2 open?"])
+    assert cache.stats()["hits"] == 1 and cache.stats()["entries"] == 2
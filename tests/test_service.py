@@ -0,0 +1,100 @@
+"""Tests for the HTTP service module."""
+
+import json
+import os
+import tempfile
+import time
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+from src.answer_cache import AnswerCache
+from src.document_loader import load_documents, split_documents
+from src.registry import IndexRegistry
+from src.service import create_app
+
+
+def _build(folder_path, on_progress=None):
+    chunks = split_documents(load_documents(folder_path))
+    store = InMemoryVectorStore(DeterministicFakeEmbedding(size=16))
+    if chunks:
+        store.add_documents(chunks)
+    return store, {"files": {}}, {"chunks": len(chunks)}
+
+
+def _app(folder, **kwargs):
+    return create_app(folder, registry=IndexRegistry(builder=_build),
+                      llm=FakeListChatModel(responses=["Use the blue valve."]),
+                      cache=AnswerCache(DeterministicFakeEmbedding(size=16)), **kwargs)
+
+
+def _folder_with(tmpdir, name, text):
+    with open(os.path.join(tmpdir, name), "w") as f:
+        f.write(text)
+    return tmpdir
+
+
+def test_ask_returns_answer_and_sources():
+    """Test that /ask answers from the index loaded at startup."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "manual.txt", "Open the blue valve first.")
+        with TestClient(_app(folder)) as client:
+            body = client.post("/ask", json={"question": "Which valve?"}).json()
+    assert body["answer"] == "Use the blue valve."
+    assert body["sources"][0]["content"] == "Open the blue valve first."
+    assert body["cached"] is False and "trace" in body
+
+
+def test_stream_yields_sources_tokens_and_done():
+    """Test that /ask/stream sends one JSON event per line, ending with done."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "manual.txt", "Open the blue valve first.")
+        with TestClient(_app(folder)) as client:
+            response = client.post("/ask/stream", json={"question": "Which valve?"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["type"] for e in (events[0], events[-1])] == ["sources", "done"]
+    assert "".join(e["text"] for e in events if e["type"] == "token") == "Use the blue valve."
+
+
+def test_busy_service_turns_questions_away():
+    """Test that questions beyond the pending limit get a 503 with Retry-After."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "manual.txt", "Open the blue valve first.")
+        with TestClient(_app(folder, max_pending=0)) as client:
+            response = client.post("/ask", json={"question": "Which valve?"})
+    assert response.status_code == 503 and "retry-after" in response.headers
+
+
+def test_ingest_swaps_in_new_documents():
+    """Test that uploaded documents are indexed and then answered from."""
+    with tempfile.TemporaryDirectory() as folder:
+        with TestClient(_app(folder)) as client:
+            assert client.post("/ask", json={"question": "Which valve?"}).status_code == 503
+            assert client.put("/documents/manual.txt", content=b"Open the red valve.").status_code == 201
+            assert client.put("/documents/../escape.txt", content=b"x").status_code in (400, 404)
+            job = client.post("/ingest").json()
+            assert job["status"] in ("queued", "running", "done")
+            for _ in range(100):
+                if client.get("/health").json()["fingerprint"] == job["fingerprint"]:
+                    break
+                time.sleep(0.05)
+            assert client.get("/ingest").json()["status"] == "done"
+            body = client.post("/ask", json={"question": "Which valve?"}).json()
+    assert body["sources"][0]["content"] == "Open the red valve."
+
+
+def test_reload_keeps_the_index_of_running_requests():
+    """Test that a swapped-out index is released only when its last request finishes."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = _folder_with(tmpdir, "manual.txt", "Open the blue valve first.")
+        with TestClient(_app(folder)) as client:
+            service = client.app.state.service
+            running = service.admit()
+            _folder_with(tmpdir, "manual.txt", "Open the red valve first.")
+            service.load()
+            assert service.index is not running
+            assert service.registry.stats()["in_use"] == 2
+            docs = running.chatbot.retriever.invoke("Which valve?")
+            assert docs[0].page_content == "Open the blue valve first."
+            service.done(running)
+            assert service.registry.stats()["in_use"] == 1
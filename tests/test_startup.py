@@ -0,0 +1,22 @@
+"""Tests for the startup module."""
+
+import subprocess
+import sys
+from src.startup import STARTUP_MODULES, import_profile
+
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    """Test that the Anthropic SDK and sentence-transformers wait for first use."""
+    code = (
+        f"import sys, {', '.join(STARTUP_MODULES)}, src.vector_store\n"
+        "heavy = ('langchain_anthropic', 'anthropic', 'sentence_transformers', 'torch', 'chromadb')\n"
+        "print(','.join(m for m in heavy if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_import_profile_breaks_time_down_by_package():
+    """Test that the profile attributes import time to top-level packages."""
+    packages = import_profile(["src.metrics"])
+    assert "src" in packages and all(seconds >= 0 for seconds in packages.values())
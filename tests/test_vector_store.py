@@ -0,0 +1,80 @@
+"""Tests for the vector store module."""
+
+import os
+import tempfile
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.numpy_store import NumpyVectorStore
+from src.vector_store import load_or_create_vector_store, sync_vector_store
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Counts the texts embedded."""
+
+    texts: int = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def _manual(sections, edited=None):
+    """A document of numbered sections, each long enough to fill most of a chunk."""
+    return "\n\n".join(
+        (f"Section {i} was rewritten. " if i == edited else f"Section {i}. ")
+        + f"Valve {i} is opened by turning the handle {i} times clockwise. " * 8
+        for i in range(sections)
+    )
+
+
+def _write(folder, name, text):
+    with open(os.path.join(folder, name), "w") as f:
+        f.write(text)
+
+
+def test_sync_embeds_only_new_chunks():
+    """Test that renames, edits and deletes re-embed only chunks that did not exist before."""
+    embeddings = CountingEmbeddings(size=16)
+    store = NumpyVectorStore(embeddings)
+    with tempfile.TemporaryDirectory() as docs:
+        _write(docs, "manual.txt", _manual(8))
+        _write(docs, "notes.txt", "Notes: the blue valve is opened first.")
+        manifest, stats = sync_vector_store(store, docs)
+        assert embeddings.texts == stats["embedded"] == store.count() > 3
+
+        embeddings.texts = 0
+        os.rename(os.path.join(docs, "manual.txt"), os.path.join(docs, "guide.txt"))
+        manifest, stats = sync_vector_store(store, docs, manifest)
+        assert embeddings.texts == stats["embedded"] == 0
+        moved = store.get(manifest["files"]["guide.txt"]["chunks"])["metadatas"]
+        assert {metadata["source"] for metadata in moved} == {os.path.join(docs, "guide.txt")}
+
+        before = set(manifest["files"]["guide.txt"]["chunks"])
+        _write(docs, "guide.txt", _manual(8, edited=6))
+        manifest, stats = sync_vector_store(store, docs, manifest)
+        after = set(manifest["files"]["guide.txt"]["chunks"])
+        assert 0 < embeddings.texts == stats["embedded"] == len(after - before) < len(after)
+        assert store.get(list(before - after))["ids"] == []
+
+        embeddings.texts = 0
+        stale = manifest["files"]["notes.txt"]["chunks"]
+        os.remove(os.path.join(docs, "notes.txt"))
+        manifest, stats = sync_vector_store(store, docs, manifest)
+        assert embeddings.texts == 0
+        assert store.get(stale)["ids"] == []
+        assert sorted(store.get()["ids"]) == sorted(after)
+
+
+def test_warm_start_embeds_nothing():
+    """Test that reopening an unchanged folder's persisted index embeds no chunks."""
+    with tempfile.TemporaryDirectory() as docs, tempfile.TemporaryDirectory() as persist:
+        _write(docs, "manual.txt", _manual(4))
+        embeddings = CountingEmbeddings(size=16)
+        _, manifest, stats = load_or_create_vector_store(docs, persist, embeddings=embeddings)
+        assert embeddings.texts == stats["embedded"] > 0
+
+        warm = CountingEmbeddings(size=16)
+        store, reopened, stats = load_or_create_vector_store(docs, persist, embeddings=warm)
+        assert warm.texts == stats["embedded"] == 0
+        assert stats["replaced"] is None
+        assert reopened["files"] == manifest["files"]
+        assert store.similarity_search("valve", k=1)